@@ -0,0 +1,68 @@
+import argparse
+import sys
+import time
+
+from src.node_utils import split_pipeline_textnodes, text_to_textnodes
+
+
+def make_paragraph(elements: int) -> str:
+    # shaped like a generated API index: a short lead-in with some emphasis,
+    # code and an image, followed by one long run of links
+    lead = "**Index** of `module` symbols, *generated* ![icon](/images/icon.png): "
+    links = (f"[symbol_{i}](/api/symbol_{i}.html)" for i in range(elements))
+    return lead + ", ".join(links)
+
+
+def best_time(fn, text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inline tokenizer scaling benchmark")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 2000, 4000, 8000, 16000],
+        help="Number of inline elements per paragraph",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--skip-legacy", action="store_true", help="Only time the single-pass scanner"
+    )
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=2.0,
+        help="Fail if per-element cost grows by more than this from the smallest "
+        "to the largest size",
+    )
+    args = parser.parse_args()
+
+    print(f"{'elements':>9} {'scanner ms':>11} {'us/elem':>8} {'legacy ms':>10} {'us/elem':>8}")
+    per_element = []
+    for size in args.sizes:
+        text = make_paragraph(size)
+        scanner = best_time(text_to_textnodes, text, args.repeat)
+        per_element.append(scanner / size)
+        line = f"{size:>9} {scanner * 1e3:>11.2f} {scanner / size * 1e6:>8.2f}"
+        if not args.skip_legacy:
+            legacy = best_time(split_pipeline_textnodes, text, args.repeat)
+            line += f" {legacy * 1e3:>10.2f} {legacy / size * 1e6:>8.2f}"
+        print(line)
+
+    ratio = per_element[-1] / per_element[0]
+    print(f"scanner per-element cost ratio (largest/smallest): {ratio:.2f}")
+    if ratio > args.max_ratio:
+        print(f"FAIL: ratio exceeds {args.max_ratio}, scaling is not linear")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
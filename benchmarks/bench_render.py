@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from src.htmlnode import LeafNode
+from src.node_utils import markdown_to_html_node
+
+
+def legacy_to_html(node) -> str:
+    # the recursive += renderer HTMLNode used before iter_html()
+    if isinstance(node, LeafNode):
+        return node.to_html()
+    child_html = ""
+    for child in node.children:
+        child_html += legacy_to_html(child)
+    props = ""
+    if node.props:
+        for key, value in node.props.items():
+            props += f' {key}="{value}"'
+    return f"<{node.tag}{props}>{child_html}</{node.tag}>"
+
+
+def make_markdown(sections: int) -> str:
+    blocks = []
+    for i in range(sections):
+        blocks.append(f"## Section {i}")
+        blocks.append(
+            f"Paragraph {i} with enough prose to look like documentation. " * 4
+        )
+        blocks.append(
+            f"> A quote with **bold {i}** and a [link](/section/{i}) "
+            f"and `code_{i}` inside"
+        )
+        blocks.append("\n".join(f"* item {j} of list {i}" for j in range(5)))
+        blocks.append(f"```\ndef example_{i}():\n    return {i}\n```")
+    return "\n\n".join(blocks)
+
+
+def render_legacy(node, path: str) -> None:
+    with open(path, "w") as f:
+        f.write(legacy_to_html(node))
+
+
+def render_to_html(node, path: str) -> None:
+    with open(path, "w") as f:
+        f.write(node.to_html())
+
+
+def render_streaming(node, path: str) -> None:
+    with open(path, "w") as f:
+        node.write_html(f)
+
+
+RENDERERS = {
+    "legacy +=": render_legacy,
+    "to_html()": render_to_html,
+    "write_html()": render_streaming,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="HTML rendering benchmark")
+    parser.add_argument(
+        "--sections", type=int, default=5000, help="Sections in the generated page"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=os.devnull)
+    args = parser.parse_args()
+
+    node = markdown_to_html_node(make_markdown(args.sections))
+    size_mb = len(node.to_html().encode()) / 1e6
+    print(f"page size: {size_mb:.1f} MB")
+    print(f"{'renderer':>14} {'best s':>8} {'MB/s':>8} {'peak MB':>8}")
+
+    for name, render in RENDERERS.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            render(node, args.output)
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        render(node, args.output)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:>14} {best:>8.3f} {size_mb / best:>8.1f} {peak / 1e6:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
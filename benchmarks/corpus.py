@@ -0,0 +1,114 @@
+import argparse
+import os
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron who "
+    "sought dominion over the free peoples of middle earth while elves dwarves "
+    "and men gathered in rivendell to decide its fate"
+).split()
+
+
+class CorpusConfig:
+    def __init__(
+        self,
+        pages: int = 200,
+        blocks_per_page: int = 40,
+        words_per_block: int = 40,
+        link_density: float = 0.05,
+        emphasis_density: float = 0.05,
+        code_density: float = 0.1,
+        depth: int = 3,
+        fanout: int = 8,
+        seed: int = 1,
+    ):
+        self.pages = pages
+        self.blocks_per_page = blocks_per_page
+        self.words_per_block = words_per_block
+        # fraction of words turned into links / bold-italic-code spans
+        self.link_density = link_density
+        self.emphasis_density = emphasis_density
+        # fraction of blocks that are fenced code blocks
+        self.code_density = code_density
+        self.depth = depth
+        self.fanout = fanout
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def inline_text(rng: random.Random, config: CorpusConfig, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < config.link_density:
+            parts.append(f"[{word}](/{word}/{rng.randrange(1000)})")
+        elif roll < config.link_density + config.emphasis_density:
+            parts.append(rng.choice(("**{}**", "*{}*", "`{}`")).format(word))
+        else:
+            parts.append(word)
+    return " ".join(parts)
+
+
+def generate_block(rng: random.Random, config: CorpusConfig) -> str:
+    if rng.random() < config.code_density:
+        lines = [f"    {rng.choice(WORDS)}({rng.randrange(100)})" for _ in range(8)]
+        return "```\n" + "\n".join(lines) + "\n```"
+    kind = rng.randrange(5)
+    words = config.words_per_block
+    if kind == 0:
+        return f"{'#' * rng.randint(2, 4)} {inline_text(rng, config, 6)}"
+    if kind == 1:
+        lines = [f"> {inline_text(rng, config, words // 4)}" for _ in range(4)]
+        return "\n".join(lines)
+    if kind == 2:
+        return "\n".join(f"* {inline_text(rng, config, words // 5)}" for _ in range(5))
+    if kind == 3:
+        return "\n".join(
+            f"{i}. {inline_text(rng, config, words // 5)}" for i in range(1, 6)
+        )
+    return inline_text(rng, config, words)
+
+
+def generate_page(rng: random.Random, config: CorpusConfig, title: str) -> str:
+    blocks = [f"# {title}"]
+    blocks.extend(generate_block(rng, config) for _ in range(config.blocks_per_page))
+    return "\n\n".join(blocks) + "\n"
+
+
+def page_path(index: int, config: CorpusConfig) -> str:
+    # spread pages over a tree `depth` directories deep, `fanout` wide
+    parts = []
+    value = index
+    for _ in range(config.depth):
+        parts.append(f"section{value % config.fanout}")
+        value //= config.fanout
+    return os.path.join(*parts, f"page{index}.md") if parts else f"page{index}.md"
+
+
+def generate_corpus(root: str, config: CorpusConfig) -> list[str]:
+    rng = random.Random(config.seed)
+    paths = []
+    for index in range(config.pages):
+        path = os.path.join(root, page_path(index, config))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(generate_page(rng, config, f"Page {index}"))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic markdown corpus")
+    parser.add_argument("root", help="Directory to write the corpus into")
+    defaults = CorpusConfig()
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    args = parser.parse_args()
+
+    root = args.root
+    del args.root
+    written = generate_corpus(root, CorpusConfig(**vars(args)))
+    print(f"Wrote {len(written)} pages to {root}")
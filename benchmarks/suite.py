@@ -0,0 +1,185 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import CorpusConfig, generate_corpus
+from src.constants import MarkdownBlockType
+from src.node_utils import (
+    block_to_block_type,
+    generate_pages_recursive,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+
+TEMPLATE = (
+    "<!DOCTYPE html>\n<html>\n<head><title>{{ Title }}</title></head>\n"
+    "<body>{{ Content }}</body>\n</html>\n"
+)
+
+
+class StageResult:
+    def __init__(self, name: str, ops: int, seconds: float, peak_bytes: int):
+        self.name = name
+        self.ops = ops
+        self.seconds = seconds
+        self.peak_bytes = peak_bytes
+
+    @property
+    def ops_per_sec(self) -> float:
+        return self.ops / self.seconds if self.seconds else float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "ops": self.ops,
+            "seconds": self.seconds,
+            "ops_per_sec": self.ops_per_sec,
+            "peak_bytes": self.peak_bytes,
+        }
+
+
+def measure(name: str, fn, ops: int, repeat: int) -> StageResult:
+    # best-of-N wall time, then one extra run under tracemalloc for the peak;
+    # tracing slows allocation down, so it never overlaps the timed runs
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return StageResult(name, ops, best, peak)
+
+
+def run_suite(config: CorpusConfig, repeat: int, work_dir: str) -> list[StageResult]:
+    content_dir = os.path.join(work_dir, "content")
+    dest_dir = os.path.join(work_dir, "public")
+    template_path = os.path.join(work_dir, "template.html")
+    paths = generate_corpus(content_dir, config)
+    with open(template_path, "w") as f:
+        f.write(TEMPLATE)
+
+    pages = []
+    for path in paths:
+        with open(path) as f:
+            pages.append(f.read())
+    paragraphs = [
+        block
+        for page in pages
+        for block in markdown_to_blocks(page)
+        if block_to_block_type(block) == MarkdownBlockType.PARAGRAPH
+    ]
+
+    def split_blocks():
+        for page in pages:
+            markdown_to_blocks(page)
+
+    def parse_inline():
+        for paragraph in paragraphs:
+            text_to_textnodes(paragraph)
+
+    def to_html_node():
+        for page in pages:
+            markdown_to_html_node(page)
+
+    def build():
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            generate_pages_recursive(content_dir, template_path, dest_dir)
+
+    return [
+        measure("markdown_to_blocks", split_blocks, len(pages), repeat),
+        measure("text_to_textnodes", parse_inline, len(paragraphs), repeat),
+        measure("markdown_to_html_node", to_html_node, len(pages), repeat),
+        measure("generate_pages_recursive", build, len(pages), repeat),
+    ]
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float
+) -> list[tuple[str, str, float, float]]:
+    # a stage regresses when its throughput drops, or its peak memory grows,
+    # by more than `threshold` (a fraction) relative to the baseline
+    regressions = []
+    for name, stage in results["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        if stage["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                (name, "ops_per_sec", base["ops_per_sec"], stage["ops_per_sec"])
+            )
+        if stage["peak_bytes"] > base["peak_bytes"] * (1 + threshold):
+            regressions.append(
+                (name, "peak_bytes", base["peak_bytes"], stage["peak_bytes"])
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Markdown pipeline benchmark suite")
+    defaults = CorpusConfig()
+    for name, value in defaults.to_dict().items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="PATH", help="Write the results as JSON")
+    parser.add_argument(
+        "--baseline", metavar="PATH", help="Compare against a saved results JSON"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown / memory growth against the baseline, as a fraction",
+    )
+    args = parser.parse_args()
+
+    config = CorpusConfig(
+        **{name: getattr(args, name) for name in defaults.to_dict()}
+    )
+    with tempfile.TemporaryDirectory() as work_dir:
+        stages = run_suite(config, args.repeat, work_dir)
+    results = {
+        "config": config.to_dict(),
+        "stages": {stage.name: stage.to_dict() for stage in stages},
+    }
+
+    print(f"{'stage':>26} {'ops':>7} {'ops/s':>10} {'peak MB':>8}")
+    for stage in stages:
+        print(
+            f"{stage.name:>26} {stage.ops:>7} {stage.ops_per_sec:>10.1f} "
+            f"{stage.peak_bytes / 1e6:>8.1f}"
+        )
+    build = results["stages"]["generate_pages_recursive"]
+    print(f"pages/sec: {build['ops_per_sec']:.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != results["config"]:
+            print("warning: baseline was recorded with a different corpus config")
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, before, after in regressions:
+            print(f"REGRESSION {name} {metric}: {before:.1f} -> {after:.1f}")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import argparse
+import sys
+
+from src.htmlnode import write_chunks
+from src.node_utils import stream_markdown
+
+
+def convert(src, dst, template_path: str | None = None) -> None:
+    # block by block from src to dst; neither the markdown nor the HTML is
+    # ever held whole
+    write_chunks(dst, stream_markdown(src, template_path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert markdown to HTML as a stream, e.g. "
+        "python convert.py < page.md > page.html"
+    )
+    parser.add_argument(
+        "input", nargs="?", help="Markdown file to convert (default: stdin)"
+    )
+    parser.add_argument(
+        "--output", "-o", help="HTML file to write (default: stdout)"
+    )
+    parser.add_argument(
+        "--template",
+        default="./template.html",
+        help="Template whose {{ Content }} slot the HTML is streamed into",
+    )
+    parser.add_argument(
+        "--fragment",
+        action="store_true",
+        help="Write only the converted content, without the template",
+    )
+    args = parser.parse_args()
+
+    template_path = None if args.fragment else args.template
+    src = open(args.input, "r") if args.input else sys.stdin
+    dst = open(args.output, "w") if args.output else sys.stdout
+    try:
+        convert(src, dst, template_path)
+    except ValueError as e:
+        print(f"convert.py: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
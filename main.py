@@ -1,38 +1,609 @@
+import argparse
+import json
 import os
 import shutil
+import sys
+import threading
+import time
 
-from src.node_utils import generate_pages_recursive
-
-
-def copy_contents_from(src: str, dst: str) -> None:
-    if not os.path.exists(dst):
-        os.mkdir(dst)
-
-    for filename in os.listdir(src):
-        src_path = os.path.join(src, filename)
-        dst_path = os.path.join(dst, filename)
-        if os.path.isfile(src_path):
-            shutil.copy(src_path, dst_path)
-        else:
-            copy_contents_from(src_path, dst_path)
+from src.assets import (
+    ASSET_MANIFEST_NAME,
+    AssetMap,
+    fingerprint_assets,
+    remove_fingerprinted,
+)
+from src.build import BuildError, ParseCache, build_pages
+from src.compress import GZIP_MIN_SIZE, precompress
+from src.fragments import FragmentCache
+from src.manifest import BuildManifest
+from src.output import MemoryOutput
+from src.pipeline import IO_THREADS, QUEUE_SIZE, Pipeline
+from src.profiling import BuildProfile, Progress
+from src.publish import PublishError, Publisher
+from src.shard import Shard, ShardError, find_shards, merge_shards, shard_manifest_path
+from src.transform import PLUGINS, Transformer
+from src.tree_cache import TreeCache
+from src.static_sync import LINK_MODES, list_files, sync_static
+from src.watch import Poller, apply_plan, plan_rebuild
+from server import LiveReload, make_server, run
 
 
 dir_path_static = "./static"
 dir_path_public = "./public"
 dir_path_content = "./content"
 template_path = "./template.html"
+manifest_path = "./.build-manifest.json"
+generations_path = "./.public-generations"
+tree_cache_path = "./.tree-cache"
+shards_path = "./.shards"
+
 
+def main(
+    full: bool = False,
+    jobs: int = 1,
+    fail_fast: bool = False,
+    link: str = "copy",
+    checksum: bool = False,
+    gzip: bool = False,
+    gzip_min_size: int = GZIP_MIN_SIZE,
+    profile: bool = False,
+    profile_json: str | None = None,
+    profile_top: int = 10,
+    parse_cache_entries: int = 0,
+    parse_cache_mb: int = 32,
+    output: MemoryOutput | None = None,
+    publish: bool = False,
+    keep_generations: int = 3,
+    tree_cache: bool = False,
+    tree_cache_mb: int = 256,
+    fingerprint: bool = False,
+    pipeline: bool = False,
+    io_threads: int = IO_THREADS,
+    queue_size: int = QUEUE_SIZE,
+    shard: Shard | None = None,
+    plugins: list[str] | None = None,
+    fragment_cache_entries: int = 0,
+    fragment_cache_mb: int = 32,
+) -> int:
+    publisher = None
+    dest_dir = dir_path_public
+    if output is not None:
+        # an in-memory build starts empty every time and leaves no manifest
+        manifest = BuildManifest("")
+        print("Loading static files into memory...")
+        for rel_path in list_files(dir_path_static):
+            output.copy_file(
+                os.path.join(dir_path_static, rel_path),
+                os.path.join(dir_path_public, rel_path),
+            )
+        print(f"Loaded {len(output)} files.")
+        assets = None
+        if fingerprint:
+            assets = fingerprint_assets(dir_path_static, dir_path_public, output=output)
+            print(f"Fingerprinted {len(assets)} assets.")
+    else:
+        if shard is not None:
+            # one slice of the site, with its own output and manifest, for
+            # --merge-shards to combine
+            dest_dir = os.path.join(shards_path, shard.name)
+            print(f"Building shard {shard} into {dest_dir}...")
+            if full and os.path.exists(dest_dir):
+                shutil.rmtree(dest_dir)
+            manifest = BuildManifest.load(shard_manifest_path(dest_dir))
+            if full:
+                manifest = BuildManifest(manifest.path)
+            manifest.shard = str(shard)
+        elif publish or os.path.islink(dir_path_public):
+            # build next to the live site and swap it in when done; unchanged
+            # files are hardlinked over from the live generation. Once the
+            # site has been published every build goes this way, so the live
+            # generation is never written into and keeps its own manifest.
+            publisher = Publisher(dir_path_public, generations_path, keep_generations)
+            print("Staging a new generation of the public directory...")
+            dest_dir = publisher.stage(reuse=not full)
+            manifest = BuildManifest.load(publisher.manifest_path(dest_dir))
+        elif full:
+            print("Deleting public directory...")
+            if os.path.exists(dir_path_public):
+                shutil.rmtree(dir_path_public)
+            manifest = BuildManifest(manifest_path)
+        else:
+            manifest = BuildManifest.load(manifest_path)
 
-def main():
-    print("Deleting public directory...")
-    if os.path.exists(dir_path_public):
-        shutil.rmtree(dir_path_public)
+        print("Syncing static files to public directory...")
+        sync = sync_static(
+            dir_path_static,
+            dest_dir,
+            previous=manifest.assets,
+            link=link,
+            checksum=checksum,
+        )
+        manifest.assets = sync.files
+        print(
+            f"Copied {len(sync.copied)} files ({sync.bytes_copied} bytes), "
+            f"skipped {len(sync.skipped)} unchanged ({sync.bytes_skipped} bytes), "
+            f"removed {len(sync.removed)} stale."
+        )
 
-    print("Copying static files to public directory...")
-    copy_contents_from(dir_path_static, dir_path_public)
+        previous_assets = AssetMap.load(os.path.join(dest_dir, ASSET_MANIFEST_NAME))
+        assets = None
+        if fingerprint:
+            assets = fingerprint_assets(
+                dir_path_static, dest_dir, previous_assets, link=link
+            )
+            print(
+                f"Fingerprinted {len(assets)} assets, "
+                f"see {ASSET_MANIFEST_NAME} for their names."
+            )
+        elif len(previous_assets) > 0:
+            remove_fingerprinted(dest_dir, previous_assets)
 
     print("Generating content...")
-    generate_pages_recursive(dir_path_content, template_path, dir_path_public)
+    build_profile = BuildProfile() if profile or profile_json else None
+    if fragment_cache_entries > 0 and parse_cache_entries <= 0:
+        # the fragment cache only caches subtrees the parse cache shares
+        parse_cache_entries = fragment_cache_entries
+    parse_cache = None
+    if parse_cache_entries > 0:
+        parse_cache = ParseCache(parse_cache_entries, parse_cache_mb << 20)
+    trees = TreeCache(tree_cache_path, tree_cache_mb << 20) if tree_cache else None
+    fragments = None
+    if fragment_cache_entries > 0:
+        fragments = FragmentCache(fragment_cache_entries, fragment_cache_mb << 20)
+    stages = Pipeline(io_threads, queue_size) if pipeline else None
+    transformer = Transformer.from_names(plugins) if plugins else None
+    if transformer is not None:
+        print(f"Plugins: {', '.join(transformer.names)}")
+    try:
+        result = build_pages(
+            dir_path_content,
+            template_path,
+            dest_dir,
+            manifest,
+            jobs=jobs,
+            fail_fast=fail_fast,
+            profile=build_profile,
+            progress=Progress(),
+            parse_cache=parse_cache,
+            output=output,
+            tree_cache=trees,
+            assets=assets,
+            transformer=transformer,
+            fragment_cache=fragments,
+            pipeline=stages,
+            shard=shard,
+        )
+    except BuildError as e:
+        if publisher is not None:
+            # nothing is published, the live generation stays as it was
+            publisher.discard(dest_dir)
+        elif output is None:
+            manifest.save()
+        print(e)
+        return 1
+    if output is None:
+        manifest.save()
+
+    if gzip and output is None:
+        print("Precompressing public directory...")
+        compressed = precompress(dest_dir, min_size=gzip_min_size)
+        print(
+            f"Compressed {len(compressed.compressed)} files "
+            f"({compressed.bytes_in} -> {compressed.bytes_out} bytes), "
+            f"skipped {len(compressed.skipped)}, removed {len(compressed.removed)}."
+        )
+
+    if publisher is not None:
+        generation = publisher.publish(dest_dir)
+        print(f"Published {generation} as {dir_path_public}.")
+
+    for source, error in result.failed:
+        print(f"Failed to generate {source}: {error}")
+    print(
+        f"Rendered {len(result.rendered)} pages "
+        f"({result.unchanged} identical, not rewritten), "
+        f"skipped {len(result.skipped)} unchanged, "
+        f"removed {len(result.removed)} stale, failed {len(result.failed)}."
+    )
+    if parse_cache is not None:
+        print(
+            f"Parse cache: {parse_cache.hits} hits, {parse_cache.misses} misses "
+            f"({parse_cache.hit_rate:.1%} hit rate)."
+        )
+    if fragments is not None:
+        print(
+            f"Fragment cache: {fragments.hits} hits, {fragments.misses} misses "
+            f"({fragments.hit_rate:.1%} hit rate)."
+        )
+    if trees is not None:
+        stats = trees.stats()
+        print(
+            f"Tree cache: {stats['hits']} hits, {stats['misses']} misses; "
+            f"{stats['entries']} entries, {stats['bytes']} of "
+            f"{stats['max_bytes']} bytes, {stats['evictions']} evicted."
+        )
+    if stages is not None:
+        print(stages.summary())
+    if build_profile is not None:
+        if profile:
+            print(build_profile.summary(profile_top))
+        if profile_json:
+            with open(profile_json, "w") as f:
+                json.dump(build_profile.to_dict(profile_top), f, indent=2)
+                f.write("\n")
+            print(f"Wrote profile to {profile_json}")
+    return 1 if result.failed else 0
+
+
+def merge(
+    shard_dirs: list[str] | None = None,
+    link: str = "copy",
+    publish: bool = False,
+    keep_generations: int = 3,
+) -> int:
+    if not shard_dirs:
+        shard_dirs = find_shards(shards_path)
+    publisher = None
+    dest_dir = dir_path_public
+    manifest = BuildManifest(manifest_path)
+    if publish or os.path.islink(dir_path_public):
+        publisher = Publisher(dir_path_public, generations_path, keep_generations)
+        dest_dir = publisher.stage()
+        manifest = BuildManifest(publisher.manifest_path(dest_dir))
+    print(f"Merging {len(shard_dirs)} shards into {dest_dir}...")
+    try:
+        report = merge_shards(shard_dirs, dest_dir, manifest, link)
+    except ShardError as e:
+        if publisher is not None:
+            publisher.discard(dest_dir)
+        print(e)
+        return 1
+    manifest.save()
+    if publisher is not None:
+        generation = publisher.publish(dest_dir)
+        print(f"Published {generation} as {dir_path_public}.")
+    print(
+        f"Merged {len(report.shards)} shards: copied {len(report.copied)} files, "
+        f"skipped {len(report.skipped)} unchanged, removed {len(report.removed)} "
+        f"stale, {len(report.shared)} identical in several shards."
+    )
+    return 0
+
+
+def plugins_arg(text: str) -> list[str]:
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PLUGINS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown plugin {unknown[0]!r}, expected one of {', '.join(PLUGINS)}"
+        )
+    return names
+
+
+def shard_arg(text: str) -> Shard:
+    try:
+        return Shard.parse(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def rollback(keep_generations: int = 3) -> int:
+    publisher = Publisher(dir_path_public, generations_path, keep_generations)
+    try:
+        generation = publisher.rollback()
+    except PublishError as e:
+        print(e)
+        return 1
+    print(f"Rolled {dir_path_public} back to {generation}.")
+    return 0
+
+
+def watch(
+    jobs: int = 1,
+    link: str = "copy",
+    port: int = 8888,
+    interval: float = 0.5,
+    output: MemoryOutput | None = None,
+    plugins: list[str] | None = None,
+) -> int:
+    live_reload = LiveReload()
+    transformer = Transformer.from_names(plugins) if plugins else None
+    httpd = make_server(
+        port=port,
+        directory=dir_path_public,
+        index_refresh=0,
+        live_reload=live_reload,
+        store=output,
+    )
+    server_thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    server_thread.start()
+    poller = Poller(dir_path_content, dir_path_static, template_path)
+    print(f"Watching for changes, serving on http://localhost:{port} ...")
+
+    try:
+        while True:
+            time.sleep(interval)
+            changes = poller.poll()
+            if not changes:
+                continue
+            detected = time.perf_counter()
+            plan = plan_rebuild(
+                changes,
+                dir_path_content,
+                dir_path_static,
+                template_path,
+                dir_path_public,
+            )
+            report = apply_plan(
+                plan,
+                template_path,
+                dir_path_public,
+                jobs=jobs,
+                link=link,
+                output=output,
+                transformer=transformer,
+            )
+            httpd.file_index.refresh()
+            live_reload.notify()
+            latency = time.perf_counter() - detected
+
+            for change in changes:
+                removed = " (removed)" if change.removed else ""
+                print(f"  {change.kind}: {change.path}{removed}")
+            for source, error in report.failed:
+                print(f"Failed to generate {source}: {error}")
+            print(
+                f"Rebuilt {report.outputs} outputs in {report.seconds * 1000:.0f} ms, "
+                f"browsers notified after {latency * 1000:.0f} ms."
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Delete the public directory and rebuild every page",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="Number of worker processes for page generation (0 = all cores)",
+    )
+    parser.add_argument(
+        "--fail-fast",
+        action="store_true",
+        help="Abort the build on the first page that fails to generate",
+    )
+    parser.add_argument(
+        "--link",
+        choices=LINK_MODES,
+        default="copy",
+        help="How static files are placed in the public directory",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="Compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Write .gz siblings for compressible files in the public directory",
+    )
+    parser.add_argument(
+        "--gzip-min-size",
+        type=int,
+        default=GZIP_MIN_SIZE,
+        help="Smallest file size in bytes worth precompressing",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, serve the site and rebuild changed outputs live",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8888,
+        help="Port for the --watch and --memory server",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=0.5,
+        help="Seconds between change scans in --watch mode",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time each build stage and print a per-stage summary",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Write per-page and per-stage timings as JSON (implies profiling)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest pages listed in the profile",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="Cache parsed blocks and inline text repeated across pages, "
+        "up to ENTRIES per cache and worker (0 disables)",
+    )
+    parser.add_argument(
+        "--parse-cache-mb",
+        type=int,
+        default=32,
+        help="Source text size limit of each parse cache, in MB",
+    )
+    parser.add_argument(
+        "--fragment-cache",
+        type=int,
+        default=0,
+        metavar="ENTRIES",
+        help="Cache the rendered HTML of blocks repeated across pages by their "
+        "structural hash, up to ENTRIES per worker (0 disables); turns on "
+        "--parse-cache, which shares those blocks, if it isn't given",
+    )
+    parser.add_argument(
+        "--fragment-cache-mb",
+        type=int,
+        default=32,
+        help="Size limit of the fragment cache, in MB",
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Build into memory and serve the site from there on --port "
+        "instead of writing the public directory",
+    )
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Build into a staging generation and atomically swap the public "
+        "directory over to it when the build succeeds",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=3,
+        help="Previous generations kept for --rollback when publishing",
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Point the public directory back at the previous generation and exit",
+    )
+    parser.add_argument(
+        "--tree-cache",
+        action="store_true",
+        help=f"Keep parsed pages in {tree_cache_path} so unchanged markdown "
+        "is not parsed again, e.g. after a template change",
+    )
+    parser.add_argument(
+        "--tree-cache-mb",
+        type=int,
+        default=256,
+        help="Size limit of the tree cache, in MB",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="Also write static files under content-hashed names and point the "
+        "template, links and images at those, so they can be cached forever "
+        "(pages rebuilt by --watch keep the plain names)",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Discover, read, render and write pages in overlapping stages "
+        "joined by bounded queues, and print queue metrics",
+    )
+    parser.add_argument(
+        "--io-threads",
+        type=int,
+        default=IO_THREADS,
+        help="Reader and writer threads each for --pipeline",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=QUEUE_SIZE,
+        help="Pages each --pipeline queue holds before it blocks its producers",
+    )
+    parser.add_argument(
+        "--shard",
+        type=shard_arg,
+        metavar="I/N",
+        help=f"Build only the pages of shard I of N into {shards_path}, e.g. on "
+        "one of N machines; pages are assigned by a stable hash of their path",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        nargs="*",
+        metavar="DIR",
+        help=f"Combine the shard outputs (default: all in {shards_path}) into "
+        "the public directory and exit; fails on missing shards or collisions",
+    )
+    parser.add_argument(
+        "--plugins",
+        type=plugins_arg,
+        metavar="NAME[,NAME]",
+        help="Post-process every page with these plugins, fused into one pass "
+        f"over its nodes: {', '.join(PLUGINS)}; toc fills {{{{ Toc }}}} in the "
+        "template, --profile shows what each one costs",
+    )
+    args = parser.parse_args()
+    if args.rollback:
+        sys.exit(rollback(args.keep_generations))
+    if args.merge_shards is not None:
+        sys.exit(
+            merge(args.merge_shards, args.link, args.publish, args.keep_generations)
+        )
+    if args.shard is not None and (args.memory or args.publish or args.watch):
+        parser.error("--shard builds to disk for --merge-shards to publish")
+    if args.memory and (args.publish or args.gzip):
+        parser.error("--memory builds nothing on disk to --publish or --gzip")
+    if args.watch and not args.memory:
+        # watch rebuilds write in place, which would change a published
+        # generation behind its manifest's back
+        if args.publish or os.path.islink(dir_path_public):
+            parser.error("a published site can only be watched with --memory")
 
+    output = MemoryOutput(dir_path_public) if args.memory else None
 
-main()
+    status = main(
+        full=args.full,
+        jobs=args.jobs,
+        fail_fast=args.fail_fast,
+        link=args.link,
+        checksum=args.checksum,
+        gzip=args.gzip,
+        gzip_min_size=args.gzip_min_size,
+        profile=args.profile,
+        profile_json=args.profile_json,
+        profile_top=args.profile_top,
+        parse_cache_entries=args.parse_cache,
+        parse_cache_mb=args.parse_cache_mb,
+        output=output,
+        publish=args.publish,
+        keep_generations=args.keep_generations,
+        tree_cache=args.tree_cache,
+        tree_cache_mb=args.tree_cache_mb,
+        fingerprint=args.fingerprint,
+        pipeline=args.pipeline,
+        io_threads=args.io_threads,
+        queue_size=args.queue_size,
+        shard=args.shard,
+        plugins=args.plugins,
+        fragment_cache_entries=args.fragment_cache,
+        fragment_cache_mb=args.fragment_cache_mb,
+    )
+    if args.watch:
+        status = watch(
+            jobs=args.jobs,
+            link=args.link,
+            port=args.port,
+            interval=args.poll_interval,
+            output=output,
+            plugins=args.plugins,
+        )
+    elif output is not None and status == 0:
+        run(port=args.port, directory=dir_path_public, store=output)
+    sys.exit(status)
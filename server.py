@@ -1,32 +1,444 @@
 import os
 import argparse
+import email.utils
+import fnmatch
+import io
+import signal
+import socket
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from http import HTTPStatus
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 
+from src.file_index import FileIndex
+from src.output import MemoryOutput
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    if not accept_encoding:
+        return False
+    # q of each listed coding; an explicit gzip wins over the * wildcard
+    weights = {}
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.strip().partition(";")
+        name = name.strip().lower()
+        if name not in ("gzip", "*") or name in weights:
+            continue
+        weight = 1.0
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+class CachePolicy:
+    def __init__(self, rules: list[tuple[str, str]] | None = None):
+        # (glob over the URL path, Cache-Control value); first match wins
+        self.rules = rules or []
+
+    @classmethod
+    def parse(cls, specs: list[str]) -> "CachePolicy":
+        rules = []
+        for spec in specs:
+            pattern, separator, value = spec.partition("=")
+            if separator == "" or not pattern or not value:
+                raise ValueError(f"Invalid cache rule, expected PATTERN=VALUE: {spec}")
+            rules.append((pattern, value))
+        return cls(rules)
+
+    def lookup(self, url_path: str) -> str | None:
+        for pattern, value in self.rules:
+            if fnmatch.fnmatchcase(url_path, pattern):
+                return value
+        return None
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    f'<script>new EventSource("{LIVE_RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+).encode()
+LIVE_RELOAD_HEARTBEAT = 15.0
+
+
+class LiveReload:
+    def __init__(self):
+        self.version = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def notify(self) -> None:
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.version != version or self.closed, timeout
+            )
+            return self.version
+
+    def close(self) -> None:
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+def send_reload_events(live_reload: LiveReload, version: int, request) -> None:
+    while not live_reload.closed:
+        latest = live_reload.wait(version, LIVE_RELOAD_HEARTBEAT)
+        if live_reload.closed:
+            break
+        if latest != version:
+            version = latest
+            request.sendall(b"data: reload\n\n")
+        else:
+            request.sendall(b": ping\n\n")
+
+
+def inject_live_reload(html: bytes) -> bytes:
+    position = html.rfind(b"</body>")
+    if position == -1:
+        return html + LIVE_RELOAD_SCRIPT
+    return html[:position] + LIVE_RELOAD_SCRIPT + html[position:]
+
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # idle keep-alive connections are dropped after the server's timeout
+        self.timeout = getattr(self.server, "idle_timeout", None)
+        super().setup()
+
+    def handle_one_request(self):
+        self.vary_encoding = False
+        super().handle_one_request()
+
+    def do_GET(self):
+        live_reload = getattr(self.server, "live_reload", None)
+        url_path = urllib.parse.urlsplit(self.path).path
+        if live_reload is not None and url_path == LIVE_RELOAD_PATH:
+            self.stream_reload_events(live_reload)
+            return
+        super().do_GET()
+
+    def stream_reload_events(self, live_reload: LiveReload) -> None:
+        # server-sent events: one "reload" message per rebuild. Each open tab
+        # keeps its stream for as long as it is open, so streams get threads
+        # of their own, up to the server's max_streams, and never hold the
+        # workers that answer other requests. The stream has no length, so
+        # the connection closes when it ends.
+        if not self.server.streams.acquire(blocking=False):
+            self.send_error(
+                HTTPStatus.SERVICE_UNAVAILABLE, "Too many live reload streams"
+            )
+            return
+        version = live_reload.version
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.close_connection = True
+            self.end_headers()
+        except BaseException:
+            self.server.streams.release()
+            raise
+        self.server.detach_stream(
+            self.request, partial(send_reload_events, live_reload, version)
+        )
+
+    def send_head(self):
+        file_index = getattr(self.server, "file_index", None)
+        if file_index is None:
+            return super().send_head()
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        entry = file_index.lookup(url_path)
+        if entry is None and not file_index.on_disk:
+            return self.send_memory_miss(file_index, url_path)
+        if entry is None:
+            # directory redirects, listings and 404s
+            return super().send_head()
+
+        live_reload = getattr(self.server, "live_reload", None)
+        if live_reload is not None and entry.content_type == "text/html":
+            return self.send_live_reload_page(entry)
+
+        variant = entry
+        if entry.gzip is not None:
+            # the response depends on Accept-Encoding whichever variant we send
+            self.vary_encoding = True
+            if accepts_gzip(self.headers.get("Accept-Encoding")):
+                variant = entry.gzip
+
+        if self.is_not_modified(variant):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_validators(url_path, variant)
+            self.end_headers()
+            return None
+
+        try:
+            f = variant.open()
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        try:
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", entry.content_type)
+            if variant is not entry:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(self.content_length(f, variant)))
+            self.send_validators(url_path, variant)
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def content_length(self, f, entry) -> int:
+        # the size on disk now, in case the file changed since it was indexed
+        if isinstance(f, io.BytesIO):
+            return entry.size
+        return os.fstat(f.fileno()).st_size
+
+    def send_memory_miss(self, store, url_path: str):
+        # an in-memory store has no directory to fall back on: redirect
+        # directories to their slashed form, otherwise 404
+        if not url_path.endswith("/") and store.is_dir(url_path):
+            parts = urllib.parse.urlsplit(self.path)
+            location = urllib.parse.urlunsplit(
+                (parts[0], parts[1], parts[2] + "/", parts[3], parts[4])
+            )
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", location)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+        return None
+
+    def send_live_reload_page(self, entry):
+        try:
+            with entry.open() as f:
+                body = inject_live_reload(f.read())
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", entry.content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def send_validators(self, url_path: str, entry) -> None:
+        self.send_header("ETag", entry.etag)
+        self.send_header("Last-Modified", self.date_time_string(int(entry.mtime)))
+        cache_control = self.server.cache_policy.lookup(url_path)
+        if cache_control is not None:
+            self.send_header("Cache-Control", cache_control)
+
+    def is_not_modified(self, entry) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return int(entry.mtime) <= since.timestamp()
+
     def end_headers(self):
+        if self.vary_encoding:
+            self.send_header("Vary", "Accept-Encoding")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Methods", "GET, OPTIONS")
         self.send_header("Access-Control-Allow-Headers", "*")
+        if getattr(self.server, "shutting_down", False):
+            self.send_header("Connection", "close")
+            self.close_connection = True
         super().end_headers()
 
     def do_OPTIONS(self):
         self.send_response(200, "OK")
+        self.send_header("Content-Length", "0")
         self.end_headers()
 
 
+class ThreadPoolHTTPServer(HTTPServer):
+    def __init__(
+        self,
+        server_address,
+        RequestHandlerClass,
+        workers: int = 16,
+        idle_timeout: float = 5.0,
+        file_index: FileIndex | MemoryOutput | None = None,
+        cache_policy: CachePolicy | None = None,
+        live_reload: LiveReload | None = None,
+        max_streams: int = 64,
+    ):
+        super().__init__(server_address, RequestHandlerClass)
+        self.workers = workers
+        self.idle_timeout = idle_timeout
+        self.file_index = file_index
+        self.cache_policy = cache_policy or CachePolicy()
+        self.live_reload = live_reload
+        self.shutting_down = False
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="http-worker"
+        )
+        # at most `workers` connections wait for a free worker; beyond that the
+        # accept loop blocks and new clients queue in the kernel's listen backlog
+        self.slots = threading.BoundedSemaphore(workers * 2)
+        self.connections: set[socket.socket] = set()
+        self.connections_lock = threading.Lock()
+        # long-lived responses, each on a thread of its own instead of a worker
+        self.streams = threading.BoundedSemaphore(max_streams)
+        self.detached: set[socket.socket] = set()
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        with self.connections_lock:
+            self.connections.add(request)
+        self.executor.submit(self.process_request_worker, request, client_address)
+
+    def process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.connections_lock:
+                detached = request in self.detached
+                if not detached:
+                    self.connections.discard(request)
+            if not detached:
+                self.shutdown_request(request)
+            self.slots.release()
+
+    def detach_stream(self, request, stream) -> None:
+        # called by a handler holding one of self.streams once it has sent the
+        # headers: stream(request) writes the rest on a new thread, and the
+        # worker returns to the pool without closing the connection
+        with self.connections_lock:
+            self.detached.add(request)
+        threading.Thread(
+            target=self.stream_worker,
+            args=(request, stream),
+            name="http-stream",
+            daemon=True,
+        ).start()
+
+    def stream_worker(self, request, stream) -> None:
+        try:
+            stream(request)
+        except OSError:
+            pass
+        finally:
+            with self.connections_lock:
+                self.connections.discard(request)
+                self.detached.discard(request)
+            self.shutdown_request(request)
+            self.streams.release()
+
+    def server_close(self):
+        # stop reading from idle keep-alive connections so their workers exit;
+        # requests already being answered still get to write their response
+        self.shutting_down = True
+        super().server_close()
+        if self.file_index is not None:
+            self.file_index.stop()
+        if self.live_reload is not None:
+            self.live_reload.close()
+        with self.connections_lock:
+            connections = list(self.connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        self.executor.shutdown(wait=True)
+
+
+def make_server(
+    port=8000,
+    directory=None,
+    server_class=ThreadPoolHTTPServer,
+    handler_class=CORSHTTPRequestHandler,
+    workers=16,
+    idle_timeout=5.0,
+    host="",
+    cache_policy=None,
+    index_refresh=2.0,
+    live_reload=None,
+    store=None,
+    max_streams=64,
+):
+    directory = directory or os.getcwd()
+    handler = partial(handler_class, directory=directory)
+    # an in-memory build output is served as is, without reading the disk
+    file_index = store if store is not None else FileIndex(directory)
+    httpd = server_class(
+        (host, port),
+        handler,
+        workers=workers,
+        idle_timeout=idle_timeout,
+        file_index=file_index,
+        cache_policy=cache_policy,
+        live_reload=live_reload,
+        max_streams=max_streams,
+    )
+    if index_refresh and store is None:
+        file_index.start_auto_refresh(index_refresh)
+    return httpd
+
+
 def run(
-    server_class=HTTPServer,
+    server_class=ThreadPoolHTTPServer,
     handler_class=CORSHTTPRequestHandler,
     port=8000,
     directory=None,
+    **server_options,
 ):
-    if directory:  # Change the current working directory if directory is specified
-        os.chdir(directory)
-    server_address = ("", port)
-    httpd = server_class(server_address, handler_class)
-    print(f"Serving HTTP on http://localhost:{port} from directory '{directory}'...")
-    httpd.serve_forever()
+    httpd = make_server(
+        port=port,
+        directory=directory,
+        server_class=server_class,
+        handler_class=handler_class,
+        **server_options,
+    )
+
+    def stop(signum, frame):
+        # shutdown() blocks until serve_forever returns, so it can't run on
+        # the thread that is inside serve_forever
+        threading.Thread(target=httpd.shutdown).start()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    print(
+        f"Serving HTTP on http://localhost:{port} from directory '{directory}' "
+        f"with {httpd.workers} workers..."
+    )
+    try:
+        httpd.serve_forever()
+    finally:
+        httpd.server_close()
+        print("Server stopped.")
 
 
 if __name__ == "__main__":
@@ -35,6 +447,36 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--workers", type=int, help="Number of request worker threads", default=16
+    )
+    parser.add_argument(
+        "--keepalive-timeout",
+        type=float,
+        help="Seconds an idle keep-alive connection is kept open",
+        default=5.0,
+    )
+    parser.add_argument(
+        "--cache-control",
+        action="append",
+        default=[],
+        metavar="PATTERN=VALUE",
+        help="Cache-Control for URL paths matching a glob, e.g. "
+        "'/images/*=max-age=31536000, immutable'; first match wins",
+    )
+    parser.add_argument(
+        "--index-refresh",
+        type=float,
+        help="Seconds between rescans of the served directory (0 disables)",
+        default=2.0,
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    run(
+        port=args.port,
+        directory=args.dir,
+        workers=args.workers,
+        idle_timeout=args.keepalive_timeout,
+        cache_policy=CachePolicy.parse(args.cache_control),
+        index_refresh=args.index_refresh,
+    )
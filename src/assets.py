@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import posixpath
+import re
+
+from src.manifest import hash_file
+from src.output import DiskOutput, OutputBackend
+from src.static_sync import list_files
+from src.template import Template
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+FINGERPRINT_LENGTH = 8
+# href="..." / src='...' attributes in literal template HTML
+REFERENCE_PATTERN = re.compile(r"""(\b(?:href|src)\s*=\s*)(["'])(.*?)\2""")
+
+
+def fingerprint_name(rel_path: str, digest: str) -> str:
+    # "css/index.css" -> "css/index.3f9a1c2b.css"
+    head, tail = posixpath.split(rel_path)
+    stem, ext = posixpath.splitext(tail)
+    if stem == "":
+        stem, ext = tail, ""
+    return posixpath.join(head, f"{stem}.{digest[:FINGERPRINT_LENGTH]}{ext}")
+
+
+class AssetMap:
+    def __init__(self, assets: dict[str, str] | None = None):
+        # "/index.css" -> "/index.3f9a1c2b.css"
+        self.assets: dict[str, str] = dict(assets or {})
+        self._templates: dict[int, tuple[Template, Template]] = {}
+
+    @property
+    def digest(self) -> str:
+        # changes whenever any asset does, so everything rendered with the
+        # previous names is known to be stale
+        data = json.dumps(self.assets, sort_keys=True).encode()
+        return hashlib.sha256(data).hexdigest()[:16]
+
+    def url(self, url: str) -> str:
+        # only root-relative references are rewritten; a query string or
+        # fragment is carried over to the fingerprinted name
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        end = len(url)
+        for separator in "?#":
+            index = url.find(separator)
+            if index != -1:
+                end = min(end, index)
+        fingerprinted = self.assets.get(url[:end])
+        if fingerprinted is None:
+            return url
+        return fingerprinted + url[end:]
+
+    def rewrite_html(self, text: str) -> str:
+        return REFERENCE_PATTERN.sub(
+            lambda m: f"{m.group(1)}{m.group(2)}{self.url(m.group(3))}{m.group(2)}",
+            text,
+        )
+
+    def rewrite_template(self, template: Template) -> Template:
+        # load_template hands out one Template per file version, so rewriting
+        # once per Template object is enough
+        cached = self._templates.get(id(template))
+        if cached is not None and cached[0] is template:
+            return cached[1]
+        rewritten = template.map_segments(self.rewrite_html)
+        self._templates[id(template)] = (template, rewritten)
+        return rewritten
+
+    def to_dict(self) -> dict:
+        return {"assets": self.assets}
+
+    @classmethod
+    def load(cls, path: str) -> "AssetMap":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls()
+        return cls(data.get("assets", {}))
+
+    def __len__(self):
+        return len(self.assets)
+
+    def __repr__(self):
+        return f"AssetMap({len(self.assets)} assets, {self.digest})"
+
+
+def fingerprint_assets(
+    static_dir: str,
+    dest_dir: str,
+    previous: AssetMap | None = None,
+    output: OutputBackend | None = None,
+    link: str = "copy",
+) -> AssetMap:
+    # place a content-addressed copy of every static file next to the
+    # original; a name that already exists already holds the same bytes
+    if output is None:
+        output = DiskOutput(dest_dir)
+    assets = AssetMap()
+    for rel_path in list_files(static_dir):
+        src_path = os.path.join(static_dir, rel_path)
+        url_path = rel_path.replace(os.sep, "/")
+        fingerprinted = fingerprint_name(url_path, hash_file(src_path))
+        assets.assets["/" + url_path] = "/" + fingerprinted
+        dest_path = os.path.join(dest_dir, *fingerprinted.split("/"))
+        if not output.exists(dest_path):
+            output.copy_file(src_path, dest_path, link)
+
+    if previous is not None:
+        remove_fingerprinted(dest_dir, previous, keep=assets, output=output)
+    manifest = json.dumps(assets.to_dict(), indent=2, sort_keys=True) + "\n"
+    output.write_bytes(os.path.join(dest_dir, ASSET_MANIFEST_NAME), manifest.encode())
+    return assets
+
+
+def remove_fingerprinted(
+    dest_dir: str,
+    assets: AssetMap,
+    keep: AssetMap | None = None,
+    output: OutputBackend | None = None,
+) -> list[str]:
+    if output is None:
+        output = DiskOutput(dest_dir)
+    kept = set(keep.assets.values()) if keep is not None else set()
+    removed = []
+    for fingerprinted in sorted(set(assets.assets.values()) - kept):
+        output.remove(os.path.join(dest_dir, *fingerprinted.lstrip("/").split("/")))
+        removed.append(fingerprinted)
+    if keep is None:
+        output.remove(os.path.join(dest_dir, ASSET_MANIFEST_NAME))
+    return removed
@@ -0,0 +1,573 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Iterable
+
+from src.assets import AssetMap
+from src.fragments import FragmentCache
+from src.manifest import BuildManifest, ManifestEntry, hash_file
+from src.lru import DEFAULT_MAX_BYTES
+from src.node_utils import (
+    configure_assets,
+    configure_fragment_cache,
+    configure_parse_cache,
+    configure_transforms,
+    configure_tree_cache,
+    fragment_cache_counts,
+    generate_page,
+    iter_pages,
+    parse_cache_counts,
+    render_markdown,
+    render_page,
+    tree_cache_counts,
+)
+from src.output import DiskOutput, OutputBackend
+from src.pipeline import Pipeline, PipelineStopped, start_stage
+from src.profiling import BuildProfile, Progress, StageTimer
+from src.shard import Shard
+from src.transform import Transformer
+from src.tree_cache import TreeCache
+
+
+class BuildResult:
+    def __init__(self):
+        self.rendered: list[str] = []
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        self.failed: list[tuple[str, str]] = []
+        # rendered pages whose output was byte-identical and left untouched
+        self.unchanged = 0
+
+    def __repr__(self):
+        return (
+            f"BuildResult(rendered={len(self.rendered)}, "
+            f"skipped={len(self.skipped)}, removed={len(self.removed)}, "
+            f"failed={len(self.failed)}, unchanged={self.unchanged})"
+        )
+
+
+class BuildError(Exception):
+    pass
+
+
+class ParseCache:
+    def __init__(self, max_entries: int, max_bytes: int = DEFAULT_MAX_BYTES):
+        # every worker process gets its own caches of this size; hits and
+        # misses are summed here as pages come back
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return f"ParseCache(hits={self.hits}, misses={self.misses})"
+
+
+def resolve_jobs(jobs: int | None) -> int:
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+
+class PageOutcome:
+    __slots__ = (
+        "error",
+        "stages",
+        "plugins",
+        "cache_hits",
+        "cache_misses",
+        "tree_hits",
+        "tree_misses",
+        "fragment_hits",
+        "fragment_misses",
+        "data",
+        "unchanged",
+    )
+
+    def __init__(self):
+        self.error: str | None = None
+        self.stages: dict[str, float] | None = None
+        self.plugins: dict[str, float] | None = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.tree_hits = 0
+        self.tree_misses = 0
+        self.fragment_hits = 0
+        self.fragment_misses = 0
+        # the rendered page, when it has to be stored by the parent process
+        self.data: bytes | None = None
+        # the output on disk already held exactly this page
+        self.unchanged = False
+
+
+def _generate_page_task(
+    task: tuple[str, str, str],
+    profile: bool = False,
+    capture: bool = False,
+    markdown: str | None = None,
+) -> PageOutcome:
+    # runs in a worker process; errors are returned so one bad page
+    # doesn't tear down the pool, and stage timings and parse cache counts
+    # travel back with them. Given the markdown, the page is only rendered:
+    # the pipeline reads and writes it on I/O threads.
+    from_path, template_path, dest_path = task
+    outcome = PageOutcome()
+    timer = StageTimer() if profile else None
+    hits, misses = parse_cache_counts()
+    tree_hits, tree_misses = tree_cache_counts()
+    fragment_hits, fragment_misses = fragment_cache_counts()
+    try:
+        if markdown is not None:
+            page = "".join(render_markdown(markdown, template_path, timer))
+            outcome.data = page.encode()
+        elif capture:
+            page = "".join(render_page(from_path, template_path, timer))
+            outcome.data = page.encode()
+            if timer is not None:
+                timer.mark("write")
+        else:
+            # the parent has made the output directories already
+            output = DiskOutput(create_dirs=False)
+            generate_page(from_path, template_path, dest_path, timer, output)
+            outcome.unchanged = output.unchanged > 0
+        if timer is not None:
+            outcome.stages = timer.stages
+            outcome.plugins = timer.plugins
+    except Exception as e:
+        outcome.error = f"{type(e).__name__}: {e}"
+    after_hits, after_misses = parse_cache_counts()
+    outcome.cache_hits = after_hits - hits
+    outcome.cache_misses = after_misses - misses
+    after_hits, after_misses = tree_cache_counts()
+    outcome.tree_hits = after_hits - tree_hits
+    outcome.tree_misses = after_misses - tree_misses
+    after_hits, after_misses = fragment_cache_counts()
+    outcome.fragment_hits = after_hits - fragment_hits
+    outcome.fragment_misses = after_misses - fragment_misses
+    return outcome
+
+
+def _render_batch(
+    pages: list[tuple[tuple, str]], profile: bool
+) -> list[PageOutcome]:
+    return [
+        _generate_page_task(task, profile, markdown=markdown)
+        for task, markdown in pages
+    ]
+
+
+def _failed_outcome(error: Exception) -> PageOutcome:
+    outcome = PageOutcome()
+    outcome.error = f"{type(error).__name__}: {error}"
+    return outcome
+
+
+def _read_task(task: tuple[str, str, str]) -> tuple[str | None, PageOutcome | None]:
+    try:
+        with open(task[0], "r") as f:
+            return f.read(), None
+    except Exception as e:
+        return None, _failed_outcome(e)
+
+
+def _worker_args(caches: tuple, assets, transformer) -> tuple:
+    # workers build their own caches from these; the objects passed in only
+    # collect the counts that come back
+    parse_cache, tree_cache, fragment_cache = caches
+    return (
+        (parse_cache.max_entries, parse_cache.max_bytes) if parse_cache else (0,),
+        (tree_cache.directory, tree_cache.max_bytes) if tree_cache else (None,),
+        assets.assets if assets else None,
+        transformer.names if transformer else None,
+        (
+            (fragment_cache.max_entries, fragment_cache.max_bytes)
+            if fragment_cache
+            else (0,)
+        ),
+    )
+
+
+def _configure_worker(
+    parse_cache_args: tuple,
+    tree_cache_args: tuple,
+    assets: dict[str, str] | None = None,
+    plugins: list[str] | None = None,
+    fragment_cache_args: tuple = (0,),
+) -> None:
+    # assets first: the tree cache keys its entries by the mapping
+    configure_assets(assets)
+    configure_parse_cache(*parse_cache_args)
+    configure_tree_cache(*tree_cache_args)
+    configure_transforms(plugins)
+    configure_fragment_cache(*fragment_cache_args)
+
+
+def _collect(task, outcome: PageOutcome, caches, profile, output) -> str | None:
+    parse_cache, tree_cache, fragment_cache = caches
+    if outcome.stages is not None:
+        profile.record(task[0], outcome.stages, outcome.plugins)
+    if parse_cache is not None:
+        parse_cache.hits += outcome.cache_hits
+        parse_cache.misses += outcome.cache_misses
+    if tree_cache is not None:
+        tree_cache.hits += outcome.tree_hits
+        tree_cache.misses += outcome.tree_misses
+    if fragment_cache is not None:
+        fragment_cache.hits += outcome.fragment_hits
+        fragment_cache.misses += outcome.fragment_misses
+    if outcome.data is not None:
+        output.write_bytes(task[2], outcome.data)
+    elif outcome.unchanged:
+        output.unchanged += 1
+    return outcome.error
+
+
+def render_pages(
+    tasks: list[tuple[str, str, str]],
+    jobs: int = 1,
+    fail_fast: bool = False,
+    profile: BuildProfile | None = None,
+    parse_cache: ParseCache | None = None,
+    output: OutputBackend | None = None,
+    tree_cache: TreeCache | None = None,
+    assets: AssetMap | None = None,
+    transformer: Transformer | None = None,
+    fragment_cache: FragmentCache | None = None,
+):
+    # yields (task, error) in task order regardless of which worker finished
+    # first; pages bound for an in-memory output come back as bytes
+    jobs = resolve_jobs(jobs)
+    capture = output is not None and not output.on_disk
+    generate = partial(
+        _generate_page_task, profile=profile is not None, capture=capture
+    )
+    if output is None:
+        output = DiskOutput()
+    if not capture:
+        output.prepare_dirs(task[2] for task in tasks)
+    caches = (parse_cache, tree_cache, fragment_cache)
+    worker_args = _worker_args(caches, assets, transformer)
+    if jobs == 1 or len(tasks) <= 1:
+        configured = any(
+            option is not None
+            for option in (*caches, assets, transformer)
+        )
+        if configured:
+            _configure_worker(*worker_args)
+        try:
+            for task in tasks:
+                error = _collect(task, generate(task), caches, profile, output)
+                yield task, error
+                if error is not None and fail_fast:
+                    return
+        finally:
+            if configured:
+                _configure_worker((0,), (None,))
+        return
+
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_configure_worker, initargs=worker_args
+    ) as executor:
+        results = executor.map(generate, tasks, chunksize=chunksize)
+        for task, outcome in zip(tasks, results):
+            error = _collect(task, outcome, caches, profile, output)
+            yield task, error
+            if error is not None and fail_fast:
+                executor.shutdown(wait=True, cancel_futures=True)
+                return
+
+
+def render_pipelined(
+    tasks: Iterable[tuple[str, str, str]],
+    pipeline: Pipeline,
+    jobs: int = 1,
+    fail_fast: bool = False,
+    profile: BuildProfile | None = None,
+    parse_cache: ParseCache | None = None,
+    output: OutputBackend | None = None,
+    tree_cache: TreeCache | None = None,
+    assets: AssetMap | None = None,
+    transformer: Transformer | None = None,
+    fragment_cache: FragmentCache | None = None,
+):
+    # render_pages as overlapping stages joined by bounded queues:
+    #   discover (consumes `tasks`) -> read threads -> render (worker
+    #   processes) -> write threads -> this generator
+    # so reading, parsing and writing run side by side and only a bounded
+    # number of pages is in flight at any time. Yields (task, error) in
+    # completion order.
+    jobs = resolve_jobs(jobs)
+    if output is None:
+        output = DiskOutput()
+    io_threads = pipeline.io_threads
+    stop = threading.Event()
+    discovered = pipeline.make_queue("discover", stop)
+    read = pipeline.make_queue("read", stop)
+    rendered = pipeline.make_queue("render", stop)
+    written = pipeline.make_queue("write", stop)
+    caches = (parse_cache, tree_cache, fragment_cache)
+    worker_args = _worker_args(caches, assets, transformer)
+    profiled = profile is not None
+    executor = None
+    if jobs > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_configure_worker, initargs=worker_args
+        )
+    # the last thread of a stage to finish passes the end on downstream
+    remaining = {"read": io_threads, "write": io_threads}
+    remaining_lock = threading.Lock()
+
+    def finish(stage: str, queue, count: int) -> None:
+        with remaining_lock:
+            remaining[stage] -= 1
+            last = remaining[stage] == 0
+        if last:
+            for _ in range(count):
+                queue.put(None)
+
+    def discover_stage():
+        for task in tasks:
+            discovered.put(task)
+        for _ in range(io_threads):
+            discovered.put(None)
+
+    def read_stage():
+        while (task := discovered.get()) is not None:
+            start = time.perf_counter()
+            markdown, failed = _read_task(task)
+            read.put((task, markdown, failed, time.perf_counter() - start))
+        finish("read", read, 1)
+
+    def render_stage():
+        configured = executor is None and any(
+            option is not None
+            for option in (*caches, assets, transformer)
+        )
+        if configured:
+            _configure_worker(*worker_args)
+        try:
+            while True:
+                items = read.get_batch(pipeline.batch_size)
+                done = items[-1] is None
+                if done:
+                    items.pop()
+                if items:
+                    pages = [
+                        (task, markdown)
+                        for task, markdown, failed, _ in items
+                        if failed is None
+                    ]
+                    if executor is None:
+                        result = _render_batch(pages, profiled)
+                    else:
+                        result = executor.submit(_render_batch, pages, profiled)
+                    # a full queue holds back submissions, which bounds the
+                    # pages the worker processes have in flight
+                    rendered.put((items, result))
+                if done:
+                    break
+        finally:
+            if configured:
+                _configure_worker((0,), (None,))
+        for _ in range(io_threads):
+            rendered.put(None)
+
+    def write_stage():
+        while (item := rendered.get()) is not None:
+            items, result = item
+            if isinstance(result, Future):
+                try:
+                    result = result.result()
+                except Exception as e:
+                    # e.g. a worker process died: the whole batch fails
+                    result = [_failed_outcome(e) for _ in items]
+            outcomes = iter(result)
+            for task, _, failed, read_seconds in items:
+                outcome = failed if failed is not None else next(outcomes)
+                start = time.perf_counter()
+                if outcome.data is not None:
+                    try:
+                        output.write_bytes(task[2], outcome.data)
+                    except OSError as e:
+                        outcome.error = f"{type(e).__name__}: {e}"
+                    outcome.data = None
+                if outcome.stages is not None:
+                    outcome.stages["read"] += read_seconds
+                    outcome.stages["write"] += time.perf_counter() - start
+                written.put((task, outcome))
+        finish("write", written, 1)
+
+    errors: list[BaseException] = []
+    stages = [discover_stage, render_stage]
+    stages += [read_stage, write_stage] * io_threads
+    start = time.perf_counter()
+    threads = [start_stage(stage, stop, errors) for stage in stages]
+    try:
+        while (item := written.get()) is not None:
+            task, outcome = item
+            error = _collect(task, outcome, caches, profile, output)
+            yield task, error
+            if error is not None and fail_fast:
+                return
+    except PipelineStopped:
+        # a stage failed outside of any one page, e.g. while discovering
+        raise errors[0]
+    finally:
+        # also reached when the consumer stops early: unblock every stage
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        pipeline.seconds += time.perf_counter() - start
+
+
+def remove_stale_outputs(
+    manifest: BuildManifest,
+    seen: set[str],
+    dest_dir_path: str,
+    output: OutputBackend | None = None,
+) -> list[str]:
+    if output is None:
+        output = DiskOutput(dest_dir_path)
+    removed = []
+    for source in sorted(set(manifest.pages) - seen):
+        entry = manifest.remove(source)
+        output.remove(os.path.join(dest_dir_path, entry.output))
+        removed.append(source)
+    return removed
+
+
+def build_pages(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    manifest: BuildManifest | None = None,
+    jobs: int = 1,
+    fail_fast: bool = False,
+    profile: BuildProfile | None = None,
+    progress: Progress | None = None,
+    parse_cache: ParseCache | None = None,
+    output: OutputBackend | None = None,
+    tree_cache: TreeCache | None = None,
+    assets: AssetMap | None = None,
+    transformer: Transformer | None = None,
+    fragment_cache: FragmentCache | None = None,
+    pipeline: Pipeline | None = None,
+    shard: Shard | None = None,
+) -> BuildResult:
+    if manifest is None:
+        manifest = BuildManifest(path="")
+    if output is None:
+        output = DiskOutput(dest_dir_path)
+    result = BuildResult()
+    template_hash = hash_file(template_path)
+    if assets is not None:
+        # pages carry asset URLs, so they are stale once any asset changes
+        template_hash = f"{template_hash}+{assets.digest}"
+    if transformer is not None:
+        # and they are redone when the plugins change
+        template_hash = f"{template_hash}+{transformer.digest}"
+    seen = set()
+    pending = {}
+
+    def stale_tasks():
+        for from_path, dest_path in iter_pages(dir_path_content, dest_dir_path):
+            source = os.path.relpath(from_path, dir_path_content)
+            if shard is not None and not shard.owns(source):
+                # another shard's page
+                continue
+            output_path = os.path.relpath(dest_path, dest_dir_path)
+            seen.add(source)
+
+            entry = manifest.get(source)
+            source_hash, stat = manifest.source_hash(source, from_path)
+            if (
+                entry is not None
+                and entry.source_hash == source_hash
+                and entry.template_hash == template_hash
+                and entry.output == output_path
+                and output.exists(dest_path)
+            ):
+                result.skipped.append(source)
+                # refresh the stat fast path in case only the mtime moved
+                entry.size, entry.mtime_ns = stat.st_size, stat.st_mtime_ns
+                continue
+
+            pending[from_path] = (
+                source,
+                ManifestEntry(
+                    source_hash=source_hash,
+                    template_hash=template_hash,
+                    output=output_path,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                ),
+            )
+            if pipeline is not None and progress is not None:
+                progress.total += 1
+            yield (from_path, template_path, dest_path)
+
+    options = (
+        jobs,
+        fail_fast,
+        profile,
+        parse_cache,
+        output,
+        tree_cache,
+        assets,
+        transformer,
+        fragment_cache,
+    )
+    if pipeline is None:
+        tasks = list(stale_tasks())
+        if progress is not None:
+            progress.start(len(tasks))
+        pages = render_pages(tasks, *options)
+    else:
+        # pages are discovered while earlier ones render, so the progress
+        # total grows as the build goes
+        if progress is not None:
+            progress.start(0)
+        pages = render_pipelined(stale_tasks(), pipeline, *options)
+    start = time.perf_counter()
+    unchanged = output.unchanged
+    try:
+        for (from_path, _, _), error in pages:
+            if progress is not None:
+                progress.update()
+            source, entry = pending.pop(from_path)
+            if error is not None:
+                # forget the old entry so the page is retried on the next build
+                manifest.remove(source)
+                result.failed.append((source, error))
+                if fail_fast:
+                    raise BuildError(f"Failed to generate {source}: {error}")
+                continue
+            manifest.set(source, entry)
+            result.rendered.append(source)
+    finally:
+        # stops the workers and pipeline threads right away on fail_fast
+        pages.close()
+    if pipeline is not None:
+        # pipelined pages complete out of order
+        result.rendered.sort()
+        result.failed.sort()
+    result.unchanged = output.unchanged - unchanged
+    if profile is not None:
+        profile.seconds += time.perf_counter() - start
+    if progress is not None:
+        progress.finish()
+    if tree_cache is not None:
+        tree_cache.evict()
+
+    result.removed = remove_stale_outputs(manifest, seen, dest_dir_path, output)
+    return result
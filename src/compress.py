@@ -0,0 +1,132 @@
+import gzip
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".js", ".svg", ".json", ".txt", ".xml")
+GZIP_SUFFIX = ".gz"
+GZIP_MIN_SIZE = 1024
+GZIP_THREADS = 8
+
+
+class CompressReport:
+    def __init__(self):
+        self.compressed: list[str] = []
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def __repr__(self):
+        return (
+            f"CompressReport(compressed={len(self.compressed)} "
+            f"({self.bytes_in} -> {self.bytes_out} bytes), "
+            f"skipped={len(self.skipped)}, removed={len(self.removed)})"
+        )
+
+
+def is_compressible(path: str) -> bool:
+    return path.endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress_file(path: str, level: int = 9) -> tuple[int, int] | None:
+    # writes path.gz stamped with the source mtime, so an unchanged source can
+    # be recognised later without reading either file; returns None (and no
+    # .gz) when compression doesn't pay off
+    gz_path = path + GZIP_SUFFIX
+    stat = os.stat(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    compressed = gzip.compress(data, compresslevel=level, mtime=0)
+    if len(compressed) >= len(data):
+        if os.path.exists(gz_path):
+            os.remove(gz_path)
+        return None
+    tmp_path = gz_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compressed)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, gz_path)
+    return len(data), len(compressed)
+
+
+def is_own_gzip(path: str, mtime_ns: int | None = None) -> bool:
+    # True if path.gz was written by compress_file for path as it was at
+    # mtime_ns (its current mtime by default); a .gz that is a file of its
+    # own, e.g. a static archive, carries some other mtime
+    try:
+        if mtime_ns is None:
+            mtime_ns = os.stat(path).st_mtime_ns
+        return os.stat(path + GZIP_SUFFIX).st_mtime_ns == mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def gzip_stamp(path: str) -> int | None:
+    # what remove_gzip_sibling needs to know about path before it changes
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def remove_gzip_sibling(path: str, mtime_ns: int | None) -> None:
+    # called once path has been rewritten or deleted, with its gzip_stamp()
+    # from before: the copy precompress made of it is stale now
+    if mtime_ns is not None and is_own_gzip(path, mtime_ns):
+        os.remove(path + GZIP_SUFFIX)
+
+
+def precompress(
+    root: str,
+    min_size: int = GZIP_MIN_SIZE,
+    level: int = 9,
+    threads: int = GZIP_THREADS,
+) -> CompressReport:
+    report = CompressReport()
+    to_compress = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            rel_path = os.path.relpath(path, root)
+            if filename.endswith(GZIP_SUFFIX):
+                # only ours, for a source that has shrunk below min_size
+                source = path[: -len(GZIP_SUFFIX)]
+                if (
+                    is_compressible(source)
+                    and is_own_gzip(source)
+                    and os.path.getsize(source) < min_size
+                ):
+                    os.remove(path)
+                    report.removed.append(rel_path)
+                continue
+            if not is_compressible(filename):
+                continue
+            stat = os.stat(path)
+            if stat.st_size < min_size:
+                continue
+            try:
+                gz_mtime = os.stat(path + GZIP_SUFFIX).st_mtime_ns
+            except FileNotFoundError:
+                gz_mtime = None
+            if gz_mtime == stat.st_mtime_ns:
+                report.skipped.append(rel_path)
+            else:
+                to_compress.append(rel_path)
+
+    def compress(rel_path: str):
+        return compress_file(os.path.join(root, rel_path), level)
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        # zlib releases the GIL while compressing, so threads run in parallel
+        results = list(executor.map(compress, sorted(to_compress)))
+    for rel_path, sizes in zip(sorted(to_compress), results):
+        if sizes is None:
+            report.skipped.append(rel_path)
+            continue
+        report.compressed.append(rel_path)
+        report.bytes_in += sizes[0]
+        report.bytes_out += sizes[1]
+
+    report.removed.sort()
+    report.skipped.sort()
+    return report
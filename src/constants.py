@@ -35,6 +35,11 @@ class HTMLProps(StrEnum):
     LINK = "href"
     IMAGE_SRC = "src"
     ALT_TEXT = "alt"
+    ID = "id"
+    TARGET = "target"
+    REL = "rel"
+    LOADING = "loading"
+    DECODING = "decoding"
 
 
 class MarkdownDelimiters(StrEnum):
@@ -0,0 +1,126 @@
+import mimetypes
+import os
+import posixpath
+import threading
+
+from src.manifest import hash_file
+
+INDEX_FILES = ("index.html", "index.htm")
+GZIP_SUFFIX = ".gz"
+
+
+def guess_content_type(path: str) -> str:
+    if path.endswith(GZIP_SUFFIX):
+        return "application/gzip"
+    content_type, _ = mimetypes.guess_type(path)
+    return content_type or "application/octet-stream"
+
+
+def normalize_url_path(url_path: str) -> str:
+    # "/a/./b/../c" -> "a/c"; ".." can never climb above the served root
+    return posixpath.normpath("/" + url_path).lstrip("/")
+
+
+class FileEntry:
+    __slots__ = ("path", "size", "mtime_ns", "etag", "content_type", "gzip")
+
+    def __init__(self, path, size, mtime_ns, etag, content_type):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.etag = etag
+        self.content_type = content_type
+        # the precompressed sibling's entry, if there is one
+        self.gzip = None
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def __repr__(self):
+        return f"FileEntry({self.path}, {self.size}, {self.etag})"
+
+
+class FileIndex:
+    on_disk = True
+
+    def __init__(self, root: str):
+        self.root = root
+        self.entries: dict[str, FileEntry] = {}
+        self.dirs: set[str] = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        # stat-only walk; files whose size and mtime are unchanged keep their
+        # entry, so only new or modified files are hashed again
+        entries = {}
+        dirs = set()
+        for dirpath, _, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root)
+            rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+            dirs.add(rel_dir)
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = posixpath.join(rel_dir, filename)
+                try:
+                    stat = os.stat(path)
+                    entry = self.entries.get(key)
+                    if (
+                        entry is None
+                        or entry.size != stat.st_size
+                        or entry.mtime_ns != stat.st_mtime_ns
+                    ):
+                        entry = FileEntry(
+                            path=path,
+                            size=stat.st_size,
+                            mtime_ns=stat.st_mtime_ns,
+                            etag=f'"{hash_file(path)[:20]}"',
+                            content_type=guess_content_type(filename),
+                        )
+                except FileNotFoundError:
+                    continue
+                entries[key] = entry
+
+        for key, entry in entries.items():
+            if not key.endswith(GZIP_SUFFIX):
+                # precompress stamps the .gz with its source's mtime; any
+                # other .gz is stale or unrelated and never served for it
+                gzip = entries.get(key + GZIP_SUFFIX)
+                if gzip is not None and gzip.mtime_ns == entry.mtime_ns:
+                    entry.gzip = gzip
+                else:
+                    entry.gzip = None
+        self.entries = entries
+        self.dirs = dirs
+
+    def lookup(self, url_path: str) -> FileEntry | None:
+        key = normalize_url_path(url_path)
+        if url_path.endswith("/") or key == "":
+            if key not in self.dirs:
+                return None
+            for index in INDEX_FILES:
+                entry = self.entries.get(posixpath.join(key, index))
+                if entry is not None:
+                    return entry
+            return None
+        return self.entries.get(key)
+
+    def start_auto_refresh(self, interval: float) -> None:
+        def loop():
+            while not self._stop.wait(interval):
+                self.refresh()
+
+        self._thread = threading.Thread(
+            target=loop, name="file-index-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
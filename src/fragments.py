@@ -0,0 +1,170 @@
+import hashlib
+
+from src.htmlnode import HTMLNode, LeafNode, ParentNode
+from src.lru import DEFAULT_MAX_BYTES, DEFAULT_MAX_ENTRIES, LRUCache
+
+DIGEST_SIZE = 16
+
+
+# one character for the common node types; any other is length-prefixed
+NODE_KINDS = {LeafNode: "L", ParentNode: "P"}
+
+
+def _field(value) -> str:
+    # length-prefixed, so different fields never run together alike
+    if value is None:
+        return "~"
+    value = str(value)
+    return f"{len(value)}:{value}"
+
+
+def node_fields(node: HTMLNode) -> bytes:
+    # everything but the children, which the digest covers separately
+    kind = NODE_KINDS.get(type(node)) or _field(type(node).__name__)
+    tag, value = node.tag, node.value
+    # _field inlined: most of the digest's time goes here
+    fields = (
+        f"{kind}{'~' if tag is None else f'{len(tag)}:{tag}'}"
+        f"{'~' if value is None else f'{len(value)}:{value}'}"
+    )
+    if node.props:
+        fields += f"{len(node.props)};" + "".join(
+            _field(key) + _field(value) for key, value in node.props.items()
+        )
+    elif node.props is not None:
+        fields += "0;"
+    if node.children is not None:
+        fields += f"{len(node.children)}/"
+    return fields.encode()
+
+
+def _hasher(node: HTMLNode):
+    return hashlib.blake2b(node_fields(node), digest_size=DIGEST_SIZE)
+
+
+def node_digest(
+    root: HTMLNode,
+    digests: dict[int, bytes] | None = None,
+    known: LRUCache | None = None,
+) -> bytes:
+    # structural digest of a tree: blake2b over each node's fields followed
+    # by its children, computed bottom up without recursion. A leaf child is
+    # hashed by its fields, a parent child by its own digest after a "#",
+    # which no fields start with. Equal trees hash alike however they were
+    # built, in any process or run.
+    #
+    # The digest of every parent node is left in `digests` by id(). Frozen
+    # subtrees are shared between pages by the parse cache and never change,
+    # so `known` remembers their digests by identity and they are not walked
+    # again.
+    if not isinstance(root, ParentNode) or not root.children:
+        return _hasher(root).digest()
+    if known is not None and isinstance(root.children, tuple):
+        entry = known.get(id(root))
+        if entry is not None and entry[0] is root:
+            return entry[1]
+    if digests is None:
+        digests = {}
+    # (node, its hash so far, its remaining children)
+    stack = [(root, _hasher(root), iter(root.children))]
+    while True:
+        node, hasher, children = stack[-1]
+        for child in children:
+            if not isinstance(child, ParentNode) or not child.children:
+                hasher.update(node_fields(child))
+                continue
+            entry = None
+            if known is not None and isinstance(child.children, tuple):
+                entry = known.get(id(child))
+            if entry is None or entry[0] is not child:
+                stack.append((child, _hasher(child), iter(child.children)))
+                break
+            digests[id(child)] = entry[1]
+            hasher.update(b"#" + entry[1])
+        else:
+            stack.pop()
+            digest = digests[id(node)] = hasher.digest()
+            if known is not None and isinstance(node.children, tuple):
+                # the entry holds the node, so its id() cannot be reused
+                known.put(id(node), (node, digest), DIGEST_SIZE)
+            if not stack:
+                return digest
+            stack[-1][1].update(b"#" + digest)
+
+
+class FragmentCache:
+    # rendered HTML of subtrees by structural digest, shared by all pages a
+    # process renders, so content repeated across pages (shared lists,
+    # callouts, code samples) is rendered once and then looked up. Only
+    # frozen subtrees are cached: the parse cache shares those between pages,
+    # so each is hashed once. Hashing any other node costs about as much as
+    # rendering it. Hits and misses of worker processes are summed into the
+    # instance the build was given.
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.fragments = LRUCache(max_entries, max_bytes)
+        self.known = LRUCache(max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def render(self, root: HTMLNode) -> str:
+        # root.to_html(), with every frozen subtree looked up by its digest
+        # and only rendered on a miss; other nodes are rendered as usual
+        if not isinstance(root, ParentNode) or not root.children:
+            return root.to_html()
+        if isinstance(root.children, tuple):
+            return self._render_frozen(root)
+        # (node, its remaining children, its rendered parts)
+        stack = [(root, iter(root.children), [root.open_tag()])]
+        while True:
+            node, children, parts = stack[-1]
+            for child in children:
+                if not isinstance(child, ParentNode) or not child.children:
+                    parts.append(child.to_html())
+                elif isinstance(child.children, tuple):
+                    parts.append(self._render_frozen(child))
+                else:
+                    stack.append((child, iter(child.children), [child.open_tag()]))
+                    break
+            else:
+                stack.pop()
+                parts.append(f"</{node.tag}>")
+                html = "".join(parts)
+                if not stack:
+                    return html
+                stack[-1][2].append(html)
+
+    def _render_frozen(self, node: ParentNode) -> str:
+        digest = node_digest(node, known=self.known)
+        html = self._get(digest)
+        if html is None:
+            html = node.to_html()
+            self.fragments.put(digest, html, len(html))
+        return html
+
+    def _get(self, digest: bytes) -> str | None:
+        html = self.fragments.get(digest)
+        if html is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return html
+
+    def stats(self) -> dict[str, int]:
+        stats = self.fragments.stats()
+        stats.update(hits=self.hits, misses=self.misses)
+        return stats
+
+    def __repr__(self):
+        return (
+            f"FragmentCache(entries={len(self.fragments)}/{self.max_entries}, "
+            f"hits={self.hits}, misses={self.misses})"
+        )
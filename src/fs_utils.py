@@ -0,0 +1,13 @@
+import os
+
+
+def prune_empty_dirs(dir_path: str, stop_dir: str) -> None:
+    # remove dir_path and its now-empty parents, never touching stop_dir
+    stop_dir = os.path.abspath(stop_dir)
+    dir_path = os.path.abspath(dir_path)
+    while dir_path != stop_dir and dir_path.startswith(stop_dir + os.sep):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            return
+        dir_path = os.path.dirname(dir_path)
@@ -1,4 +1,26 @@
+from types import MappingProxyType
+
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+def write_chunks(fp, chunks, buffer_size: int = WRITE_BUFFER_SIZE) -> None:
+    # coalesce small chunks so the file object sees a few large writes
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            fp.write("".join(buffer))
+            buffer.clear()
+            size = 0
+    if buffer:
+        fp.write("".join(buffer))
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -6,15 +28,18 @@ class HTMLNode:
         self.props = props
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
         raise NotImplementedError
 
+    def write_html(self, fp):
+        write_chunks(fp, self.iter_html())
+
     def props_to_html(self):
         if not self.props:
             return ""
-        html_string = ""
-        for key, value in self.props.items():
-            html_string += f' {key}="{value}"'
-        return html_string
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
@@ -31,6 +56,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, value=None, props=None):
         super().__init__(tag=tag, value=value, children=None, props=props)
 
@@ -45,21 +72,62 @@ class LeafNode(HTMLNode):
             else:
                 return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def iter_html(self):
+        yield self.to_html()
+
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag=None, children=None, props=None):
         super().__init__(tag=tag, children=children, props=props)
 
-    def to_html(self):
+    def open_tag(self):
         if self.tag is None:
             raise ValueError("Tag must be set for ParentNode!")
         if self.children is None:
             raise ValueError("ParentNode must have children!")
 
-        child_html = ""
-        for child in self.children:
-            child_html += child.to_html()
         if self.props is not None:
-            return f"<{self.tag}{self.props_to_html()}>{child_html}</{self.tag}>"
+            return f"<{self.tag}{self.props_to_html()}>"
         else:
-            return f"<{self.tag}>{child_html}</{self.tag}>"
+            return f"<{self.tag}>"
+
+    def iter_html(self):
+        # walk the tree with an explicit stack so deep documents neither
+        # recurse nor chain one generator per level
+        yield self.open_tag()
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    yield child.open_tag()
+                    stack.append((child, iter(child.children)))
+                    break
+                if isinstance(child, LeafNode):
+                    yield child.to_html()
+                else:
+                    yield from child.iter_html()
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
+
+
+def freeze_node(node: HTMLNode) -> HTMLNode:
+    # swaps a tree's containers for tuples and read-only mappings so it can
+    # be shared between pages; built bottom up, so a tuple is already frozen
+    if node.props is not None and not isinstance(node.props, MappingProxyType):
+        node.props = MappingProxyType(dict(node.props))
+    if node.children is not None and not isinstance(node.children, tuple):
+        node.children = tuple(freeze_node(child) for child in node.children)
+    return node
+
+
+def copy_node(node: HTMLNode, **fields) -> HTMLNode:
+    # a shallow copy with some fields replaced, for changing a node that may
+    # be frozen and shared with other pages
+    copy = object.__new__(type(node))
+    for field in HTMLNode.__slots__:
+        setattr(copy, field, fields.get(field, getattr(node, field)))
+    return copy
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ManifestEntry:
+    def __init__(self, source_hash, template_hash, output, size=None, mtime_ns=None):
+        self.source_hash = source_hash
+        self.template_hash = template_hash
+        self.output = output
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def to_dict(self) -> dict:
+        return {
+            "source_hash": self.source_hash,
+            "template_hash": self.template_hash,
+            "output": self.output,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ManifestEntry":
+        return cls(
+            source_hash=data["source_hash"],
+            template_hash=data["template_hash"],
+            output=data["output"],
+            size=data.get("size"),
+            mtime_ns=data.get("mtime_ns"),
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, ManifestEntry):
+            return self.to_dict() == other.to_dict()
+        return False
+
+    def __repr__(self):
+        return f"ManifestEntry({self.source_hash}, {self.template_hash}, {self.output})"
+
+
+class BuildManifest:
+    def __init__(
+        self,
+        path: str,
+        pages: dict[str, ManifestEntry] | None = None,
+        assets: list[str] | None = None,
+        shard: str | None = None,
+    ):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        # static files copied into the output by the last build
+        self.assets = assets if assets is not None else []
+        # "i/N" for the output of one shard of a sharded build
+        self.shard = shard
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        # a missing, unreadable or outdated manifest just means a full rebuild
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        pages = {
+            source: ManifestEntry.from_dict(entry)
+            for source, entry in data.get("pages", {}).items()
+        }
+        return cls(path, pages, data.get("assets", []), data.get("shard"))
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "pages": {
+                source: self.pages[source].to_dict() for source in sorted(self.pages)
+            },
+            "assets": sorted(self.assets),
+        }
+        if self.shard is not None:
+            data["shard"] = self.shard
+        manifest_dir = os.path.dirname(self.path)
+        if manifest_dir != "":
+            os.makedirs(manifest_dir, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get(self, source: str) -> ManifestEntry | None:
+        return self.pages.get(source)
+
+    def set(self, source: str, entry: ManifestEntry) -> None:
+        self.pages[source] = entry
+
+    def remove(self, source: str) -> ManifestEntry | None:
+        return self.pages.pop(source, None)
+
+    def source_hash(self, source: str, from_path: str) -> tuple[str, os.stat_result]:
+        # skip re-hashing sources whose size and mtime match the last build
+        stat = os.stat(from_path)
+        entry = self.pages.get(source)
+        if (
+            entry is not None
+            and entry.size == stat.st_size
+            and entry.mtime_ns == stat.st_mtime_ns
+        ):
+            return entry.source_hash, stat
+        return hash_file(from_path), stat
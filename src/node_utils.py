@@ -1,8 +1,11 @@
+import io
 import re
+from collections import deque
 from pathlib import Path
 import os
-from typing import Tuple
+from typing import Iterable, Iterator, Tuple
 
+from src.assets import AssetMap
 from src.constants import (
     HTMLTags,
     HTMLProps,
@@ -11,37 +14,53 @@ from src.constants import (
     MarkdownDelimiters,
     MarkdownBlockType,
 )
+from src.fragments import FragmentCache
 from src.textnode import TextNode
-from src.htmlnode import LeafNode, HTMLNode, ParentNode
+from src.htmlnode import LeafNode, HTMLNode, ParentNode, freeze_node, write_chunks
+from src.lru import DEFAULT_MAX_BYTES, LRUCache
+from src.output import DiskOutput, OutputBackend
+from src.profiling import StageTimer
+from src.template import (
+    Template,
+    load_template,
+    parse_front_matter,
+    read_front_matter,
+)
+from src.transform import PageContext, Transformer
+from src.tree_cache import DEFAULT_TREE_CACHE_BYTES, TreeCache
+
+
+# Leaves for plain and emphasised text only differ by tag: they all point at
+# the same shared tag member and carry no props dict of their own.
+SIMPLE_LEAF_TAGS = {
+    TextTypes.TEXT: None,
+    TextTypes.BOLD: HTMLTags.BOLD,
+    TextTypes.ITALIC: HTMLTags.ITALIC,
+    TextTypes.CODE: HTMLTags.CODE,
+}
 
 
 def text_node_to_html_node(text_node: TextNode) -> LeafNode:
-    if text_node.text_type not in TextTypes:
-        raise Exception(f"TextNode of type {text_node.text_type} is not valid.")
-
-    if text_node.text_type == TextTypes.BOLD:
-        return LeafNode(tag=HTMLTags.BOLD, value=text_node.text)
-    if text_node.text_type == TextTypes.ITALIC:
-        return LeafNode(tag=HTMLTags.ITALIC, value=text_node.text)
-    if text_node.text_type == TextTypes.CODE:
-        return LeafNode(tag=HTMLTags.CODE, value=text_node.text)
+    if text_node.text_type in SIMPLE_LEAF_TAGS:
+        return LeafNode(
+            tag=SIMPLE_LEAF_TAGS[text_node.text_type], value=text_node.text
+        )
     if text_node.text_type == TextTypes.LINK:
         return LeafNode(
             tag=HTMLTags.LINK,
             value=text_node.text,
-            props={HTMLProps.LINK: text_node.url},
+            props={HTMLProps.LINK: asset_url(text_node.url)},
         )
     if text_node.text_type == TextTypes.IMAGE:
         return LeafNode(
             tag=HTMLTags.IMAGE,
             value=text_node.text,
             props={
-                HTMLProps.IMAGE_SRC: text_node.url,
+                HTMLProps.IMAGE_SRC: asset_url(text_node.url),
                 HTMLProps.ALT_TEXT: text_node.text,
             },
         )
-    else:
-        return LeafNode(value=text_node.text)
+    raise Exception(f"TextNode of type {text_node.text_type} is not valid.")
 
 
 def split_nodes_delimiter(
@@ -88,31 +107,41 @@ def split_nodes_delimiter(
     return new_nodes
 
 
+MARKDOWN_IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+MARKDOWN_LINK_PATTERN = re.compile(r"\[(.*?)\]\((.*?)\)")
+
+
 def extract_markdown_images(text: str) -> list[Tuple[str, str]]:
-    return re.findall(r"!\[(.*?)\]\((.*?)\)", text)
+    return MARKDOWN_IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> list[Tuple[str, str]]:
-    return re.findall(r"\[(.*?)\]\((.*?)\)", text)
+    return MARKDOWN_LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
     new_nodes = []
     for node in old_nodes:
+        # code and emphasis spans are literal, as in split_nodes_delimiter
+        if node.text_type != TextTypes.TEXT:
+            new_nodes.append(node)
+            continue
         extracted_images = extract_markdown_images(node.text)
         if len(extracted_images) == 0:
             new_nodes.append(node)
         else:
+            # split a local copy: the input node may be shared and must not change
+            remaining = node.text
             for image_tup in extracted_images:
-                split_node_text = node.text.split(
+                split_node_text = remaining.split(
                     f"![{image_tup[0]}]({image_tup[1]})", 1
                 )
                 if split_node_text[0] != "":
                     new_nodes.append(TextNode(split_node_text[0], TextTypes.TEXT))
                 new_nodes.append(TextNode(image_tup[0], TextTypes.IMAGE, image_tup[1]))
-                node.text = split_node_text[1]
-            if node.text != "":
-                new_nodes.append(TextNode(node.text, TextTypes.TEXT))
+                remaining = split_node_text[1]
+            if remaining != "":
+                new_nodes.append(TextNode(remaining, TextTypes.TEXT))
 
     return new_nodes
 
@@ -120,85 +149,351 @@ def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
 def split_nodes_link(old_nodes: list[TextNode]) -> list[TextNode]:
     new_nodes = []
     for node in old_nodes:
+        # code and emphasis spans are literal, as in split_nodes_delimiter
+        if node.text_type != TextTypes.TEXT:
+            new_nodes.append(node)
+            continue
         extracted_links = extract_markdown_links(node.text)
         if len(extracted_links) == 0:
             new_nodes.append(node)
         else:
+            # split a local copy: the input node may be shared and must not change
+            remaining = node.text
             for image_tup in extracted_links:
-                split_node_text = node.text.split(
+                split_node_text = remaining.split(
                     f"[{image_tup[0]}]({image_tup[1]})", 1
                 )
                 if split_node_text[0] != "":
                     new_nodes.append(TextNode(split_node_text[0], TextTypes.TEXT))
                 new_nodes.append(TextNode(image_tup[0], TextTypes.LINK, image_tup[1]))
-                node.text = split_node_text[1]
-            if node.text != "":
-                new_nodes.append(TextNode(node.text, TextTypes.TEXT))
+                remaining = split_node_text[1]
+            if remaining != "":
+                new_nodes.append(TextNode(remaining, TextTypes.TEXT))
 
     return new_nodes
 
 
-def text_to_textnodes(text: str) -> list[TextNode]:
-    input_textnode = TextNode(text, TextTypes.TEXT)
-    code_splits = split_nodes_delimiter(
-        [input_textnode], MarkdownDelimiters.CODE, TextTypes.TEXT
+def split_pipeline_textnodes(text: str) -> list[TextNode]:
+    # the five-pass pipeline text_to_textnodes used before the single scanner,
+    # kept as the reference the scanner is tested and benchmarked against
+    nodes = [TextNode(text, TextTypes.TEXT)]
+    nodes = split_nodes_delimiter(nodes, MarkdownDelimiters.CODE, TextTypes.TEXT)
+    nodes = split_nodes_delimiter(nodes, MarkdownDelimiters.BOLD, TextTypes.TEXT)
+    nodes = split_nodes_delimiter(nodes, MarkdownDelimiters.ITALIC, TextTypes.TEXT)
+    return split_nodes_link(split_nodes_image(nodes))
+
+
+# The scanners below walk the text once, left to right, working on
+# [start, end) ranges of the original string instead of copying remainders.
+# Each level hands the gaps between its own spans to the next, which keeps
+# the precedence of the old split pipeline: code, bold, italic, image, link.
+def _scan_pattern(text, start, end, pattern, text_type, inner, nodes) -> None:
+    position = start
+    for match in pattern.finditer(text, start, end):
+        if match.start() > position:
+            inner(text, position, match.start(), nodes)
+        nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+        position = match.end()
+    if position < end:
+        inner(text, position, end, nodes)
+
+
+def _scan_delimiter(text, start, end, delimiter, text_type, inner, nodes) -> None:
+    width = len(delimiter)
+    position = start
+    while True:
+        opening = text.find(delimiter, position, end)
+        if opening == -1:
+            break
+        closing = text.find(delimiter, opening + width, end)
+        if closing == -1:
+            raise ValueError("Invalid markdown syntax: Missing closing delimiter.")
+        if opening > position:
+            inner(text, position, opening, nodes)
+        if closing > opening + width:
+            nodes.append(TextNode(text[opening + width : closing], text_type))
+        position = closing + width
+    if position < end:
+        inner(text, position, end, nodes)
+
+
+def _scan_text(text, start, end, nodes) -> None:
+    nodes.append(TextNode(text[start:end], TextTypes.TEXT))
+
+
+def _scan_links(text, start, end, nodes) -> None:
+    _scan_pattern(
+        text, start, end, MARKDOWN_LINK_PATTERN, TextTypes.LINK, _scan_text, nodes
     )
-    bold_splits = split_nodes_delimiter(
-        code_splits, MarkdownDelimiters.BOLD, TextTypes.TEXT
+
+
+def _scan_images(text, start, end, nodes) -> None:
+    _scan_pattern(
+        text, start, end, MARKDOWN_IMAGE_PATTERN, TextTypes.IMAGE, _scan_links, nodes
     )
-    italic_splits = split_nodes_delimiter(
-        bold_splits, MarkdownDelimiters.ITALIC, TextTypes.TEXT
+
+
+def _scan_italic(text, start, end, nodes) -> None:
+    _scan_delimiter(
+        text,
+        start,
+        end,
+        MarkdownDelimiters.ITALIC,
+        TextTypes.ITALIC,
+        _scan_images,
+        nodes,
     )
-    image_splits = split_nodes_image(italic_splits)
-    link_splits = split_nodes_link(image_splits)
 
-    return link_splits
 
+def _scan_bold(text, start, end, nodes) -> None:
+    _scan_delimiter(
+        text, start, end, MarkdownDelimiters.BOLD, TextTypes.BOLD, _scan_italic, nodes
+    )
 
-def markdown_to_blocks(text: str) -> list[str]:
-    split_code_blocks = text.split("```")
-    new_blocks = []
-    for i, block in enumerate(split_code_blocks):
-        if i % 2 == 1:
-            new_blocks.append(f"```{block}```")
-        else:
-            new_blocks.extend(
-                list(
-                    filter(
-                        lambda x: x != "",
-                        map(lambda x: x.strip("\n").strip(), block.split("\n\n")),
-                    )
-                )
-            )
 
-    return new_blocks
+def text_to_textnodes(text: str) -> list[TextNode]:
+    nodes: list[TextNode] = []
+    _scan_delimiter(
+        text, 0, len(text), MarkdownDelimiters.CODE, TextTypes.CODE, _scan_bold, nodes
+    )
+    return nodes
+
+
+CODE_FENCE = "```"
+
+HEADING_PATTERN = re.compile(MarkdownBlockRegexPattern.HEADING)
+BLOCK_TYPE_PATTERNS = [
+    (MarkdownBlockType.HEADING, HEADING_PATTERN),
+    (MarkdownBlockType.QUOTE, re.compile(MarkdownBlockRegexPattern.QUOTE)),
+    (
+        MarkdownBlockType.UNORDERED_LIST,
+        re.compile(MarkdownBlockRegexPattern.UNORDERED_LIST),
+    ),
+    (
+        MarkdownBlockType.ORDERED_LIST,
+        re.compile(MarkdownBlockRegexPattern.ORDERED_LIST),
+    ),
+]
+ORDERED_LIST_ITEM_PATTERN = re.compile(r"^[0-9]+\.\s")
+
+
+def iter_blocks(markdown: str | Iterable[str]) -> Iterator[Tuple[str, str]]:
+    # Yields (block_type, block) one block at a time from a string or any
+    # iterable of lines (e.g. an open file), holding only the current block.
+    # Fences split code blocks out wherever they appear; everything else is
+    # split on empty lines.
+    lines = io.StringIO(markdown) if isinstance(markdown, str) else markdown
+    paragraph_lines: list[str] = []
+    code_lines: list[str] = []
+    in_code = False
+    trailing_newline = False
+
+    for raw_line in lines:
+        trailing_newline = raw_line.endswith("\n")
+        line = raw_line.rstrip("\n")
+        opening = False
+        while True:
+            if in_code:
+                # on the opening line, skip past the fence we just opened
+                close = line.find(CODE_FENCE, len(CODE_FENCE) if opening else 0)
+                if close == -1:
+                    code_lines.append(line)
+                    break
+                code_lines.append(line[: close + len(CODE_FENCE)])
+                yield MarkdownBlockType.CODE, "\n".join(code_lines)
+                code_lines = []
+                in_code = False
+                line = line[close + len(CODE_FENCE) :]
+                if line.strip() == "":
+                    break
+                continue
+
+            fence = line.find(CODE_FENCE)
+            if fence == -1:
+                if line == "":
+                    yield from _flush_block(paragraph_lines)
+                else:
+                    paragraph_lines.append(line)
+                break
+            paragraph_lines.append(line[:fence])
+            yield from _flush_block(paragraph_lines)
+            in_code = True
+            opening = True
+            line = line[fence:]
+
+    if in_code:
+        # an unclosed fence runs to the end of the document, verbatim
+        code = "\n".join(code_lines) + ("\n" if trailing_newline else "")
+        yield MarkdownBlockType.CODE, code + CODE_FENCE
+    yield from _flush_block(paragraph_lines)
+
+
+def _flush_block(block_lines: list[str]) -> Iterator[Tuple[str, str]]:
+    block = "\n".join(block_lines).strip()
+    block_lines.clear()
+    if block != "":
+        yield block_to_block_type(block), block
+
+
+def markdown_to_blocks(text: str) -> list[str]:
+    return [block for _, block in iter_blocks(text)]
 
 
 # TODO: check if ordered_list numbers are valid
 def block_to_block_type(block: str) -> str:
     # check for code block
-    if block.startswith("```") and block.endswith("```"):
+    if block.startswith(CODE_FENCE) and block.endswith(CODE_FENCE):
         return MarkdownBlockType.CODE
+    for block_type, pattern in BLOCK_TYPE_PATTERNS:
+        if pattern.match(block):
+            return block_type
+    return MarkdownBlockType.PARAGRAPH
+
+
+# Opt-in parse caches; None means every call parses from scratch. Cached
+# nodes are frozen and shared between pages, so they must never be mutated.
+inline_cache: LRUCache | None = None
+block_cache: LRUCache | None = None
+
+
+def configure_parse_cache(
+    max_entries: int = 0, max_bytes: int = DEFAULT_MAX_BYTES
+) -> None:
+    global inline_cache, block_cache
+    if max_entries <= 0:
+        inline_cache = block_cache = None
+        return
+    inline_cache = LRUCache(max_entries, max_bytes)
+    block_cache = LRUCache(max_entries, max_bytes)
+
+
+def parse_cache_counts() -> tuple[int, int]:
+    hits = misses = 0
+    for cache in (inline_cache, block_cache):
+        if cache is not None:
+            hits += cache.hits
+            misses += cache.misses
+    return hits, misses
+
+
+# Bump whenever the trees markdown_to_html_node builds change, so trees
+# persisted by an older parser are never loaded.
+PARSER_VERSION = "1"
+tree_cache: TreeCache | None = None
+
+
+def configure_tree_cache(
+    directory: str | None = None, max_bytes: int = DEFAULT_TREE_CACHE_BYTES
+) -> None:
+    global tree_cache
+    if directory:
+        tree_cache = TreeCache(directory, max_bytes, tree_cache_version())
     else:
-        if re.match(MarkdownBlockRegexPattern.HEADING, block):
-            return MarkdownBlockType.HEADING
-        elif re.match(MarkdownBlockRegexPattern.QUOTE, block):
-            return MarkdownBlockType.QUOTE
-        elif re.match(MarkdownBlockRegexPattern.UNORDERED_LIST, block):
-            return MarkdownBlockType.UNORDERED_LIST
-        elif re.match(MarkdownBlockRegexPattern.ORDERED_LIST, block):
-            return MarkdownBlockType.ORDERED_LIST
-        else:
-            return MarkdownBlockType.PARAGRAPH
+        tree_cache = None
+
+
+def tree_cache_counts() -> tuple[int, int]:
+    if tree_cache is None:
+        return 0, 0
+    return tree_cache.hits, tree_cache.misses
+
+
+# Fingerprinted asset names that link and image URLs are rewritten to; None
+# leaves every URL as written.
+asset_map: AssetMap | None = None
+
+
+def configure_assets(assets: dict[str, str] | None = None) -> None:
+    global asset_map
+    asset_map = AssetMap(assets) if assets else None
+    # cached nodes carry the URLs of the previous mapping
+    for cache in (inline_cache, block_cache):
+        if cache is not None:
+            cache.clear()
+    if tree_cache is not None:
+        tree_cache.version = tree_cache_version()
+
+
+def tree_cache_version() -> str:
+    if asset_map is None:
+        return PARSER_VERSION
+    return f"{PARSER_VERSION}+{asset_map.digest}"
+
+
+# Rendered subtrees by structural digest, shared by every page this process
+# renders; None renders every node. Entries are keyed by content, so nothing
+# that changes the trees can make them stale.
+fragment_cache: FragmentCache | None = None
+
+
+def configure_fragment_cache(
+    max_entries: int = 0, max_bytes: int = DEFAULT_MAX_BYTES
+) -> None:
+    global fragment_cache
+    if max_entries <= 0:
+        fragment_cache = None
+    else:
+        fragment_cache = FragmentCache(max_entries, max_bytes)
+
+
+def fragment_cache_counts() -> tuple[int, int]:
+    if fragment_cache is None:
+        return 0, 0
+    return fragment_cache.hits, fragment_cache.misses
+
+
+def render_node(node: HTMLNode) -> Iterable[str]:
+    if fragment_cache is None:
+        return node.iter_html()
+    return [fragment_cache.render(node)]
+
+
+# Plugins run over every page after parsing; None skips the walk altogether.
+# The caches above hold trees as parsed, so plugins never invalidate them.
+transformer: Transformer | None = None
+
+
+def configure_transforms(plugins: list[str] | None = None) -> None:
+    global transformer
+    transformer = Transformer.from_names(plugins) if plugins else None
+
+
+def transform_page(
+    node: HTMLNode, variables: dict, timer: StageTimer | None = None
+) -> HTMLNode:
+    page = PageContext()
+    node = transformer.apply(node, page, timer)
+    for name, value in transformer.finish(page, timer).items():
+        # front matter wins, e.g. an empty toc to leave it out
+        variables.setdefault(name, value)
+    return node
+
+
+def asset_url(url: str) -> str:
+    if asset_map is None:
+        return url
+    return asset_map.url(url)
+
+
+def page_template(template_path: str) -> Template:
+    template = load_template(template_path)
+    if asset_map is None:
+        return template
+    return asset_map.rewrite_template(template)
 
 
 def text_to_children(text):
-    text_nodes = text_to_textnodes(text)
-    children = []
-    for text_node in text_nodes:
-        html_node = text_node_to_html_node(text_node)
-        children.append(html_node)
-    return children
+    if inline_cache is None:
+        return [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+    children = inline_cache.get(text)
+    if children is None:
+        children = tuple(
+            freeze_node(text_node_to_html_node(node))
+            for node in text_to_textnodes(text)
+        )
+        # sized by the source text, which the parsed nodes scale with
+        inline_cache.put(text, children, len(text))
+    return list(children)
 
 
 def quote_block_to_html_node(block: str) -> HTMLNode:
@@ -231,7 +526,7 @@ def ol_block_to_html_node(block: str) -> HTMLNode:
         children=[
             LeafNode(tag=HTMLTags.LIST_ITEM, value=line)
             for line in map(
-                lambda x: re.sub(r"^[0-9]+\.\s", "", x).lstrip(), block.split("\n")
+                lambda x: ORDERED_LIST_ITEM_PATTERN.sub("", x).lstrip(), block.split("\n")
             )
         ],
     )
@@ -251,7 +546,7 @@ def code_block_to_html_node(block: str) -> HTMLNode:
 
 def heading_block_to_html_node(block: str) -> HTMLNode:
     return ParentNode(
-        tag=f"h{len(re.findall(MarkdownBlockRegexPattern.HEADING, block)[0]) - 1}",
+        tag=f"h{HEADING_PATTERN.match(block).end() - 1}",
         children=text_to_children(block.lstrip(MarkdownDelimiters.HEADING).lstrip()),
     )
 
@@ -263,8 +558,20 @@ def paragraph_block_to_html_node(block: str) -> HTMLNode:
     )
 
 
-def block_to_html_node(block: str) -> HTMLNode:
-    block_type = block_to_block_type(block)
+def block_to_html_node(block: str, block_type: str | None = None) -> HTMLNode:
+    if block_type is None:
+        block_type = block_to_block_type(block)
+    if block_cache is None:
+        return _block_to_html_node(block, block_type)
+    key = (block_type, block)
+    node = block_cache.get(key)
+    if node is None:
+        node = freeze_node(_block_to_html_node(block, block_type))
+        block_cache.put(key, node, len(block))
+    return node
+
+
+def _block_to_html_node(block: str, block_type: str) -> HTMLNode:
     if block_type == MarkdownBlockType.QUOTE:
         return quote_block_to_html_node(block)
     if block_type == MarkdownBlockType.UNORDERED_LIST:
@@ -281,15 +588,26 @@ def block_to_html_node(block: str) -> HTMLNode:
     raise ValueError(f"Invalid block type {block_type}")
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
-    blocks = markdown_to_blocks(markdown)
+def markdown_to_html_node(markdown: str | Iterable[str]) -> HTMLNode:
     children = []
-    for block in blocks:
-        children.append(block_to_html_node(block))
+    for block_type, block in iter_blocks(markdown):
+        children.append(block_to_html_node(block, block_type))
 
     return ParentNode(tag="div", children=children)
 
 
+def parse_markdown(markdown: str) -> HTMLNode:
+    # markdown_to_html_node behind the persistent tree cache, if configured
+    if tree_cache is None:
+        return markdown_to_html_node(markdown)
+    key = tree_cache.key(markdown)
+    node = tree_cache.load(key)
+    if node is None:
+        node = markdown_to_html_node(markdown)
+        tree_cache.store(key, node)
+    return node
+
+
 def extract_title(markdown: str) -> str:
     for line in markdown.split("\n"):
         if line.startswith("# "):
@@ -298,33 +616,179 @@ def extract_title(markdown: str) -> str:
     raise ValueError("Markdown has no h1 header!")
 
 
-def generate_page(from_path: str, template_path: str, dest_path: str) -> None:
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+def render_page(
+    from_path: str, template_path: str, timer: StageTimer | None = None
+) -> Iterable[str]:
+    page_level = transformer is not None and transformer.page_level
+    if timer is None and tree_cache is None and not page_level:
+        # the tree cache, the stage timings and plugins like a table of
+        # contents need the whole page at once
+        return _stream_file(from_path, template_path)
     with open(from_path, "r") as f:
         markdown = f.read()
+    return render_markdown(markdown, template_path, timer)
 
-    with open(template_path, "r") as f:
-        template = f.read()
 
-    markdown_html = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", markdown_html)
-    dest_dir_path = os.path.dirname(dest_path)
-    if dest_dir_path != "":
-        os.makedirs(dest_dir_path, exist_ok=True)
-    with open(dest_path, "w") as f:
-        f.write(template)
+def _stream_file(from_path: str, template_path: str) -> Iterator[str]:
+    with open(from_path, "r") as f:
+        yield from stream_markdown(f, template_path)
+
+
+class _StreamedContent:
+    # converts blocks one at a time as lines come in. The title is the first
+    # "# " line, as in extract_title; read_title() converts blocks ahead into
+    # `pending` until that line has been read.
+    def __init__(self, lines: Iterable[str], title: str | None = None):
+        self.title = title
+        self.blocks = iter_blocks(self._scan(lines))
+        self.pending: deque[str] = deque()
+        # plugins see one block at a time, sharing the page's state
+        self.page = PageContext() if transformer is not None else None
+
+    def _scan(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if self.title is None and line.startswith("# "):
+                self.title = line.rstrip("\n").strip("# ")
+            yield line
+
+    def _next_html(self) -> str | None:
+        item = next(self.blocks, None)
+        if item is None:
+            return None
+        block_type, block = item
+        node = block_to_html_node(block, block_type)
+        if self.page is not None:
+            node = transformer.apply(node, self.page)
+        return "".join(render_node(node))
+
+    def read_title(self) -> str:
+        while self.title is None:
+            html = self._next_html()
+            if html is None:
+                raise ValueError("Markdown has no h1 header!")
+            self.pending.append(html)
+        return self.title
+
+    def iter_content(self) -> Iterator[str]:
+        # the same markup as markdown_to_html_node(...).iter_html()
+        yield "<div>"
+        while self.pending:
+            yield self.pending.popleft()
+        while (html := self._next_html()) is not None:
+            yield html
+        yield "</div>"
+
+
+def stream_markdown(
+    lines: Iterable[str], template_path: str | None = None
+) -> Iterator[str]:
+    # render_markdown over a stream of lines, e.g. an open file or stdin:
+    # each block is emitted as soon as it is complete, so memory is bounded
+    # by the largest block instead of the page. Without a template only the
+    # content is emitted.
+    variables, lines = read_front_matter(iter(lines))
+    content = _StreamedContent(lines, variables.get("title"))
+    if template_path is None:
+        return content.iter_content()
+    if "title" not in variables:
+        # a string, like every other variable, however often the template
+        # uses it; only the blocks before the title line are read ahead
+        variables["title"] = content.read_title()
+    variables["content"] = content.iter_content()
+    return page_template(template_path).iter_render(variables)
+
+
+def render_markdown(
+    markdown: str, template_path: str, timer: StageTimer | None = None
+) -> Iterable[str]:
+    template = page_template(template_path)
+    variables, markdown = parse_front_matter(markdown)
+    if "title" not in variables:
+        variables["title"] = extract_title(markdown)
+    if timer is None:
+        node = parse_markdown(markdown)
+        if transformer is not None:
+            node = transform_page(node, variables)
+        variables["content"] = render_node(node)
+        return template.iter_render(variables)
+    return [_render_page_timed(template, variables, markdown, timer)]
+
+
+def generate_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    timer: StageTimer | None = None,
+    output: OutputBackend | None = None,
+) -> None:
+    chunks = render_page(from_path, template_path, timer)
+    if output is None:
+        output = DiskOutput()
+    with output.open(dest_path) as f:
+        write_chunks(f, chunks)
+    if timer is not None:
+        timer.mark("write")
+
+
+def _render_page_timed(
+    template: Template, variables: dict, markdown: str, timer: StageTimer
+) -> str:
+    # the streaming path interleaves every stage, so a profiled page is
+    # materialised stage by stage instead to give each one its own timing
+    timer.mark("read")
+    if tree_cache is not None:
+        # a cached tree skips both parsing stages; loading counts as parsing
+        node = parse_markdown(markdown)
+    else:
+        blocks = list(iter_blocks(markdown))
+        timer.mark("block_split")
+        children = [
+            block_to_html_node(block, block_type) for block_type, block in blocks
+        ]
+        node = ParentNode(tag="div", children=children)
+    timer.mark("inline_parse")
+    if transformer is not None:
+        node = transform_page(node, variables, timer)
+    timer.mark("transform")
+    variables["content"] = "".join(render_node(node))
+    timer.mark("render")
+    page = template.render(variables)
+    timer.mark("template_fill")
+    return page
+
+
+def iter_pages(dir_path_content: str, dest_dir_path: str) -> Iterator[Tuple[str, str]]:
+    # depth-first in name order like a recursive walk, but with an explicit
+    # stack of directory listings, so deep content trees cannot hit the
+    # recursion limit and pages come out before the whole tree is listed
+    stack = [(iter(_scan_sorted(dir_path_content)), dest_dir_path)]
+    while stack:
+        entries, dest_dir = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+        dest_path = os.path.join(dest_dir, entry.name)
+        if entry.is_file():
+            yield entry.path, str(Path(dest_path).with_suffix(".html"))
+        else:
+            stack.append((iter(_scan_sorted(entry.path)), dest_path))
+
+
+def _scan_sorted(dir_path: str) -> list[os.DirEntry]:
+    with os.scandir(dir_path) as entries:
+        return sorted(entries, key=lambda entry: entry.name)
+
+
+def discover_pages(dir_path_content: str, dest_dir_path: str) -> list[Tuple[str, str]]:
+    return list(iter_pages(dir_path_content, dest_dir_path))
 
 
 def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    output: OutputBackend | None = None,
 ) -> None:
-    for filename in os.listdir(dir_path_content):
-        from_path = os.path.join(dir_path_content, filename)
-        dest_path = os.path.join(dest_dir_path, filename)
-        if os.path.isfile(from_path):
-            dest_path = Path(dest_path).with_suffix(".html")
-            generate_page(from_path, template_path, dest_path)
-        else:
-            generate_pages_recursive(from_path, template_path, dest_path)
+    for from_path, dest_path in iter_pages(dir_path_content, dest_dir_path):
+        generate_page(from_path, template_path, dest_path, output=output)
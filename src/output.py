@@ -0,0 +1,272 @@
+import contextlib
+import hashlib
+import io
+import os
+import posixpath
+import threading
+import time
+from typing import Iterable
+
+from src.compress import gzip_stamp, remove_gzip_sibling
+from src.file_index import INDEX_FILES, guess_content_type, normalize_url_path
+from src.fs_utils import prune_empty_dirs
+from src.static_sync import place_file
+
+COPY_CHUNK_SIZE = 1 << 16
+
+
+class UnchangedWriter:
+    # a text file stand-in that leaves `path` alone while the output matches
+    # it: chunks are only compared against the old file until the first
+    # difference, when the matched prefix is copied into a temp file that
+    # takes the rest and is later moved into place
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.matched = 0
+        self.tmp = None
+        try:
+            self.old = open(path, "rb")
+        except OSError:
+            self.old = None
+            self._diverge()
+
+    def _diverge(self) -> None:
+        self.tmp = open(self.tmp_path, "wb")
+        if self.old is None:
+            return
+        self.old.seek(0)
+        remaining = self.matched
+        while remaining:
+            chunk = self.old.read(min(remaining, COPY_CHUNK_SIZE))
+            self.tmp.write(chunk)
+            remaining -= len(chunk)
+
+    def write(self, text: str) -> int:
+        data = text.encode()
+        if self.tmp is None:
+            if self.old.read(len(data)) == data:
+                self.matched += len(data)
+                return len(text)
+            self._diverge()
+        self.tmp.write(data)
+        return len(text)
+
+    def commit(self) -> bool:
+        # True if `path` was replaced, False if it already held the output
+        if self.tmp is None and self.old.read(1) != b"":
+            # the old file is longer
+            self._diverge()
+        if self.old is not None:
+            self.old.close()
+        if self.tmp is None:
+            return False
+        self.tmp.close()
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self) -> None:
+        if self.old is not None:
+            self.old.close()
+        if self.tmp is not None:
+            self.tmp.close()
+            os.remove(self.tmp_path)
+
+
+def same_contents(path: str, data: bytes) -> bool:
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+class DiskOutput:
+    # writes straight to the filesystem; paths are used as given and `root`
+    # only bounds how far empty directories are pruned after a removal.
+    # Output identical to what is already on disk is not written, so mtimes
+    # stay put for rsync and upload diffing.
+    on_disk = True
+
+    def __init__(self, root: str = "", create_dirs: bool = True):
+        self.root = root
+        # False when the caller has made every directory up front
+        self.create_dirs = create_dirs
+        self.dirs: set[str] = set()
+        self.unchanged = 0
+        self.lock = threading.Lock()
+
+    def ensure_dir(self, dir_path: str) -> None:
+        if not self.create_dirs or dir_path == "" or dir_path in self.dirs:
+            return
+        os.makedirs(dir_path, exist_ok=True)
+        self.dirs.add(dir_path)
+
+    def prepare_dirs(self, paths: Iterable[str]) -> int:
+        # one makedirs per distinct leaf directory instead of one per file
+        dirs = sorted({os.path.dirname(path) for path in paths} - self.dirs)
+        created = 0
+        for i, dir_path in enumerate(dirs):
+            if i + 1 < len(dirs) and dirs[i + 1].startswith(dir_path + os.sep):
+                # made along with the deeper directory that follows
+                continue
+            if dir_path != "":
+                os.makedirs(dir_path, exist_ok=True)
+                created += 1
+        self.dirs.update(dirs)
+        return created
+
+    @contextlib.contextmanager
+    def open(self, path: str):
+        self.ensure_dir(os.path.dirname(path))
+        # pages are streamed out, so changes go to a temp file that is moved
+        # into place; output that fails half way never replaces the old file
+        stamp = gzip_stamp(path)
+        writer = UnchangedWriter(path)
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        if writer.commit():
+            remove_gzip_sibling(path, stamp)
+        else:
+            with self.lock:
+                self.unchanged += 1
+
+    def write_bytes(self, path: str, data: bytes) -> bool:
+        if same_contents(path, data):
+            with self.lock:
+                self.unchanged += 1
+            return False
+        self.ensure_dir(os.path.dirname(path))
+        stamp = gzip_stamp(path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        remove_gzip_sibling(path, stamp)
+        return True
+
+    def copy_file(self, src_path: str, path: str, link: str = "copy") -> None:
+        self.ensure_dir(os.path.dirname(path))
+        place_file(src_path, path, link)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def remove(self, path: str) -> None:
+        if os.path.exists(path):
+            stamp = gzip_stamp(path)
+            os.remove(path)
+            remove_gzip_sibling(path, stamp)
+            if self.root:
+                prune_empty_dirs(os.path.dirname(path), self.root)
+                # some of the known directories may be gone now
+                self.dirs.clear()
+
+
+class MemoryFile:
+    __slots__ = ("path", "data", "size", "mtime_ns", "etag", "content_type", "gzip")
+
+    def __init__(self, path: str, data: bytes, mtime_ns: int):
+        self.path = path
+        self.data = data
+        self.size = len(data)
+        self.mtime_ns = mtime_ns
+        self.etag = f'"{hashlib.sha256(data).hexdigest()[:20]}"'
+        self.content_type = guess_content_type(path)
+        # same shape as a FileEntry, so the server can serve either
+        self.gzip = None
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+    def open(self):
+        return io.BytesIO(self.data)
+
+    def __repr__(self):
+        return f"MemoryFile({self.path}, {self.size}, {self.etag})"
+
+
+class MemoryOutput:
+    # path -> bytes plus metadata, for building and serving a site without
+    # touching the disk; paths are stored relative to `root`
+    on_disk = False
+
+    def __init__(self, root: str = ""):
+        self.root = root
+        self.files: dict[str, MemoryFile] = {}
+        self.lock = threading.Lock()
+        self.unchanged = 0
+
+    def key(self, path: str) -> str:
+        if self.root:
+            path = os.path.relpath(path, self.root)
+        return normalize_url_path(path.replace(os.sep, "/"))
+
+    @contextlib.contextmanager
+    def open(self, path: str):
+        buffer = io.StringIO()
+        yield buffer
+        self.write_bytes(path, buffer.getvalue().encode())
+
+    def write_bytes(self, path: str, data: bytes, mtime_ns: int | None = None) -> bool:
+        key = self.key(path)
+        with self.lock:
+            current = self.files.get(key)
+            if current is not None and current.data == data:
+                # keeps the mtime and etag browsers already have
+                self.unchanged += 1
+                return False
+        entry = MemoryFile(key, data, mtime_ns or time.time_ns())
+        with self.lock:
+            self.files[key] = entry
+        return True
+
+    def copy_file(self, src_path: str, path: str, link: str = "copy") -> None:
+        with open(src_path, "rb") as f:
+            data = f.read()
+        self.write_bytes(path, data, os.stat(src_path).st_mtime_ns)
+
+    def exists(self, path: str) -> bool:
+        return self.key(path) in self.files
+
+    def remove(self, path: str) -> None:
+        with self.lock:
+            self.files.pop(self.key(path), None)
+
+    def read(self, path: str) -> bytes:
+        return self.files[self.key(path)].data
+
+    def lookup(self, url_path: str) -> MemoryFile | None:
+        key = normalize_url_path(url_path)
+        if url_path.endswith("/") or key == "":
+            for index in INDEX_FILES:
+                entry = self.files.get(posixpath.join(key, index))
+                if entry is not None:
+                    return entry
+            return None
+        return self.files.get(key)
+
+    def is_dir(self, url_path: str) -> bool:
+        prefix = normalize_url_path(url_path).rstrip("/") + "/"
+        if prefix == "/":
+            return True
+        return any(key.startswith(prefix) for key in list(self.files))
+
+    # the server refreshes and stops its file index; a store has nothing to do
+    def refresh(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def __len__(self):
+        return len(self.files)
+
+
+OutputBackend = DiskOutput | MemoryOutput
@@ -0,0 +1,183 @@
+import queue
+import threading
+import time
+
+IO_THREADS = 2
+QUEUE_SIZE = 32
+BATCH_SIZE = 8
+POLL_INTERVAL = 0.05
+
+
+class PipelineStopped(Exception):
+    pass
+
+
+class QueueStats:
+    __slots__ = (
+        "name",
+        "capacity",
+        "items",
+        "max_depth",
+        "depth_total",
+        "put_wait",
+        "get_wait",
+    )
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = capacity
+        self.items = 0
+        self.max_depth = 0
+        # depth summed at every put, for the mean
+        self.depth_total = 0
+        # producers blocked on a full queue: the next stage is the bottleneck
+        self.put_wait = 0.0
+        # consumers blocked on an empty queue: the previous stage is
+        self.get_wait = 0.0
+
+    @property
+    def mean_depth(self) -> float:
+        return self.depth_total / self.items if self.items else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "items": self.items,
+            "max_depth": self.max_depth,
+            "mean_depth": self.mean_depth,
+            "put_wait": self.put_wait,
+            "get_wait": self.get_wait,
+        }
+
+
+class StageQueue:
+    # a bounded queue between two pipeline stages; a full queue blocks its
+    # producers, which is what keeps memory flat however large the site is.
+    # Every blocking call gives up once `stop` is set.
+    def __init__(self, name: str, capacity: int, stop: threading.Event):
+        self.queue = queue.Queue(capacity)
+        self.stats = QueueStats(name, capacity)
+        self.stop = stop
+        self.lock = threading.Lock()
+
+    def put(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            start = time.perf_counter()
+            while True:
+                if self.stop.is_set():
+                    raise PipelineStopped
+                try:
+                    self.queue.put(item, timeout=POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    continue
+            with self.lock:
+                self.stats.put_wait += time.perf_counter() - start
+        depth = self.queue.qsize()
+        with self.lock:
+            self.stats.items += 1
+            self.stats.depth_total += depth
+            self.stats.max_depth = max(self.stats.max_depth, depth)
+
+    def get(self):
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        start = time.perf_counter()
+        while True:
+            if self.stop.is_set():
+                raise PipelineStopped
+            try:
+                item = self.queue.get(timeout=POLL_INTERVAL)
+                break
+            except queue.Empty:
+                continue
+        with self.lock:
+            self.stats.get_wait += time.perf_counter() - start
+        return item
+
+    def get_batch(self, limit: int) -> list:
+        # blocks for one item, then takes whatever else is ready up to
+        # `limit`; stops after the None that ends the stream
+        items = [self.get()]
+        while len(items) < limit and items[-1] is not None:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+
+def start_stage(
+    target, stop: threading.Event, errors: list[BaseException]
+) -> threading.Thread:
+    # a stage thread ends quietly when the pipeline is stopped under it; if
+    # it fails instead, it stops the pipeline and leaves the error in `errors`
+    def run():
+        try:
+            target()
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+class Pipeline:
+    def __init__(
+        self,
+        io_threads: int = IO_THREADS,
+        queue_size: int = QUEUE_SIZE,
+        batch_size: int = BATCH_SIZE,
+    ):
+        # settings for a pipelined build plus the queue metrics it leaves
+        # behind; metrics of repeated builds add up. Pages go to the worker
+        # processes `batch_size` at a time to spread the per-task overhead.
+        self.io_threads = max(1, io_threads)
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.queues: dict[str, QueueStats] = {}
+        self.seconds = 0.0
+
+    def make_queue(self, name: str, stop: threading.Event) -> StageQueue:
+        stage_queue = StageQueue(name, self.queue_size, stop)
+        previous = self.queues.get(name)
+        if previous is not None:
+            stage_queue.stats = previous
+        self.queues[name] = stage_queue.stats
+        return stage_queue
+
+    def to_dict(self) -> dict:
+        return {
+            "io_threads": self.io_threads,
+            "queue_size": self.queue_size,
+            "batch_size": self.batch_size,
+            "seconds": self.seconds,
+            "queues": {name: stats.to_dict() for name, stats in self.queues.items()},
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"Pipeline: {self.io_threads} I/O threads per stage, queues of "
+            f"{self.queue_size}, batches of {self.batch_size}, "
+            f"{self.seconds:.3f} s",
+            f"  {'queue':>8} {'items':>7} {'max':>5} {'mean':>6} "
+            f"{'producers blocked':>18} {'consumers idle':>15}",
+        ]
+        for name, stats in self.queues.items():
+            lines.append(
+                f"  {name:>8} {stats.items:>7} {stats.max_depth:>5} "
+                f"{stats.mean_depth:>6.1f} {stats.put_wait:>16.3f} s "
+                f"{stats.get_wait:>13.3f} s"
+            )
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"Pipeline(io_threads={self.io_threads}, queue_size={self.queue_size})"
@@ -0,0 +1,131 @@
+import sys
+import time
+
+STAGES = (
+    "read",
+    "block_split",
+    "inline_parse",
+    "transform",
+    "render",
+    "template_fill",
+    "write",
+)
+
+
+class StageTimer:
+    __slots__ = ("stages", "plugins", "_last")
+
+    def __init__(self):
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        # the share of each transform plugin in the "transform" stage
+        self.plugins: dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        # charges the time since the previous mark to `stage`
+        now = time.perf_counter()
+        self.stages[stage] += now - self._last
+        self._last = now
+
+
+class BuildProfile:
+    def __init__(self):
+        self.pages: dict[str, dict[str, float]] = {}
+        # transform plugin seconds summed over all pages
+        self.plugins: dict[str, float] = {}
+        self.seconds = 0.0
+
+    def record(
+        self,
+        path: str,
+        stages: dict[str, float],
+        plugins: dict[str, float] | None = None,
+    ) -> None:
+        self.pages[path] = stages
+        for name, seconds in (plugins or {}).items():
+            self.plugins[name] = self.plugins.get(name, 0.0) + seconds
+
+    def stage_totals(self) -> dict[str, float]:
+        totals = dict.fromkeys(STAGES, 0.0)
+        for stages in self.pages.values():
+            for stage, seconds in stages.items():
+                totals[stage] += seconds
+        return totals
+
+    def slowest(self, count: int) -> list[tuple[str, float]]:
+        totals = ((path, sum(stages.values())) for path, stages in self.pages.items())
+        return sorted(totals, key=lambda item: item[1], reverse=True)[:count]
+
+    def to_dict(self, slowest: int = 10) -> dict:
+        totals = self.stage_totals()
+        return {
+            "pages": len(self.pages),
+            "wall_seconds": self.seconds,
+            "stages": totals,
+            "plugins": self.plugins,
+            "slowest": [
+                {"path": path, "seconds": seconds, "stages": self.pages[path]}
+                for path, seconds in self.slowest(slowest)
+            ],
+            "per_page": self.pages,
+        }
+
+    def summary(self, slowest: int = 10) -> str:
+        totals = self.stage_totals()
+        busy = sum(totals.values())
+        width = max([13, *(len(name) for name in self.plugins)])
+        lines = [
+            f"Profiled {len(self.pages)} pages in {self.seconds:.3f} s "
+            f"({busy:.3f} s of page work)"
+        ]
+        for stage, seconds in totals.items():
+            share = seconds / busy if busy else 0.0
+            lines.append(f"  {stage:>{width}} {seconds:>9.3f} s {share:>6.1%}")
+        if self.plugins:
+            transform = totals["transform"]
+            lines.append("Transform plugins:")
+            for name, seconds in self.plugins.items():
+                share = seconds / transform if transform else 0.0
+                lines.append(f"  {name:>{width}} {seconds:>9.3f} s {share:>6.1%}")
+        if self.pages:
+            lines.append(f"Slowest {min(slowest, len(self.pages))} pages:")
+            for path, seconds in self.slowest(slowest):
+                lines.append(f"  {seconds * 1000:>9.2f} ms  {path}")
+        return "\n".join(lines)
+
+
+class Progress:
+    def __init__(self, interval: float = 1.0, stream=None):
+        # one status line per `interval` seconds at most, however many pages
+        self.interval = interval
+        self.stream = stream or sys.stdout
+        self.total = 0
+        self.done = 0
+        self._start = 0.0
+        self._next = 0.0
+
+    def start(self, total: int) -> None:
+        self.total = total
+        self.done = 0
+        self._start = time.monotonic()
+        self._next = self._start + self.interval
+
+    def update(self, count: int = 1) -> None:
+        self.done += count
+        now = time.monotonic()
+        if now >= self._next:
+            self._next = now + self.interval
+            self._report(now)
+
+    def finish(self) -> None:
+        if self.total:
+            self._report(time.monotonic())
+
+    def _report(self, now: float) -> None:
+        elapsed = now - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        print(
+            f"  {self.done}/{self.total} pages ({rate:.0f} pages/s)",
+            file=self.stream,
+            flush=True,
+        )
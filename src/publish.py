@@ -0,0 +1,173 @@
+import os
+import shutil
+
+GENERATION_PREFIX = "gen-"
+STAGING_PREFIX = "staging-"
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class PublishError(Exception):
+    pass
+
+
+def link_tree(src_dir: str, dst_dir: str) -> int:
+    # hardlink every file of src_dir into dst_dir, so unchanged outputs cost
+    # nothing to carry over; every later write replaces a file by rename, so
+    # the previous generation is never written through
+    linked = 0
+    for dirpath, _, filenames in os.walk(src_dir):
+        rel_dir = os.path.relpath(dirpath, src_dir)
+        target_dir = os.path.normpath(os.path.join(dst_dir, rel_dir))
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in filenames:
+            src_path = os.path.join(dirpath, filename)
+            dst_path = os.path.join(target_dir, filename)
+            try:
+                os.link(src_path, dst_path)
+            except OSError:
+                # different filesystem or no hardlink support
+                shutil.copy2(src_path, dst_path)
+            linked += 1
+    return linked
+
+
+def is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # alive, owned by someone else
+        return True
+    return True
+
+
+class Publisher:
+    def __init__(self, public_path: str, generations_dir: str, keep: int = 3):
+        # public_path becomes a symlink to the live generation; `keep` older
+        # generations stay around for rollback
+        self.public_path = public_path
+        self.generations_dir = generations_dir
+        self.keep = keep
+
+    def generations(self) -> list[str]:
+        if not os.path.isdir(self.generations_dir):
+            return []
+        return sorted(
+            name
+            for name in os.listdir(self.generations_dir)
+            if name.startswith(GENERATION_PREFIX)
+            and not name.endswith(MANIFEST_SUFFIX)
+        )
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.generations_dir, name)
+
+    def manifest_path(self, generation_path: str) -> str:
+        # each generation has the manifest it was built with, so incremental
+        # builds stay correct after a rollback
+        return generation_path.rstrip(os.sep) + MANIFEST_SUFFIX
+
+    def current(self) -> str | None:
+        if not os.path.islink(self.public_path):
+            return None
+        return os.path.basename(os.readlink(self.public_path).rstrip("/"))
+
+    def current_path(self) -> str | None:
+        current = self.current()
+        if current is not None:
+            return self.path(current)
+        if os.path.isdir(self.public_path):
+            return self.public_path
+        return None
+
+    def stage(self, reuse: bool = True) -> str:
+        os.makedirs(self.generations_dir, exist_ok=True)
+        for name in os.listdir(self.generations_dir):
+            if self._is_stale(name):
+                self.discard(self.path(name))
+        stage_path = self.path(f"{STAGING_PREFIX}{os.getpid()}")
+        os.makedirs(stage_path)
+        current_path = self.current_path()
+        if reuse and current_path is not None:
+            link_tree(current_path, stage_path)
+            current_manifest = self.manifest_path(current_path)
+            if current_path != self.public_path and os.path.exists(current_manifest):
+                shutil.copy2(current_manifest, self.manifest_path(stage_path))
+        return stage_path
+
+    def _is_stale(self, name: str) -> bool:
+        # a staging dir left behind by a build that crashed, or an earlier
+        # one of this process; another build may still be writing the rest
+        if not name.startswith(STAGING_PREFIX) or name.endswith(MANIFEST_SUFFIX):
+            return False
+        pid = name[len(STAGING_PREFIX) :]
+        if not pid.isdigit():
+            return False
+        return int(pid) == os.getpid() or not is_running(int(pid))
+
+    def discard(self, stage_path: str) -> None:
+        shutil.rmtree(stage_path, ignore_errors=True)
+        if os.path.exists(self.manifest_path(stage_path)):
+            os.remove(self.manifest_path(stage_path))
+
+    def _next_name(self) -> str:
+        generations = self.generations()
+        number = 1
+        if generations:
+            number = int(generations[-1][len(GENERATION_PREFIX) :]) + 1
+        return f"{GENERATION_PREFIX}{number:06d}"
+
+    def _swap(self, name: str) -> None:
+        # a new symlink renamed over the old one: readers see either the old
+        # generation or the new one, never a missing or half-built site
+        target = os.path.relpath(
+            self.path(name), os.path.dirname(os.path.abspath(self.public_path))
+        )
+        tmp_link = f"{self.public_path}.swap"
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(target, tmp_link)
+        os.replace(tmp_link, self.public_path)
+
+    def publish(self, stage_path: str) -> str:
+        if os.path.isdir(self.public_path) and not os.path.islink(self.public_path):
+            # first publish over a plain directory: adopt it as the oldest
+            # generation; only this one-time switch has a brief gap
+            os.rename(self.public_path, self.path(self._next_name()))
+        name = self._next_name()
+        os.rename(stage_path, self.path(name))
+        if os.path.exists(self.manifest_path(stage_path)):
+            os.rename(
+                self.manifest_path(stage_path), self.manifest_path(self.path(name))
+            )
+        self._swap(name)
+        self.prune()
+        return name
+
+    def rollback(self, steps: int = 1) -> str:
+        generations = self.generations()
+        current = self.current()
+        if current not in generations:
+            raise PublishError(f"{self.public_path} is not a published generation")
+        index = generations.index(current) - steps
+        if index < 0:
+            raise PublishError(f"No generation {steps} before {current}")
+        name = generations[index]
+        self._swap(name)
+        return name
+
+    def prune(self) -> list[str]:
+        # keep the live generation, the `keep` before it, and anything newer
+        # (left there by a rollback)
+        generations = self.generations()
+        current = self.current()
+        if current not in generations:
+            return []
+        oldest_kept = max(0, generations.index(current) - self.keep)
+        removed = generations[:oldest_kept]
+        for name in removed:
+            shutil.rmtree(self.path(name))
+            if os.path.exists(self.manifest_path(self.path(name))):
+                os.remove(self.manifest_path(self.path(name)))
+        return removed
@@ -0,0 +1,182 @@
+import hashlib
+import os
+
+from src.fs_utils import prune_empty_dirs
+from src.manifest import BuildManifest, hash_file
+from src.static_sync import is_unchanged, list_files, place_file
+
+SHARD_PREFIX = "shard-"
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+class ShardError(Exception):
+    pass
+
+
+def shard_index(source: str, count: int) -> int:
+    # stable across machines, Python versions and PYTHONHASHSEED, unlike
+    # hash(); sources are keyed by their path relative to the content root
+    key = source.replace(os.sep, "/").encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % count + 1
+
+
+class Shard:
+    def __init__(self, index: int, count: int):
+        # 1-based: shard 1/4 through 4/4
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, text: str) -> "Shard":
+        index, _, count = text.partition("/")
+        try:
+            return cls(int(index), int(count))
+        except ValueError:
+            raise ValueError(f"Invalid shard {text!r}, expected e.g. 2/4") from None
+
+    @property
+    def name(self) -> str:
+        return f"{SHARD_PREFIX}{self.index}-of-{self.count}"
+
+    def owns(self, source: str) -> bool:
+        return shard_index(source, self.count) == self.index
+
+    def __eq__(self, other):
+        if isinstance(other, Shard):
+            return (self.index, self.count) == (other.index, other.count)
+        return False
+
+    def __hash__(self):
+        return hash((self.index, self.count))
+
+    def __str__(self):
+        return f"{self.index}/{self.count}"
+
+    def __repr__(self):
+        return f"Shard({self.index}/{self.count})"
+
+
+def shard_manifest_path(shard_dir: str) -> str:
+    return shard_dir.rstrip(os.sep) + MANIFEST_SUFFIX
+
+
+def find_shards(shards_dir: str) -> list[str]:
+    if not os.path.isdir(shards_dir):
+        return []
+    return sorted(
+        os.path.join(shards_dir, name)
+        for name in os.listdir(shards_dir)
+        if name.startswith(SHARD_PREFIX)
+        and os.path.isdir(os.path.join(shards_dir, name))
+    )
+
+
+class MergeReport:
+    def __init__(self):
+        self.shards: list[Shard] = []
+        self.copied: list[str] = []
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        # files several shards wrote identically, e.g. static files
+        self.shared: list[str] = []
+
+    def __repr__(self):
+        return (
+            f"MergeReport(shards={len(self.shards)}, copied={len(self.copied)}, "
+            f"skipped={len(self.skipped)}, removed={len(self.removed)}, "
+            f"shared={len(self.shared)})"
+        )
+
+
+def _same_contents(path: str, other_path: str) -> bool:
+    if os.path.getsize(path) != os.path.getsize(other_path):
+        return False
+    return hash_file(path) == hash_file(other_path)
+
+
+def load_shards(shard_dirs: list[str]) -> list[tuple[Shard, str, BuildManifest]]:
+    # every shard of one split, each exactly once, or a ShardError
+    shards = []
+    for shard_dir in shard_dirs:
+        manifest = BuildManifest.load(shard_manifest_path(shard_dir))
+        if manifest.shard is None:
+            raise ShardError(f"{shard_dir} has no shard manifest")
+        shards.append((Shard.parse(manifest.shard), shard_dir, manifest))
+    if not shards:
+        raise ShardError("No shards to merge")
+
+    counts = {shard.count for shard, _, _ in shards}
+    if len(counts) > 1:
+        raise ShardError(f"Shards of different splits: {sorted(counts)}")
+    count = counts.pop()
+    by_index: dict[int, str] = {}
+    for shard, shard_dir, _ in shards:
+        if shard.index in by_index:
+            raise ShardError(
+                f"Shard {shard} found twice: {by_index[shard.index]}, {shard_dir}"
+            )
+        by_index[shard.index] = shard_dir
+    missing = sorted(set(range(1, count + 1)) - set(by_index))
+    if missing:
+        names = ", ".join(f"{index}/{count}" for index in missing)
+        raise ShardError(f"Missing shards: {names}")
+    return sorted(shards, key=lambda item: item[0].index)
+
+
+def merge_shards(
+    shard_dirs: list[str],
+    dest_dir: str,
+    manifest: BuildManifest,
+    link: str = "copy",
+) -> MergeReport:
+    # checks everything before touching dest_dir: a missing shard or two
+    # shards disagreeing about a file leave the previous merge in place
+    shards = load_shards(shard_dirs)
+    report = MergeReport()
+    report.shards = [shard for shard, _, _ in shards]
+
+    pages = {}
+    owners: dict[str, str] = {}
+    collisions = []
+    for shard, shard_dir, shard_manifest in shards:
+        for source, entry in shard_manifest.pages.items():
+            if source in pages:
+                collisions.append(f"page {source} built by more than one shard")
+            pages[source] = entry
+        for rel_path in list_files(shard_dir):
+            src_path = os.path.join(shard_dir, rel_path)
+            owner = owners.get(rel_path)
+            if owner is None:
+                owners[rel_path] = src_path
+            elif _same_contents(owner, src_path):
+                report.shared.append(rel_path)
+            else:
+                collisions.append(
+                    f"{rel_path} differs between {owner} and {src_path}"
+                )
+    if collisions:
+        raise ShardError("Shard outputs collide:\n  " + "\n  ".join(collisions))
+
+    manifest.pages = pages
+    manifest.shard = None
+    manifest.assets = sorted(
+        {asset for _, _, shard_manifest in shards for asset in shard_manifest.assets}
+    )
+    for rel_path in sorted(owners):
+        src_path = owners[rel_path]
+        dst_path = os.path.join(dest_dir, rel_path)
+        if is_unchanged(src_path, dst_path):
+            report.skipped.append(rel_path)
+            continue
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        place_file(src_path, dst_path, link)
+        report.copied.append(rel_path)
+    for rel_path in list_files(dest_dir):
+        if rel_path not in owners:
+            dst_path = os.path.join(dest_dir, rel_path)
+            os.remove(dst_path)
+            prune_empty_dirs(os.path.dirname(dst_path), dest_dir)
+            report.removed.append(rel_path)
+    return report
@@ -0,0 +1,139 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+
+from src.compress import gzip_stamp, remove_gzip_sibling
+from src.fs_utils import prune_empty_dirs
+from src.manifest import hash_file
+
+LINK_MODES = ("copy", "hardlink", "reflink")
+SYNC_THREADS = 8
+# linux/fs.h FICLONE: share the source's extents instead of copying bytes
+FICLONE = 0x40049409
+
+
+class SyncReport:
+    def __init__(self):
+        self.copied: list[str] = []
+        self.skipped: list[str] = []
+        self.removed: list[str] = []
+        self.files: list[str] = []
+        self.bytes_copied = 0
+        self.bytes_skipped = 0
+
+    def __repr__(self):
+        return (
+            f"SyncReport(copied={len(self.copied)} ({self.bytes_copied} bytes), "
+            f"skipped={len(self.skipped)} ({self.bytes_skipped} bytes), "
+            f"removed={len(self.removed)})"
+        )
+
+
+def list_files(root: str) -> list[str]:
+    files = []
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            files.append(os.path.relpath(path, root))
+    return sorted(files)
+
+
+def is_unchanged(src_path: str, dst_path: str, checksum: bool = False) -> bool:
+    try:
+        dst_stat = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    src_stat = os.stat(src_path)
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(src_path) == hash_file(dst_path)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def _reflink(src_path: str, dst_path: str) -> None:
+    import fcntl
+
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    shutil.copystat(src_path, dst_path)
+
+
+def place_file(src_path: str, dst_path: str, link: str = "copy") -> None:
+    # build next to the destination and rename over it, so readers never see
+    # a half-written file and hardlinked destinations are never written through
+    tmp_path = f"{dst_path}.sync-tmp"
+    stamp = gzip_stamp(dst_path)
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        if link == "hardlink":
+            os.link(src_path, tmp_path)
+        elif link == "reflink":
+            _reflink(src_path, tmp_path)
+        else:
+            shutil.copy2(src_path, tmp_path)
+    except OSError:
+        # different filesystem or no reflink support: fall back to a copy
+        if link == "copy":
+            raise
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        shutil.copy2(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
+    remove_gzip_sibling(dst_path, stamp)
+
+
+def sync_static(
+    src_dir: str,
+    dst_dir: str,
+    previous: Iterable[str] = (),
+    link: str = "copy",
+    checksum: bool = False,
+    threads: int = SYNC_THREADS,
+) -> SyncReport:
+    if link not in LINK_MODES:
+        raise ValueError(f"Invalid link mode: {link}")
+
+    report = SyncReport()
+    report.files = list_files(src_dir)
+    to_copy = []
+    for rel_path in report.files:
+        src_path = os.path.join(src_dir, rel_path)
+        dst_path = os.path.join(dst_dir, rel_path)
+        size = os.path.getsize(src_path)
+        if is_unchanged(src_path, dst_path, checksum):
+            report.skipped.append(rel_path)
+            report.bytes_skipped += size
+        else:
+            to_copy.append((rel_path, size))
+
+    for dir_path in sorted({os.path.dirname(rel_path) for rel_path, _ in to_copy}):
+        os.makedirs(os.path.join(dst_dir, dir_path), exist_ok=True)
+
+    def copy(item: tuple[str, int]) -> None:
+        rel_path = item[0]
+        place_file(
+            os.path.join(src_dir, rel_path), os.path.join(dst_dir, rel_path), link
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        # list() re-raises the first copy error, if any
+        list(executor.map(copy, to_copy))
+    for rel_path, size in to_copy:
+        report.copied.append(rel_path)
+        report.bytes_copied += size
+
+    for rel_path in sorted(set(previous) - set(report.files)):
+        dst_path = os.path.join(dst_dir, rel_path)
+        if os.path.exists(dst_path):
+            stamp = gzip_stamp(dst_path)
+            os.remove(dst_path)
+            remove_gzip_sibling(dst_path, stamp)
+            prune_empty_dirs(os.path.dirname(dst_path), dst_dir)
+        report.removed.append(rel_path)
+
+    return report
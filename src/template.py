@@ -0,0 +1,119 @@
+import itertools
+import os
+import re
+from typing import Iterator
+
+from src.htmlnode import write_chunks
+
+SLOT_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+FRONT_MATTER_DELIMITER = "---"
+
+
+class Template:
+    def __init__(self, text: str):
+        # segments[i] is the literal text before slots[i]; the last segment
+        # trails the final slot, so len(segments) == len(slots) + 1
+        self.segments: list[str] = []
+        self.slots: list[str] = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(text):
+            self.segments.append(text[position : match.start()])
+            self.slots.append(match.group(1).lower())
+            position = match.end()
+        self.segments.append(text[position:])
+        self.repeated = frozenset(
+            slot for slot in self.slots if self.slots.count(slot) > 1
+        )
+
+    def iter_render(self, values: dict):
+        # a value may be a string or an iterable of string chunks, e.g.
+        # HTMLNode.iter_html(), which is streamed straight through. An
+        # iterable can only be read once, so for a slot the template uses
+        # more than once it is joined up front instead.
+        if self.repeated:
+            values = dict(values)
+            for slot in self.repeated:
+                value = values.get(slot, "")
+                if not isinstance(value, str):
+                    values[slot] = "".join(value)
+        yield self.segments[0]
+        for slot, segment in zip(self.slots, self.segments[1:]):
+            value = values.get(slot, "")
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+            yield segment
+
+    def render(self, values: dict) -> str:
+        return "".join(self.iter_render(values))
+
+    def write(self, fp, values: dict) -> None:
+        write_chunks(fp, self.iter_render(values))
+
+    def map_segments(self, fn) -> "Template":
+        # a copy with every literal segment passed through fn; slots stay put
+        template = Template.__new__(Template)
+        template.segments = [fn(segment) for segment in self.segments]
+        template.slots = list(self.slots)
+        template.repeated = self.repeated
+        return template
+
+    def __repr__(self):
+        return f"Template({self.slots})"
+
+
+_template_cache: dict[str, tuple[int, int, Template]] = {}
+
+
+def load_template(template_path: str) -> Template:
+    # compiled once per process; recompiled only if the file changes on disk
+    key = os.path.abspath(template_path)
+    stat = os.stat(key)
+    cached = _template_cache.get(key)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(key, "r") as f:
+        template = Template(f.read())
+    _template_cache[key] = (stat.st_mtime_ns, stat.st_size, template)
+    return template
+
+
+def parse_front_matter(markdown: str) -> tuple[dict[str, str], str]:
+    lines = markdown.split("\n")
+    if not lines or lines[0].strip() != FRONT_MATTER_DELIMITER:
+        return {}, markdown
+
+    variables = {}
+    for i, line in enumerate(lines[1:], start=1):
+        stripped = line.strip()
+        if stripped == FRONT_MATTER_DELIMITER:
+            return variables, "\n".join(lines[i + 1 :])
+        if stripped == "" or stripped.startswith("#"):
+            continue
+        key, separator, value = stripped.partition(":")
+        if separator == "":
+            raise ValueError(f"Invalid front matter line: {line}")
+        value = value.strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        variables[key.strip().lower()] = value
+
+    raise ValueError("Front matter is missing its closing delimiter!")
+
+
+def read_front_matter(lines: Iterator[str]) -> tuple[dict[str, str], Iterator[str]]:
+    # parse_front_matter for a stream of lines: only the front matter is read
+    # ahead, the returned iterator carries on with the body
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.strip() != FRONT_MATTER_DELIMITER:
+        return {}, itertools.chain([first], lines)
+    header = [first]
+    for line in lines:
+        header.append(line)
+        if line.strip() == FRONT_MATTER_DELIMITER:
+            break
+    variables, _ = parse_front_matter("".join(header))
+    return variables, lines
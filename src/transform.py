@@ -0,0 +1,294 @@
+import hashlib
+import json
+import re
+import time
+from typing import Iterable
+
+from src.constants import HTMLProps, HTMLTags
+from src.htmlnode import HTMLNode, LeafNode, ParentNode, copy_node
+from src.profiling import StageTimer
+
+HEADING_TAGS = frozenset(f"h{level}" for level in range(1, 7))
+SLUG_STRIP_PATTERN = re.compile(r"[^\w\s-]")
+SLUG_SPACE_PATTERN = re.compile(r"[\s_-]+")
+EXTERNAL_URL_PATTERN = re.compile(r"^(?:https?:)?//", re.IGNORECASE)
+
+PLUGINS: dict[str, type["Plugin"]] = {}
+
+
+def register_plugin(cls: type["Plugin"]) -> type["Plugin"]:
+    PLUGINS[cls.name] = cls
+    return cls
+
+
+class PageContext:
+    # state the plugins share while one page is walked
+    __slots__ = ("ids", "headings", "variables")
+
+    def __init__(self):
+        self.ids: set[str] = set()
+        # (level, id, text) of every heading, in page order
+        self.headings: list[tuple[int, str, str]] = []
+        # extra template variables, e.g. {{ Toc }}
+        self.variables: dict[str, str] = {}
+
+
+class Plugin:
+    # one post-processing step over the nodes of a page. visit() returns a
+    # replacement for a node or None to keep it; it must not change the node
+    # itself, which may be cached and shared with other pages.
+    name = ""
+    # bump when the output changes, so pages built with the old one are redone
+    version = 1
+    # the tags visit() is called for; None for every node
+    tags: frozenset[str] | None = None
+    # plugins that have to see each node before this one
+    requires: tuple[str, ...] = ()
+    # finish() needs the whole page, so the page cannot be streamed
+    page_level = False
+
+    def visit(self, node: HTMLNode, page: PageContext) -> HTMLNode | None:
+        return None
+
+    def finish(self, page: PageContext) -> None:
+        pass
+
+
+def with_props(node: HTMLNode, props: dict[str, str]) -> HTMLNode:
+    merged = dict(node.props) if node.props else {}
+    merged.update(props)
+    return copy_node(node, props=merged)
+
+
+def node_text(node: HTMLNode) -> str:
+    parts = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(reversed(node.children))
+        elif node.value is not None:
+            parts.append(node.value)
+    return "".join(parts)
+
+
+def slugify(text: str) -> str:
+    slug = SLUG_STRIP_PATTERN.sub("", text.lower()).strip()
+    return SLUG_SPACE_PATTERN.sub("-", slug).strip("-") or "section"
+
+
+def unique_id(slug: str, ids: set[str]) -> str:
+    anchor = slug
+    count = 0
+    while anchor in ids:
+        count += 1
+        anchor = f"{slug}-{count}"
+    return anchor
+
+
+@register_plugin
+class HeadingAnchors(Plugin):
+    # an id on every heading, from its text, unique within the page
+    name = "anchors"
+    tags = HEADING_TAGS
+
+    def visit(self, node, page):
+        text = node_text(node)
+        anchor = node.props.get(HTMLProps.ID) if node.props else None
+        replacement = None
+        if anchor is None:
+            anchor = unique_id(slugify(text), page.ids)
+            replacement = with_props(node, {HTMLProps.ID: anchor})
+        page.ids.add(anchor)
+        page.headings.append((int(node.tag[1]), anchor, text))
+        return replacement
+
+
+@register_plugin
+class TableOfContents(Plugin):
+    # {{ Toc }}: nested lists of links to the page's h2 and h3 headings
+    name = "toc"
+    tags = frozenset()
+    requires = ("anchors",)
+    page_level = True
+    min_level = 2
+    max_level = 3
+
+    def finish(self, page):
+        headings = [
+            heading
+            for heading in page.headings
+            if self.min_level <= heading[0] <= self.max_level
+        ]
+        page.variables["toc"] = toc_node(headings).to_html() if headings else ""
+
+
+def toc_node(headings: list[tuple[int, str, str]]) -> ParentNode:
+    # each heading goes under the closest one before it of a higher level
+    entries: list = []
+    stack = [(0, entries)]
+    for level, anchor, text in headings:
+        while stack[-1][0] >= level:
+            stack.pop()
+        nested: list = []
+        stack[-1][1].append((anchor, text, nested))
+        stack.append((level, nested))
+    return _toc_list(entries)
+
+
+def _toc_list(entries: list) -> ParentNode:
+    # recurses once per heading level, six at most
+    items = []
+    for anchor, text, nested in entries:
+        children = [LeafNode(HTMLTags.LINK, text, {HTMLProps.LINK: f"#{anchor}"})]
+        if nested:
+            children.append(_toc_list(nested))
+        items.append(ParentNode(HTMLTags.LIST_ITEM, children))
+    return ParentNode(HTMLTags.UNORDERED_LIST, items)
+
+
+@register_plugin
+class ExternalLinks(Plugin):
+    # links off the site open in a new tab, without access to this one
+    name = "external-links"
+    tags = frozenset({HTMLTags.LINK})
+    props = {HTMLProps.TARGET: "_blank", HTMLProps.REL: "noopener noreferrer"}
+
+    def visit(self, node, page):
+        href = node.props.get(HTMLProps.LINK, "") if node.props else ""
+        if EXTERNAL_URL_PATTERN.match(href):
+            return with_props(node, self.props)
+        return None
+
+
+@register_plugin
+class LazyImages(Plugin):
+    name = "lazy-images"
+    tags = frozenset({HTMLTags.IMAGE})
+    props = {HTMLProps.LOADING: "lazy", HTMLProps.DECODING: "async"}
+
+    def visit(self, node, page):
+        return with_props(node, self.props)
+
+
+def load_plugins(names: Iterable[str]) -> list[Plugin]:
+    # in the order given, each preceded by the plugins it requires
+    order: list[str] = []
+    for name in names:
+        if name not in PLUGINS:
+            raise ValueError(
+                f"Unknown plugin {name!r}, expected one of {', '.join(PLUGINS)}"
+            )
+        for required in (*PLUGINS[name].requires, name):
+            if required not in order:
+                order.append(required)
+    return [PLUGINS[name]() for name in order]
+
+
+def _replace_child(node: HTMLNode, copied: list, index: int, new: HTMLNode) -> None:
+    # copy-on-write: the children are copied at the first one that changes
+    if copied[0] is None:
+        copied[0] = list(node.children)
+    copied[0][index] = new
+
+
+class Transformer:
+    # runs all plugins in a single walk over a page: each node is offered to
+    # the plugins registered for its tag, in order, each seeing the node as
+    # the ones before it left it. A changed node is copied along with its
+    # ancestors; everything else stays shared with the tree passed in.
+    def __init__(self, plugins: list[Plugin]):
+        self.plugins = plugins
+        self.names = [plugin.name for plugin in plugins]
+        self.page_level = any(plugin.page_level for plugin in plugins)
+        self.every = [plugin for plugin in plugins if plugin.tags is None]
+        tags = set()
+        for plugin in plugins:
+            tags.update(plugin.tags or ())
+        self.by_tag = {
+            tag: [
+                plugin
+                for plugin in plugins
+                if plugin.tags is None or tag in plugin.tags
+            ]
+            for tag in tags
+        }
+
+    @classmethod
+    def from_names(cls, names: Iterable[str]) -> "Transformer":
+        return cls(load_plugins(names))
+
+    @property
+    def digest(self) -> str:
+        versions = [[plugin.name, plugin.version] for plugin in self.plugins]
+        return hashlib.sha256(json.dumps(versions).encode()).hexdigest()[:16]
+
+    def apply(
+        self, root: HTMLNode, page: PageContext, timer: StageTimer | None = None
+    ) -> HTMLNode:
+        # called once per page, or once per block of a streamed page
+        visit = self._visit if timer is None else self._timed_visit(timer)
+        by_tag, every = self.by_tag, self.every
+        root = visit(root, page)
+        if not isinstance(root, ParentNode) or not root.children:
+            return root
+        # (node, its remaining children, [its copied children or None], its
+        # index in the parent)
+        stack = [(root, enumerate(root.children), [None], None)]
+        while True:
+            node, children, copied, position = stack[-1]
+            for index, child in children:
+                # nodes no plugin asks for are passed over without a call
+                new = visit(child, page) if by_tag.get(child.tag, every) else child
+                if isinstance(new, ParentNode) and new.children:
+                    stack.append((new, enumerate(new.children), [None], index))
+                    break
+                if new is not child:
+                    _replace_child(node, copied, index, new)
+            else:
+                stack.pop()
+                if copied[0] is not None:
+                    node = copy_node(node, children=copied[0])
+                if not stack:
+                    return node
+                parent, _, parent_copied, _ = stack[-1]
+                if node is not parent.children[position]:
+                    _replace_child(parent, parent_copied, position, node)
+
+    def finish(
+        self, page: PageContext, timer: StageTimer | None = None
+    ) -> dict[str, str]:
+        for plugin in self.plugins:
+            start = time.perf_counter()
+            plugin.finish(page)
+            if timer is not None:
+                seconds = timer.plugins.get(plugin.name, 0.0)
+                timer.plugins[plugin.name] = seconds + time.perf_counter() - start
+        return page.variables
+
+    def _visit(self, node: HTMLNode, page: PageContext) -> HTMLNode:
+        for plugin in self.by_tag.get(node.tag, self.every):
+            new = plugin.visit(node, page)
+            if new is not None:
+                node = new
+        return node
+
+    def _timed_visit(self, timer: StageTimer):
+        plugins = timer.plugins
+        for name in self.names:
+            plugins.setdefault(name, 0.0)
+        perf_counter = time.perf_counter
+
+        def visit(node: HTMLNode, page: PageContext) -> HTMLNode:
+            for plugin in self.by_tag.get(node.tag, self.every):
+                start = perf_counter()
+                new = plugin.visit(node, page)
+                plugins[plugin.name] += perf_counter() - start
+                if new is not None:
+                    node = new
+            return node
+
+        return visit
+
+    def __repr__(self):
+        return f"Transformer({', '.join(self.names)})"
@@ -0,0 +1,255 @@
+import hashlib
+import os
+import struct
+from array import array
+
+from src.htmlnode import HTMLNode, LeafNode, ParentNode
+
+# magic, format version, string length and int typecodes, string count,
+# int count
+HEADER = struct.Struct("<4sHccII")
+MAGIC = b"HTN\x00"
+FORMAT_VERSION = 1
+LEAF = 0
+PARENT = 1
+TREE_SUFFIX = ".tree"
+DEFAULT_TREE_CACHE_BYTES = 256 << 20
+
+
+class CacheFormatError(Exception):
+    pass
+
+
+def compact_array(values) -> array:
+    # the narrowest unsigned typecode that holds every value
+    values = array("I", values)
+    largest = max(values, default=0)
+    for typecode in ("B", "H"):
+        if largest < 1 << (8 * array(typecode).itemsize):
+            return array(typecode, values)
+    return values
+
+
+def encode_tree(root: HTMLNode) -> bytes:
+    # pre-order walk into a flat array of ints that index a string table;
+    # per node: kind, tag, [value,] props count + 1 (0 = None), key/value
+    # pairs, [child count]. String index 0 stands for None.
+    strings: dict[str, int] = {}
+    ints = array("I")
+
+    def intern(value) -> int:
+        if value is None:
+            return 0
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings) + 1
+        return index
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ParentNode):
+            ints.append(PARENT)
+            ints.append(intern(node.tag))
+        elif isinstance(node, LeafNode):
+            ints.append(LEAF)
+            ints.append(intern(node.tag))
+            ints.append(intern(node.value))
+        else:
+            raise CacheFormatError(f"Cannot encode {type(node).__name__}")
+        if node.props is None:
+            ints.append(0)
+        else:
+            ints.append(len(node.props) + 1)
+            for key, value in node.props.items():
+                ints.append(intern(key))
+                ints.append(intern(value))
+        if isinstance(node, ParentNode):
+            ints.append(len(node.children))
+            stack.extend(reversed(node.children))
+
+    # plain str copies, so StrEnum members don't leak into the table
+    table = [str(value) for value in strings]
+    lengths = compact_array(len(value) for value in table)
+    ints = compact_array(ints)
+    return b"".join(
+        (
+            HEADER.pack(
+                MAGIC,
+                FORMAT_VERSION,
+                lengths.typecode.encode(),
+                ints.typecode.encode(),
+                len(table),
+                len(ints),
+            ),
+            lengths.tobytes(),
+            ints.tobytes(),
+            "".join(table).encode(),
+        )
+    )
+
+
+def decode_tree(data: bytes) -> HTMLNode:
+    header = HEADER.unpack_from(data)
+    magic, version, length_type, int_type, string_count, int_count = header
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise CacheFormatError("Not a tree cache entry of this version")
+    offset = HEADER.size
+    lengths = array(length_type.decode())
+    end = offset + lengths.itemsize * string_count
+    lengths.frombytes(data[offset:end])
+    ints = array(int_type.decode())
+    offset, end = end, end + ints.itemsize * int_count
+    ints.frombytes(data[offset:end])
+    offset = end
+
+    blob = data[offset:].decode()
+    strings = [None]
+    position = 0
+    for length in lengths:
+        strings.append(blob[position : position + length])
+        position += length
+
+    ints = ints.tolist()
+    new_leaf = LeafNode.__new__
+    new_parent = ParentNode.__new__
+    root = None
+    # [children of the open parent, children still to read]
+    stack: list[list] = []
+    pos = 0
+    while True:
+        kind = ints[pos]
+        if kind == LEAF:
+            # nodes are filled in directly: __init__ chains cost more than
+            # the rest of decoding
+            node = new_leaf(LeafNode)
+            node.tag = strings[ints[pos + 1]]
+            node.value = strings[ints[pos + 2]]
+            node.children = None
+            pos += 3
+        else:
+            node = new_parent(ParentNode)
+            node.tag = strings[ints[pos + 1]]
+            node.value = None
+            node.children = []
+            pos += 2
+        prop_count = ints[pos]
+        pos += 1
+        if prop_count:
+            props = {}
+            for _ in range(prop_count - 1):
+                props[strings[ints[pos]]] = strings[ints[pos + 1]]
+                pos += 2
+            node.props = props
+        else:
+            node.props = None
+
+        if stack:
+            top = stack[-1]
+            top[0].append(node)
+            top[1] -= 1
+        else:
+            root = node
+        if kind == PARENT:
+            child_count = ints[pos]
+            pos += 1
+            if child_count:
+                stack.append([node.children, child_count])
+                continue
+        while stack and stack[-1][1] == 0:
+            stack.pop()
+        if not stack:
+            return root
+
+
+class TreeCache:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_TREE_CACHE_BYTES,
+        version: str = "",
+    ):
+        # entries are keyed by source content and parser version, so a stale
+        # entry is simply never looked up again and ages out by eviction
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, markdown: str) -> str:
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(b"\0")
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + TREE_SUFFIX)
+
+    def load(self, key: str) -> HTMLNode | None:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                node = decode_tree(f.read())
+            # refresh the mtime: eviction drops the least recently used first
+            os.utime(path)
+        except (OSError, CacheFormatError, struct.error, IndexError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return node
+
+    def store(self, key: str, node: HTMLNode) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(encode_tree(node))
+        os.replace(tmp_path, path)
+
+    def entries(self) -> list[tuple[int, int, str]]:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if not filename.endswith(TREE_SUFFIX):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def evict(self) -> int:
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict[str, int]:
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __repr__(self):
+        return f"TreeCache({self.directory}, hits={self.hits}, misses={self.misses})"
@@ -0,0 +1,166 @@
+import os
+import time
+from pathlib import Path
+
+from src.build import render_pages
+from src.node_utils import discover_pages
+from src.output import DiskOutput, OutputBackend
+from src.transform import Transformer
+
+CONTENT = "content"
+STATIC = "static"
+TEMPLATE = "template"
+
+
+class Change:
+    __slots__ = ("kind", "path", "removed")
+
+    def __init__(self, kind: str, path: str, removed: bool = False):
+        self.kind = kind
+        self.path = path
+        self.removed = removed
+
+    def __eq__(self, other):
+        if isinstance(other, Change):
+            return (self.kind, self.path, self.removed) == (
+                other.kind,
+                other.path,
+                other.removed,
+            )
+        return False
+
+    def __repr__(self):
+        return f"Change({self.kind}, {self.path}, removed={self.removed})"
+
+
+def scan_tree(root: str) -> dict[str, tuple[int, int]]:
+    snapshot = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def scan_file(path: str) -> dict[str, tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return {}
+    return {path: (stat.st_mtime_ns, stat.st_size)}
+
+
+class Poller:
+    # polls mtimes and sizes; no platform file-notification APIs needed
+    def __init__(self, content_dir: str, static_dir: str, template_path: str):
+        self.sources = [
+            (CONTENT, lambda: scan_tree(content_dir)),
+            (STATIC, lambda: scan_tree(static_dir)),
+            (TEMPLATE, lambda: scan_file(template_path)),
+        ]
+        self.snapshots = {kind: scan() for kind, scan in self.sources}
+
+    def poll(self) -> list[Change]:
+        changes = []
+        for kind, scan in self.sources:
+            before = self.snapshots[kind]
+            after = scan()
+            for path in sorted(after.keys() | before.keys()):
+                if path not in after:
+                    changes.append(Change(kind, path, removed=True))
+                elif before.get(path) != after[path]:
+                    changes.append(Change(kind, path))
+            self.snapshots[kind] = after
+        return changes
+
+
+class RebuildPlan:
+    def __init__(self):
+        self.pages: list[tuple[str, str]] = []
+        self.removed_pages: list[str] = []
+        self.assets: list[tuple[str, str]] = []
+        self.removed_assets: list[str] = []
+
+    def __len__(self):
+        return (
+            len(self.pages)
+            + len(self.removed_pages)
+            + len(self.assets)
+            + len(self.removed_assets)
+        )
+
+
+def plan_rebuild(
+    changes: list[Change],
+    dir_path_content: str,
+    dir_path_static: str,
+    template_path: str,
+    dest_dir_path: str,
+) -> RebuildPlan:
+    plan = RebuildPlan()
+    if any(change.kind == TEMPLATE for change in changes):
+        # every page depends on the template
+        plan.pages = discover_pages(dir_path_content, dest_dir_path)
+
+    for change in changes:
+        if change.kind == CONTENT:
+            rel_path = os.path.relpath(change.path, dir_path_content)
+            dest_path = str(
+                Path(os.path.join(dest_dir_path, rel_path)).with_suffix(".html")
+            )
+            if change.removed:
+                plan.removed_pages.append(dest_path)
+            elif (change.path, dest_path) not in plan.pages:
+                plan.pages.append((change.path, dest_path))
+        elif change.kind == STATIC:
+            rel_path = os.path.relpath(change.path, dir_path_static)
+            dest_path = os.path.join(dest_dir_path, rel_path)
+            if change.removed:
+                plan.removed_assets.append(dest_path)
+            else:
+                plan.assets.append((change.path, dest_path))
+    return plan
+
+
+class RebuildReport:
+    def __init__(self):
+        self.outputs = 0
+        self.failed: list[tuple[str, str]] = []
+        self.seconds = 0.0
+
+
+def apply_plan(
+    plan: RebuildPlan,
+    template_path: str,
+    dest_dir_path: str,
+    jobs: int = 1,
+    link: str = "copy",
+    output: OutputBackend | None = None,
+    transformer: Transformer | None = None,
+) -> RebuildReport:
+    report = RebuildReport()
+    start = time.perf_counter()
+    if output is None:
+        output = DiskOutput(dest_dir_path)
+
+    for src_path, dest_path in plan.assets:
+        output.copy_file(src_path, dest_path, link)
+        report.outputs += 1
+    for dest_path in plan.removed_assets + plan.removed_pages:
+        output.remove(dest_path)
+        report.outputs += 1
+
+    tasks = [(from_path, template_path, dest_path) for from_path, dest_path in plan.pages]
+    pages = render_pages(tasks, jobs, output=output, transformer=transformer)
+    for (from_path, _, _), error in pages:
+        if error is None:
+            report.outputs += 1
+        else:
+            report.failed.append((from_path, error))
+
+    report.seconds = time.perf_counter() - start
+    return report
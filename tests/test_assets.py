@@ -0,0 +1,152 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src import node_utils
+from src.assets import (
+    ASSET_MANIFEST_NAME,
+    AssetMap,
+    fingerprint_assets,
+    fingerprint_name,
+    remove_fingerprinted,
+)
+from src.build import build_pages
+from src.manifest import BuildManifest
+from src.output import MemoryOutput
+from src.template import Template
+from src.textnode import TextNode
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.assets = AssetMap({"/index.css": "/index.0123abcd.css"})
+
+    def test_fingerprint_name(self):
+        self.assertEqual(
+            fingerprint_name("css/index.css", "3f9a1c2b99"), "css/index.3f9a1c2b.css"
+        )
+        self.assertEqual(fingerprint_name("LICENSE", "3f9a1c2b99"), "LICENSE.3f9a1c2b")
+        self.assertEqual(
+            fingerprint_name(".nojekyll", "3f9a1c2b"), ".nojekyll.3f9a1c2b"
+        )
+
+    def test_url(self):
+        self.assertEqual(self.assets.url("/index.css"), "/index.0123abcd.css")
+        self.assertEqual(self.assets.url("/index.css?v=1"), "/index.0123abcd.css?v=1")
+        self.assertEqual(self.assets.url("index.css"), "index.css")
+        self.assertEqual(self.assets.url("/other.css"), "/other.css")
+        self.assertEqual(self.assets.url("//index.css"), "//index.css")
+
+    def test_rewrite_template(self):
+        template = Template('<link href="/index.css"><title>{{ Title }}</title>')
+        rewritten = self.assets.rewrite_template(template)
+        self.assertEqual(
+            rewritten.render({"title": "t"}),
+            '<link href="/index.0123abcd.css"><title>t</title>',
+        )
+        self.assertIs(self.assets.rewrite_template(template), rewritten)
+
+    def test_digest_follows_mapping(self):
+        other = AssetMap({"/index.css": "/index.ffffffff.css"})
+        self.assertNotEqual(self.assets.digest, other.digest)
+        self.assertEqual(self.assets.digest, AssetMap(dict(self.assets.assets)).digest)
+
+    def test_rewrites_link_and_image_nodes(self):
+        self.addCleanup(node_utils.configure_assets, None)
+        node_utils.configure_assets({"/images/a.png": "/images/a.0123abcd.png"})
+        image = TextNode("a", "image", "/images/a.png")
+        link = TextNode("b", "link", "/images/a.png#top")
+        self.assertEqual(
+            node_utils.text_node_to_html_node(image).props["src"],
+            "/images/a.0123abcd.png",
+        )
+        self.assertEqual(
+            node_utils.text_node_to_html_node(link).props["href"],
+            "/images/a.0123abcd.png#top",
+        )
+
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_copies_and_manifest(self):
+        assets = fingerprint_assets(self.static, self.public)
+        css = assets.assets["/index.css"]
+        self.assertRegex(css, r"^/index\.[0-9a-f]{8}\.css$")
+        self.assertEqual(read_file(os.path.join(self.public, css[1:])), "body {}")
+        with open(os.path.join(self.public, ASSET_MANIFEST_NAME)) as f:
+            self.assertEqual(json.load(f)["assets"], assets.assets)
+
+    def test_changed_asset_replaces_old_copy(self):
+        first = fingerprint_assets(self.static, self.public)
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        previous = AssetMap.load(os.path.join(self.public, ASSET_MANIFEST_NAME))
+        second = fingerprint_assets(self.static, self.public, previous)
+        old_css, new_css = first.assets["/index.css"], second.assets["/index.css"]
+        self.assertNotEqual(old_css, new_css)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old_css[1:])))
+        png = second.assets["/images/a.png"]
+        self.assertEqual(first.assets["/images/a.png"], png)
+        self.assertTrue(os.path.exists(os.path.join(self.public, png[1:])))
+
+    def test_remove_fingerprinted(self):
+        assets = fingerprint_assets(self.static, self.public)
+        removed = remove_fingerprinted(self.public, assets)
+        self.assertEqual(sorted(assets.assets.values()), removed)
+        self.assertEqual(os.listdir(self.public), [])
+
+    def test_memory_output(self):
+        output = MemoryOutput(self.public)
+        assets = fingerprint_assets(self.static, self.public, output=output)
+        self.assertEqual(
+            output.read(os.path.join(self.public, assets.assets["/index.css"][1:])),
+            b"body {}",
+        )
+
+    def test_build_rewrites_template_and_rebuilds_on_asset_change(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        write_file(os.path.join(content, "index.md"), "# Home")
+        write_file(template, '<link href="/index.css">{{ Content }}')
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+
+        assets = fingerprint_assets(self.static, self.public)
+        result = build_pages(content, template, self.public, manifest, assets=assets)
+        self.assertEqual(result.rendered, ["index.md"])
+        page = read_file(os.path.join(self.public, "index.html"))
+        self.assertIn(f'href="{assets.assets["/index.css"]}"', page)
+
+        result = build_pages(content, template, self.public, manifest, assets=assets)
+        self.assertEqual(result.skipped, ["index.md"])
+
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        assets = fingerprint_assets(self.static, self.public, assets)
+        result = build_pages(content, template, self.public, manifest, assets=assets)
+        self.assertEqual(result.rendered, ["index.md"])
+        page = read_file(os.path.join(self.public, "index.html"))
+        self.assertIn(f'href="{assets.assets["/index.css"]}"', page)
+        self.assertIsNone(node_utils.asset_map)
+
+
+if __name__ == "__main__":
+    unittest.main()
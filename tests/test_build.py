@@ -0,0 +1,262 @@
+import os
+import tempfile
+import unittest
+
+from src.build import BuildError, ParseCache, build_pages
+from src.manifest import BuildManifest
+from src.output import MemoryOutput
+from src.pipeline import Pipeline
+from src.profiling import STAGES, BuildProfile
+from src.tree_cache import TreeCache
+
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class TestBuildPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        write_file(self.template, TEMPLATE)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\nHello")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, **kwargs):
+        manifest = BuildManifest.load(self.manifest_path)
+        result = build_pages(
+            self.content, self.template, self.public, manifest, **kwargs
+        )
+        manifest.save()
+        return result
+
+    def test_full_then_noop(self):
+        result = self.build()
+        self.assertEqual(result.rendered, ["blog/post.md", "index.md"])
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+
+        result = self.build()
+        self.assertEqual(result.rendered, [])
+        self.assertEqual(result.skipped, ["blog/post.md", "index.md"])
+
+    def test_changed_source_only(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nWelcome back")
+        result = self.build()
+        self.assertEqual(result.rendered, ["index.md"])
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertIn("Welcome back", f.read())
+
+    def test_template_change_rebuilds_all(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        result = self.build()
+        self.assertEqual(result.rendered, ["blog/post.md", "index.md"])
+
+    def test_identical_output_is_not_rewritten(self):
+        self.build()
+        index = os.path.join(self.public, "index.html")
+        os.utime(index, ns=(1, 1))
+        # without a manifest every page is rendered again
+        os.remove(self.manifest_path)
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post\n\nBye")
+        result = self.build()
+        self.assertEqual(result.rendered, ["blog/post.md", "index.md"])
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(os.stat(index).st_mtime_ns, 1)
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertIn("Bye", f.read())
+        self.assertEqual(sorted(os.listdir(self.public)), ["blog", "index.html"])
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        result = self.build()
+        self.assertEqual(result.removed, ["blog/post.md"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertNotIn("blog/post.md", BuildManifest.load(self.manifest_path).pages)
+
+    def test_missing_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.public, "index.html"))
+        result = self.build()
+        self.assertEqual(result.rendered, ["index.md"])
+
+    def read_public(self):
+        outputs = {}
+        for dirpath, _, filenames in os.walk(self.public):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                with open(path) as f:
+                    outputs[os.path.relpath(path, self.public)] = f.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        for i in range(8):
+            write_file(os.path.join(self.content, f"p{i}.md"), f"# Page {i}\n\nBody")
+        self.build()
+        serial = self.read_public()
+
+        result = build_pages(self.content, self.template, self.public, jobs=3)
+        self.assertEqual(len(result.rendered), 10)
+        self.assertEqual(result.rendered, sorted(result.rendered))
+        self.assertEqual(self.read_public(), serial)
+
+    def test_pipeline_matches_serial(self):
+        for i in range(20):
+            write_file(os.path.join(self.content, f"p{i}.md"), f"# Page {i}\n\nBody")
+        write_file(os.path.join(self.content, "broken.md"), "no title here")
+        self.build()
+        serial = self.read_public()
+
+        for jobs in (1, 2):
+            pipeline = Pipeline(io_threads=2, queue_size=2, batch_size=3)
+            profile = BuildProfile()
+            result = build_pages(
+                self.content,
+                self.template,
+                self.public,
+                jobs=jobs,
+                profile=profile,
+                pipeline=pipeline,
+            )
+            self.assertEqual(len(result.rendered), 22)
+            self.assertEqual(result.rendered, sorted(result.rendered))
+            self.assertEqual(result.unchanged, 22)
+            self.assertEqual([source for source, _ in result.failed], ["broken.md"])
+            self.assertEqual(self.read_public(), serial)
+            self.assertEqual(len(profile.pages), 22)
+            # bounded queues never hold more than their capacity
+            stats = pipeline.queues
+            self.assertEqual(list(stats), ["discover", "read", "render", "write"])
+            self.assertEqual(stats["read"].items, 23 + 1)
+            for queue_stats in stats.values():
+                self.assertLessEqual(queue_stats.max_depth, 2)
+
+    def test_pipeline_fail_fast_and_discovery_errors(self):
+        write_file(os.path.join(self.content, "a_broken.md"), "no title here")
+        with self.assertRaises(BuildError):
+            build_pages(
+                self.content,
+                self.template,
+                self.public,
+                fail_fast=True,
+                pipeline=Pipeline(),
+            )
+        with self.assertRaises(FileNotFoundError):
+            build_pages(
+                os.path.join(self.root, "missing"),
+                self.template,
+                self.public,
+                pipeline=Pipeline(),
+            )
+
+    def test_failed_page_does_not_abort_build(self):
+        write_file(os.path.join(self.content, "broken.md"), "no title here")
+        result = self.build(jobs=2)
+        self.assertEqual([source for source, _ in result.failed], ["broken.md"])
+        self.assertIn("ValueError", result.failed[0][1])
+        self.assertEqual(result.rendered, ["blog/post.md", "index.md"])
+        self.assertNotIn("broken.md", BuildManifest.load(self.manifest_path).pages)
+
+    def test_fail_fast_raises(self):
+        write_file(os.path.join(self.content, "a_broken.md"), "no title here")
+        with self.assertRaises(BuildError):
+            build_pages(self.content, self.template, self.public, fail_fast=True)
+
+    def test_profile_matches_streaming_output(self):
+        self.build()
+        streamed = self.read_public()
+
+        profile = BuildProfile()
+        build_pages(self.content, self.template, self.public, jobs=2, profile=profile)
+        self.assertEqual(self.read_public(), streamed)
+        # timings are gathered in the worker processes and sent back
+        self.assertEqual(
+            sorted(profile.pages),
+            sorted(
+                os.path.join(self.content, source)
+                for source in ("index.md", os.path.join("blog", "post.md"))
+            ),
+        )
+        for stages in profile.pages.values():
+            self.assertEqual(tuple(stages), STAGES)
+            self.assertGreater(sum(stages.values()), 0)
+
+    def test_parse_cache_counts_come_back_from_workers(self):
+        for i in range(6):
+            write_file(
+                os.path.join(self.content, f"p{i}.md"),
+                f"# Page {i}\n\n> Shared **disclaimer** text",
+            )
+        self.build()
+        uncached = self.read_public()
+
+        parse_cache = ParseCache(max_entries=32)
+        build_pages(
+            self.content, self.template, self.public, jobs=2, parse_cache=parse_cache
+        )
+        self.assertEqual(self.read_public(), uncached)
+        self.assertGreater(parse_cache.hits, 0)
+        self.assertGreater(parse_cache.misses, 0)
+
+    def test_memory_output_matches_disk(self):
+        self.build()
+        on_disk = self.read_public()
+
+        output = MemoryOutput(self.public)
+        for jobs in (1, 2):
+            result = build_pages(
+                self.content, self.template, self.public, jobs=jobs, output=output
+            )
+            self.assertEqual(len(result.rendered), 2)
+            self.assertEqual(
+                {
+                    os.path.join(*key.split("/")): entry.data.decode()
+                    for key, entry in output.files.items()
+                },
+                on_disk,
+            )
+
+    def test_memory_output_incremental(self):
+        output = MemoryOutput(self.public)
+        manifest = BuildManifest("")
+        build_pages(self.content, self.template, self.public, manifest, output=output)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        result = build_pages(
+            self.content, self.template, self.public, manifest, output=output
+        )
+        self.assertEqual(result.skipped, ["index.md"])
+        self.assertEqual(result.removed, ["blog/post.md"])
+        self.assertEqual(list(output.files), ["index.html"])
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_tree_cache_skips_parsing_after_template_change(self):
+        trees = TreeCache(os.path.join(self.root, "trees"))
+        self.build(tree_cache=trees)
+        self.assertEqual((trees.hits, trees.misses), (0, 2))
+
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        result = self.build(jobs=2, tree_cache=trees)
+        self.assertEqual(len(result.rendered), 2)
+        self.assertEqual((trees.hits, trees.misses), (2, 2))
+        with open(os.path.join(self.public, "index.html")) as f:
+            self.assertEqual(
+                f.read(), "<h1>Home</h1><div><h1>Home</h1><p>Welcome</p></div>"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from src.compress import precompress, remove_gzip_sibling
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = os.path.join(self.root, "index.html")
+        with open(self.page, "w") as f:
+            f.write("<p>hello</p>" * 500)
+        with open(os.path.join(self.root, "small.css"), "w") as f:
+            f.write("b {}")
+        with open(os.path.join(self.root, "image.png"), "wb") as f:
+            f.write(os.urandom(4096))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compresses_large_text_files_only(self):
+        report = precompress(self.root, min_size=1024)
+        self.assertEqual(report.compressed, ["index.html"])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "small.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "image.png.gz")))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 500)
+        self.assertLess(report.bytes_out, report.bytes_in)
+
+    def test_unchanged_files_are_skipped(self):
+        precompress(self.root)
+        report = precompress(self.root)
+        self.assertEqual(report.compressed, [])
+        self.assertEqual(report.skipped, ["index.html"])
+
+    def test_changed_file_is_recompressed(self):
+        precompress(self.root)
+        with open(self.page, "w") as f:
+            f.write("<p>changed</p>" * 500)
+        os.utime(self.page, ns=(0, 10**9))
+        report = precompress(self.root)
+        self.assertEqual(report.compressed, ["index.html"])
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 500)
+
+    def test_only_own_gz_files_are_removed(self):
+        precompress(self.root)
+        archive = os.path.join(self.root, "data.tar.gz")
+        with open(archive, "wb") as f:
+            f.write(gzip.compress(b"data"))
+        with open(os.path.join(self.root, "notes.txt.gz"), "wb") as f:
+            f.write(gzip.compress(b"notes"))
+        with open(os.path.join(self.root, "notes.txt"), "w") as f:
+            f.write("notes")
+        # shrinks below min_size, the stamp still matches
+        with open(self.page, "w") as f:
+            f.write("<p>hi</p>")
+        os.utime(self.page, ns=(0, os.stat(self.page + ".gz").st_mtime_ns))
+        report = precompress(self.root)
+        self.assertEqual(report.removed, ["index.html.gz"])
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+        self.assertTrue(os.path.exists(archive))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "notes.txt.gz")))
+
+    def test_remove_gzip_sibling(self):
+        precompress(self.root)
+        mtime_ns = os.stat(self.page).st_mtime_ns
+        os.remove(self.page)
+        remove_gzip_sibling(self.page, mtime_ns + 1)
+        self.assertTrue(os.path.exists(self.page + ".gz"))
+        remove_gzip_sibling(self.page, mtime_ns)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+if __name__ == "__main__":
+    unittest.main()
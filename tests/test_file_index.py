@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from src.file_index import FileIndex, normalize_url_path
+
+
+class TestFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        os.makedirs(os.path.join(self.root, "blog"))
+        self.write("index.html", "<h1>home</h1>")
+        self.write("blog/index.html", "<h1>blog</h1>")
+        self.write("blog/index.html.gz", "not really gzip")
+        # stamped as precompress stamps it
+        for rel_path in ("blog/index.html", "blog/index.html.gz"):
+            os.utime(os.path.join(self.root, rel_path), ns=(0, 5 * 10**9))
+        self.write("index.css", "body {}")
+        self.index = FileIndex(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        with open(os.path.join(self.root, rel_path), "w") as f:
+            f.write(text)
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("/").path, os.path.join(self.root, "index.html"))
+        self.assertEqual(self.index.lookup("/index.css").content_type, "text/css")
+        self.assertIsNone(self.index.lookup("/blog"))
+        self.assertEqual(
+            self.index.lookup("/blog/").path, os.path.join(self.root, "blog", "index.html")
+        )
+        self.assertIsNone(self.index.lookup("/missing/"))
+
+    def test_gzip_sibling(self):
+        entry = self.index.lookup("/blog/index.html")
+        self.assertIsNotNone(entry.gzip)
+        self.assertNotEqual(entry.etag, entry.gzip.etag)
+        self.assertIsNone(self.index.lookup("/index.css").gzip)
+
+    def test_stale_gzip_sibling_is_not_paired(self):
+        self.write("blog/index.html", "<h1>blog, rebuilt without --gzip</h1>")
+        self.index.refresh()
+        self.assertIsNone(self.index.lookup("/blog/").gzip)
+        self.assertIsNotNone(self.index.lookup("/blog/index.html.gz"))
+
+    def test_no_traversal(self):
+        self.assertEqual(normalize_url_path("/../../etc/passwd"), "etc/passwd")
+        self.assertIsNone(self.index.lookup("/../index.css/../../etc/passwd"))
+
+    def test_refresh_rehashes_only_changed(self):
+        unchanged = self.index.lookup("/index.css")
+        before = self.index.lookup("/index.html").etag
+        self.write("index.html", "<h1>home, changed</h1>")
+        os.utime(os.path.join(self.root, "index.html"), ns=(0, 10**9))
+        os.remove(os.path.join(self.root, "blog", "index.html.gz"))
+        self.index.refresh()
+        self.assertIs(self.index.lookup("/index.css"), unchanged)
+        self.assertNotEqual(self.index.lookup("/index.html").etag, before)
+        self.assertIsNone(self.index.lookup("/blog/").gzip)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import tempfile
+import unittest
+
+from src.build import ParseCache, build_pages
+from src.fragments import FragmentCache, node_digest
+from src.htmlnode import LeafNode, ParentNode, freeze_node
+from src import node_utils
+from src.node_utils import markdown_to_html_node
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_tree(root: str) -> dict[str, str]:
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path) as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+def callout(text: str = "note") -> ParentNode:
+    return ParentNode(
+        "blockquote",
+        [LeafNode("b", "Note:"), LeafNode(None, f" {text}")],
+        {"class": "callout"},
+    )
+
+
+class TestNodeDigest(unittest.TestCase):
+    def test_equal_trees_hash_alike(self):
+        self.assertEqual(node_digest(callout()), node_digest(callout()))
+        self.assertEqual(
+            node_digest(markdown_to_html_node("# A\n\n- x\n- y")),
+            node_digest(freeze_node(markdown_to_html_node("# A\n\n- x\n- y"))),
+        )
+        # pinned: the digest must not change between runs or machines
+        self.assertEqual(
+            node_digest(callout()).hex(), "125cf2e9f7c353a098010ae639ab168f"
+        )
+
+    def test_any_difference_changes_the_digest(self):
+        variants = [
+            callout(),
+            callout("other"),
+            ParentNode("div", callout().children, {"class": "callout"}),
+            ParentNode("blockquote", callout().children),
+            ParentNode("blockquote", callout().children[::-1], {"class": "callout"}),
+            LeafNode("ab", "c"),
+            LeafNode("a", "bc"),
+            LeafNode(None, "abc"),
+            LeafNode("abc", None),
+            ParentNode("p", [LeafNode(None, "x")]),
+            ParentNode("p", [ParentNode("p", [LeafNode(None, "x")])]),
+        ]
+        digests = {node_digest(node) for node in variants}
+        self.assertEqual(len(digests), len(variants))
+
+
+class TestFragmentCache(unittest.TestCase):
+    def page(self, number: int) -> ParentNode:
+        # blocks are frozen when the parse cache shares them between pages
+        return ParentNode(
+            "div",
+            [
+                LeafNode("h1", f"Page {number}"),
+                freeze_node(callout()),
+                ParentNode("p", [LeafNode(None, str(number))]),
+            ],
+        )
+
+    def test_repeated_subtrees_are_looked_up(self):
+        cache = FragmentCache()
+        for number in range(3):
+            page = self.page(number)
+            self.assertEqual(cache.render(page), page.to_html())
+        # only the frozen callout is looked up, and misses on the first page
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        self.assertEqual(len(cache.fragments), 1)
+        frozen = freeze_node(self.page(0))
+        self.assertEqual(cache.render(frozen), frozen.to_html())
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.render(LeafNode("p", "x")), "<p>x</p>")
+
+    def test_bounded(self):
+        cache = FragmentCache(max_entries=2)
+        for number in range(5):
+            cache.render(freeze_node(ParentNode("p", [LeafNode(None, str(number))])))
+        self.assertEqual(cache.stats()["entries"], 2)
+        self.assertEqual(cache.stats()["evictions"], 3)
+
+    def test_shared_frozen_subtrees_are_hashed_once(self):
+        cache = FragmentCache()
+        shared = freeze_node(callout())
+        first = ParentNode("div", [shared, LeafNode("p", "1")])
+        second = ParentNode("div", [shared, LeafNode("p", "2")])
+        cache.render(first)
+        self.assertEqual(len(cache.known), 1)
+        self.assertEqual(cache.render(second), second.to_html())
+        self.assertEqual(cache.known.hits, 1)
+
+
+class TestBuildWithFragmentCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<main>{{ Content }}</main>")
+        shared = "\n".join(f"- item {i}" for i in range(20))
+        for i in range(4):
+            write_file(
+                os.path.join(self.content, f"p{i}.md"),
+                f"# Page {i}\n\n{shared}\n\n> a **shared** callout",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_pages_and_counts(self):
+        plain = os.path.join(self.tmp.name, "plain")
+        cached = os.path.join(self.tmp.name, "cached")
+        build_pages(self.content, self.template, plain)
+        fragments = FragmentCache()
+        result = build_pages(
+            self.content,
+            self.template,
+            cached,
+            parse_cache=ParseCache(100),
+            fragment_cache=fragments,
+        )
+        self.assertEqual(len(result.rendered), 4)
+        self.assertEqual(read_tree(cached), read_tree(plain))
+        # the list and the callout hit on every page after the first
+        self.assertEqual(fragments.hits, 6)
+        self.assertAlmostEqual(fragments.hit_rate, 6 / (6 + fragments.misses))
+        self.assertIsNone(node_utils.fragment_cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,5 @@
+import io
+import tracemalloc
 import unittest
 
 from src.htmlnode import HTMLNode, LeafNode, ParentNode
@@ -95,6 +97,70 @@ class TestParentNode(unittest.TestCase):
             '<div class_="my-class"><p><b>Bold text</b></p><i>italic text</i>Normal text</div>',
         )
 
+    def test_iter_html_chunks(self):
+        node = ParentNode(
+            "div",
+            [ParentNode("p", [LeafNode("b", "Bold text")]), LeafNode(None, "tail")],
+        )
+        self.assertEqual(
+            list(node.iter_html()),
+            ["<div>", "<p>", "<b>Bold text</b>", "</p>", "tail", "</div>"],
+        )
+
+    def test_write_html(self):
+        node = ParentNode("ul", [LeafNode("li", str(i)) for i in range(3)])
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+        self.assertEqual(fp.getvalue(), "<ul><li>0</li><li>1</li><li>2</li></ul>")
+
+    def test_to_html_deep_nesting(self):
+        node = LeafNode(None, "x")
+        for _ in range(5000):
+            node = ParentNode("div", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<div><div>"))
+        self.assertEqual(len(html), 5000 * len("<div></div>") + 1)
+
+    def test_iter_html_invalid_child(self):
+        node = ParentNode("div", [ParentNode("p", None)])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+
+class TestNodeMemory(unittest.TestCase):
+    NODES = 10_000
+    # a slotted node is an object header plus four pointers; the budget leaves
+    # headroom for the list holding the nodes but not for a per-node __dict__
+    BYTES_PER_NODE = 80
+
+    def bytes_per_node(self, factory):
+        values = [f"value {i}" for i in range(self.NODES)]
+        tracemalloc.start()
+        try:
+            nodes = [factory(value) for value in values]
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(nodes), self.NODES)
+        return current / self.NODES
+
+    def test_leaf_node_budget(self):
+        self.assertLessEqual(
+            self.bytes_per_node(lambda value: LeafNode("b", value)), self.BYTES_PER_NODE
+        )
+
+    def test_parent_node_budget(self):
+        children = [LeafNode(None, "x")]
+        self.assertLessEqual(
+            self.bytes_per_node(lambda value: ParentNode("p", children)),
+            self.BYTES_PER_NODE,
+        )
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            LeafNode("b", "x").extra = 1
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from src.lru import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = LRUCache(max_entries=4, max_bytes=100)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1, size=1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used_entry(self):
+        cache = LRUCache(max_entries=2, max_bytes=100)
+        cache.put("a", 1, size=1)
+        cache.put("b", 2, size=1)
+        cache.get("a")
+        cache.put("c", 3, size=1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_size_limit(self):
+        cache = LRUCache(max_entries=10, max_bytes=10)
+        cache.put("a", 1, size=6)
+        cache.put("b", 2, size=6)
+        self.assertEqual(list(cache.entries), ["b"])
+        self.assertEqual(cache.bytes, 6)
+
+        # an entry larger than the whole cache is never stored
+        cache.put("c", 3, size=11)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.bytes, 6)
+
+    def test_replacing_a_key_updates_size(self):
+        cache = LRUCache(max_entries=10, max_bytes=10)
+        cache.put("a", 1, size=6)
+        cache.put("a", 2, size=3)
+        self.assertEqual(cache.bytes, 3)
+        self.assertEqual(cache.get("a"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import main
+
+
+def write_file(path: str, text: str) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class TestPublishedSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.tmp.name)
+        write_file("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        write_file("static/index.css", "body {}")
+        write_file("content/index.md", "# Home\n\nhome")
+        write_file("content/page/index.md", "# Page\n\noriginal")
+
+    def build(self, **kwargs) -> int:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return main.main(**kwargs)
+
+    def test_builds_after_publishing_stay_published(self):
+        page = os.path.join("public", "page", "index.html")
+        self.assertEqual(self.build(publish=True), 0)
+        live = os.readlink("public")
+
+        write_file("content/page/index.md", "# Page\n\nedited")
+        self.assertEqual(self.build(), 0)
+        # a new generation, not an edit of the live one
+        self.assertNotEqual(os.readlink("public"), live)
+        self.assertIn("edited", read_file(page))
+        self.assertIn("original", read_file(os.path.join(live, "page", "index.html")))
+
+        write_file("content/page/index.md", "# Page\n\noriginal")
+        self.assertEqual(self.build(publish=True), 0)
+        self.assertIn("original", read_file(page))
+
+        self.assertEqual(self.build(full=True), 0)
+        self.assertIn("original", read_file(page))
+        self.assertTrue(os.path.islink("public"))
+
+
+if __name__ == "__main__":
+    unittest.main()
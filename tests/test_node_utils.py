@@ -1,21 +1,36 @@
+import io
+import itertools
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
 import unittest
+from src import node_utils
 from src.node_utils import (
     block_to_block_type,
     block_to_html_node,
     code_block_to_html_node,
+    configure_parse_cache,
     extract_markdown_images,
     extract_markdown_links,
     heading_block_to_html_node,
+    iter_blocks,
+    iter_pages,
     markdown_to_html_node,
     paragraph_block_to_html_node,
     split_nodes_delimiter,
     split_nodes_image,
     split_nodes_link,
+    split_pipeline_textnodes,
+    text_to_children,
     text_to_textnodes,
     markdown_to_blocks,
     quote_block_to_html_node,
     ul_block_to_html_node,
     ol_block_to_html_node,
+    render_markdown,
+    stream_markdown,
 )
 from src.constants import MarkdownBlockType, MarkdownDelimiters, TextTypes, HTMLTags
 from src.textnode import TextNode
@@ -149,6 +164,11 @@ class TestSplitNodesImage(unittest.TestCase):
             ],
         )
 
+    def test_does_not_mutate_input(self):
+        node = TextNode("a ![b](c.png) d", TextTypes.TEXT)
+        split_nodes_image([node])
+        self.assertEqual(node.text, "a ![b](c.png) d")
+
 
 class TestSplitNodesLink(unittest.TestCase):
     def test_split_nodes_link(self):
@@ -176,6 +196,11 @@ class TestSplitNodesLink(unittest.TestCase):
             ],
         )
 
+    def test_does_not_mutate_input(self):
+        node = TextNode("a [b](/c) d", TextTypes.TEXT)
+        split_nodes_link([node])
+        self.assertEqual(node.text, "a [b](/c) d")
+
 
 class TestTextToTextNodes(unittest.TestCase):
     def test_text_to_textnodes(self):
@@ -202,6 +227,63 @@ class TestTextToTextNodes(unittest.TestCase):
         )
 
 
+class TestTextToTextNodesScanner(unittest.TestCase):
+    FRAGMENTS = [
+        "plain words ",
+        "**bold**",
+        "*italic*",
+        "`code`",
+        "`a ** b`",
+        "**a*b*c**",
+        "![alt](/img.png)",
+        "[link](https://example.com)",
+        "[a](b)[c](d)",
+        "`[a](b)`",
+        "**[a](b)**",
+        "*![i](/i.png)*",
+        "![](/empty-alt.png)",
+        " [not a link] ",
+        "(parens)",
+        "éè ",
+    ]
+
+    def test_matches_split_pipeline(self):
+        rng = random.Random(1234)
+        for _ in range(500):
+            text = "".join(rng.choice(self.FRAGMENTS) for _ in range(rng.randint(0, 12)))
+            try:
+                expected = split_pipeline_textnodes(text)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+                continue
+            self.assertEqual(text_to_textnodes(text), expected, text)
+
+    def test_links_in_spans_stay_literal(self):
+        self.assertEqual(
+            text_to_textnodes("`[a](b)` and **![i](/i.png)**"),
+            [
+                TextNode("[a](b)", TextTypes.CODE),
+                TextNode(" and ", TextTypes.TEXT),
+                TextNode("![i](/i.png)", TextTypes.BOLD),
+            ],
+        )
+
+    def test_unclosed_delimiter(self):
+        for text in ["a `b", "a **b", "a *b"]:
+            with self.assertRaises(ValueError):
+                text_to_textnodes(text)
+
+    def test_empty(self):
+        self.assertEqual(text_to_textnodes(""), [])
+
+    def test_many_links(self):
+        text = " ".join(f"[l{i}](/u{i})" for i in range(2000))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 3999)
+        self.assertEqual(nodes[-1], TextNode("l1999", TextTypes.LINK, "/u1999"))
+
+
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks(self):
         text = """# This is a heading\n\nThis is a paragraph of text. It has some **bold** and *italic* words inside of it.\n\n* This is a list item\n* This is another list item"""
@@ -239,6 +321,84 @@ class TestMarkdownToBlocks(unittest.TestCase):
         )
 
 
+def split_markdown_blocks(text: str) -> list[str]:
+    # the split-based markdown_to_blocks that predates iter_blocks
+    blocks = []
+    for i, block in enumerate(text.split("```")):
+        if i % 2 == 1:
+            blocks.append(f"```{block}```")
+        else:
+            blocks.extend(b.strip() for b in block.split("\n\n") if b.strip())
+    return blocks
+
+
+class TestIterBlocks(unittest.TestCase):
+    def test_yields_types(self):
+        text = "# Title\n\n> quote\n\n```\ncode\n```\n\n1. one\n2. two\n\ntext"
+        self.assertEqual(
+            list(iter_blocks(text)),
+            [
+                (MarkdownBlockType.HEADING, "# Title"),
+                (MarkdownBlockType.QUOTE, "> quote"),
+                (MarkdownBlockType.CODE, "```\ncode\n```"),
+                (MarkdownBlockType.ORDERED_LIST, "1. one\n2. two"),
+                (MarkdownBlockType.PARAGRAPH, "text"),
+            ],
+        )
+
+    def test_reads_file_objects(self):
+        text = "# Title\n\nbody line one\nbody line two\n"
+        self.assertEqual(
+            [block for _, block in iter_blocks(io.StringIO(text))],
+            ["# Title", "body line one\nbody line two"],
+        )
+
+    def test_is_lazy(self):
+        def lines():
+            yield "# Title\n"
+            yield "\n"
+            raise AssertionError("read past the first block")
+
+        self.assertEqual(next(iter_blocks(lines())), (MarkdownBlockType.HEADING, "# Title"))
+
+    def test_code_block_keeps_blank_lines(self):
+        text = "```\nfirst\n\n\nsecond\n```"
+        self.assertEqual(markdown_to_blocks(text), ["```\nfirst\n\n\nsecond\n```"])
+
+    def test_fence_without_blank_lines(self):
+        text = "intro\n```\ncode\n``` outro"
+        self.assertEqual(markdown_to_blocks(text), ["intro", "```\ncode\n```", "outro"])
+
+    def test_single_line_fence(self):
+        self.assertEqual(markdown_to_blocks("```code```"), ["```code```"])
+
+    def test_unclosed_fence(self):
+        self.assertEqual(markdown_to_blocks("a\n```\ncode"), ["a", "```\ncode```"])
+
+    def test_matches_split_blocks(self):
+        fragments = ["# h", "para", "\n", "\n\n", "```", "code", "  ", "> q", "* a\n* b"]
+        rng = random.Random(4321)
+        for _ in range(2000):
+            text = "".join(rng.choice(fragments) for _ in range(rng.randint(0, 15)))
+            self.assertEqual(markdown_to_blocks(text), split_markdown_blocks(text), text)
+
+    def test_bounded_memory(self):
+        def lines():
+            for i in range(50_000):
+                yield f"line {i} of a very long generated paragraph\n"
+                if i % 10 == 9:
+                    yield "\n"
+
+        tracemalloc.start()
+        try:
+            count = sum(1 for _ in iter_blocks(lines()))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(count, 5_000)
+        self.assertLess(peak, 256 * 1024)
+
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_block_to_block_type(self):
         block = "# This is a heading"
@@ -347,5 +507,145 @@ class TestMarkdownToHTMLNode(unittest.TestCase):
         )
 
 
+class TestParseCache(unittest.TestCase):
+    MARKDOWN = (
+        "# Title\n\n> a **shared** [callout](/c)\n\n"
+        "## Heading with `code`\n\n* one\n* two"
+    )
+
+    def setUp(self):
+        configure_parse_cache(max_entries=64)
+        self.addCleanup(configure_parse_cache, 0)
+
+    def test_cached_output_matches_uncached(self):
+        configure_parse_cache(0)
+        expected = markdown_to_html_node(self.MARKDOWN).to_html()
+        configure_parse_cache(max_entries=64)
+        self.assertEqual(markdown_to_html_node(self.MARKDOWN).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(self.MARKDOWN).to_html(), expected)
+
+    def test_repeated_blocks_are_shared_and_frozen(self):
+        block = "> a **shared** [callout](/c)"
+        first = block_to_html_node(block)
+        second = block_to_html_node(block)
+        self.assertIs(first, second)
+        self.assertIsInstance(first.children, tuple)
+        with self.assertRaises(TypeError):
+            first.children[-1].props["href"] = "/elsewhere"
+
+        self.assertEqual(node_utils.block_cache.hits, 1)
+        self.assertEqual(node_utils.block_cache.misses, 1)
+
+    def test_text_to_children_returns_own_list(self):
+        children = text_to_children("some *text*")
+        children.append(None)
+        self.assertEqual(len(text_to_children("some *text*")), 2)
+
+
+class TestIterPages(unittest.TestCase):
+    def test_name_order_and_dest_paths(self):
+        with tempfile.TemporaryDirectory() as root:
+            for rel_path in ("b.md", "a/z.md", "a/y/x.md", "c/d.md"):
+                path = os.path.join(root, "content", rel_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                open(path, "w").close()
+            pages = [
+                (os.path.relpath(src, root), os.path.relpath(dst, root))
+                for src, dst in iter_pages(
+                    os.path.join(root, "content"), os.path.join(root, "public")
+                )
+            ]
+        self.assertEqual(
+            pages,
+            [
+                ("content/a/y/x.md", "public/a/y/x.html"),
+                ("content/a/z.md", "public/a/z.html"),
+                ("content/b.md", "public/b.html"),
+                ("content/c/d.md", "public/c/d.html"),
+            ],
+        )
+
+    def test_deeper_than_the_recursion_limit(self):
+        with tempfile.TemporaryDirectory() as root:
+            # made and removed level by level: makedirs and rmtree recurse
+            dirs = [root]
+            for _ in range(sys.getrecursionlimit() + 10):
+                dirs.append(os.path.join(dirs[-1], "d"))
+                os.mkdir(dirs[-1])
+            page = os.path.join(dirs[-1], "page.md")
+            open(page, "w").close()
+            try:
+                pages = list(iter_pages(root, "public"))
+            finally:
+                os.remove(page)
+                for dir_path in reversed(dirs[1:]):
+                    os.rmdir(dir_path)
+        self.assertEqual(len(pages), 1)
+        self.assertTrue(pages[0][1].endswith(os.path.join("d", "page.html")))
+
+
+class TestStreamMarkdown(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.template = os.path.join(self.tmp.name, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title><main>{{ Content }}</main>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def stream(self, markdown: str, template_path: str | None = None) -> str:
+        lines = io.StringIO(markdown)
+        return "".join(stream_markdown(lines, template_path or self.template))
+
+    def test_matches_render_markdown(self):
+        pages = [
+            "# Title\n\nSome *text* here.\n\n- one\n- two\n",
+            "Intro first.\n\n> quoted\n\n# Late title\n\n```\ncode\n\nmore\n```\n",
+            "---\ntitle: Front\n---\n# Heading\n\n1. a\n2. b",
+        ]
+        for markdown in pages:
+            with self.subTest(markdown=markdown):
+                self.assertEqual(
+                    self.stream(markdown),
+                    "".join(render_markdown(markdown, self.template)),
+                )
+
+    def test_title_used_twice(self):
+        template = os.path.join(self.tmp.name, "twice.html")
+        with open(template, "w") as f:
+            f.write("<title>{{ Title }}</title><h1>{{ Title }}</h1>{{ Content }}")
+        markdown = "Intro.\n\n# Late title\n\ntext"
+        html = self.stream(markdown, template)
+        self.assertTrue(html.startswith("<title>Late title</title><h1>Late title</h1>"))
+        self.assertEqual(html, "".join(render_markdown(markdown, template)))
+
+    def test_fragment_without_template(self):
+        chunks = stream_markdown(io.StringIO("no title\n\n## sub"), None)
+        self.assertEqual("".join(chunks), "<div><p>no title</p><h2>sub</h2></div>")
+
+    def test_missing_title(self):
+        with self.assertRaisesRegex(ValueError, "no h1 header"):
+            self.stream("just a paragraph")
+
+    def test_memory_is_bounded_by_the_block(self):
+        def lines():
+            for i in range(20_000):
+                yield f"line {i} of a very long generated paragraph\n"
+                if i % 10 == 9:
+                    yield "\n"
+
+        size = 0
+        tracemalloc.start()
+        try:
+            for chunk in stream_markdown(itertools.chain(["# Big\n\n"], lines())):
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(size, 800_000)
+        self.assertLess(peak, 256 * 1024)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+
+from src.compress import precompress
+from src.output import DiskOutput, MemoryOutput
+
+
+class TestDiskOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.output = DiskOutput(self.root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_open_writes_atomically(self):
+        path = os.path.join(self.root, "a", "b.html")
+        with self.output.open(path) as f:
+            f.write("first")
+        with self.assertRaises(RuntimeError):
+            with self.output.open(path) as f:
+                f.write("partial")
+                raise RuntimeError
+        with open(path) as f:
+            self.assertEqual(f.read(), "first")
+        self.assertEqual(os.listdir(os.path.dirname(path)), ["b.html"])
+
+    def test_identical_output_is_left_alone(self):
+        path = os.path.join(self.root, "a.html")
+        self.output.write_bytes(path, b"same")
+        os.utime(path, ns=(1, 1))
+        self.assertFalse(self.output.write_bytes(path, b"same"))
+        with self.output.open(path) as f:
+            f.write("sa")
+            f.write("me")
+        self.assertEqual(os.stat(path).st_mtime_ns, 1)
+        self.assertEqual(self.output.unchanged, 2)
+
+        for text in ("sam", "same!", "sane"):
+            with self.output.open(path) as f:
+                f.write(text[:2])
+                f.write(text[2:])
+            with open(path) as f:
+                self.assertEqual(f.read(), text)
+        self.assertEqual(self.output.unchanged, 2)
+        self.assertEqual(os.listdir(self.root), ["a.html"])
+
+    def test_prepare_dirs(self):
+        paths = [
+            os.path.join(self.root, "a", "b", "c.html"),
+            os.path.join(self.root, "a", "d.html"),
+            os.path.join(self.root, "e", "f.html"),
+        ]
+        self.assertEqual(self.output.prepare_dirs(paths), 2)
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "a", "b")))
+        self.assertTrue(os.path.isdir(os.path.join(self.root, "e")))
+        self.assertEqual(self.output.prepare_dirs(paths), 0)
+
+    def test_stale_gzip_siblings_are_removed(self):
+        path = os.path.join(self.root, "big.html")
+        self.output.write_bytes(path, b"<p>x</p>" * 200)
+        precompress(self.root, min_size=0)
+        self.output.write_bytes(path, b"<p>x</p>" * 200)
+        self.assertTrue(os.path.exists(path + ".gz"))
+        with self.output.open(path) as f:
+            f.write("<p>changed</p>")
+        self.assertFalse(os.path.exists(path + ".gz"))
+
+        precompress(self.root, min_size=0)
+        self.output.remove(path)
+        # a .gz that precompress did not write is left alone
+        data = os.path.join(self.root, "data.tar")
+        self.output.write_bytes(data, b"data")
+        self.output.write_bytes(data + ".gz", b"archive")
+        os.utime(data + ".gz", ns=(0, 10**9))
+        self.output.remove(data)
+        self.assertEqual(os.listdir(self.root), ["data.tar.gz"])
+
+    def test_remove_prunes_empty_dirs(self):
+        path = os.path.join(self.root, "a", "b", "c.html")
+        self.output.write_bytes(path, b"x")
+        self.assertTrue(self.output.exists(path))
+        self.output.remove(path)
+        self.assertFalse(self.output.exists(path))
+        self.assertEqual(os.listdir(self.root), [])
+
+
+class TestMemoryOutput(unittest.TestCase):
+    def setUp(self):
+        self.output = MemoryOutput("./public")
+
+    def test_paths_are_keyed_relative_to_root(self):
+        with self.output.open("./public/blog/post.html") as f:
+            f.write("<p>post</p>")
+        self.assertEqual(list(self.output.files), ["blog/post.html"])
+        self.assertTrue(self.output.exists("public/blog/post.html"))
+        self.assertEqual(self.output.read("./public/blog/post.html"), b"<p>post</p>")
+
+    def test_failed_write_stores_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with self.output.open("./public/a.html") as f:
+                f.write("partial")
+                raise RuntimeError
+        self.assertEqual(len(self.output), 0)
+
+    def test_copy_file_keeps_source_mtime(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".css", delete=False) as f:
+            f.write(b"body {}")
+        self.addCleanup(os.remove, f.name)
+        self.output.copy_file(f.name, "./public/style.css")
+        entry = self.output.lookup("/style.css")
+        self.assertEqual(entry.mtime_ns, os.stat(f.name).st_mtime_ns)
+        self.assertEqual(entry.content_type, "text/css")
+        self.assertEqual(entry.open().read(), b"body {}")
+
+    def test_lookup_and_directories(self):
+        self.output.write_bytes("./public/index.html", b"home")
+        self.output.write_bytes("./public/docs/index.html", b"docs")
+        self.assertEqual(self.output.lookup("/").data, b"home")
+        self.assertEqual(self.output.lookup("/docs/").data, b"docs")
+        self.assertIsNone(self.output.lookup("/docs"))
+        self.assertTrue(self.output.is_dir("/docs"))
+        self.assertFalse(self.output.is_dir("/doc"))
+        self.assertIsNone(self.output.lookup("/../index.html/"))
+
+    def test_identical_write_keeps_entry(self):
+        self.output.write_bytes("./public/a.html", b"a", mtime_ns=1)
+        self.assertFalse(self.output.write_bytes("./public/a.html", b"a"))
+        self.assertEqual(self.output.lookup("/a.html").mtime_ns, 1)
+        self.assertTrue(self.output.write_bytes("./public/a.html", b"b"))
+        self.assertEqual(self.output.unchanged, 1)
+
+    def test_remove(self):
+        self.output.write_bytes("./public/a.html", b"a")
+        self.output.remove("./public/a.html")
+        self.output.remove("./public/a.html")
+        self.assertFalse(self.output.exists("./public/a.html"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+
+from src.pipeline import Pipeline, PipelineStopped, StageQueue, start_stage
+
+
+class TestStageQueue(unittest.TestCase):
+    def setUp(self):
+        self.stop = threading.Event()
+        self.queue = StageQueue("read", 2, self.stop)
+
+    def test_full_queue_blocks_producer(self):
+        self.queue.put(1)
+        self.queue.put(2)
+        errors = []
+        producer = start_stage(lambda: self.queue.put(3), self.stop, errors)
+        time.sleep(0.1)
+        self.assertTrue(producer.is_alive())
+        self.assertEqual(self.queue.get(), 1)
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+        self.assertEqual(self.queue.stats.max_depth, 2)
+        self.assertGreater(self.queue.stats.put_wait, 0.05)
+        self.assertEqual(errors, [])
+
+    def test_stop_unblocks(self):
+        self.stop.set()
+        with self.assertRaises(PipelineStopped):
+            self.queue.get()
+
+    def test_get_batch_ends_at_stream_end(self):
+        self.queue.put(1)
+        self.queue.put(2)
+        self.assertEqual(self.queue.get_batch(5), [1, 2])
+        self.queue.put(3)
+        self.queue.put(None)
+        self.assertEqual(self.queue.get_batch(5), [3, None])
+
+    def test_stage_errors_stop_the_pipeline(self):
+        errors = []
+
+        def fail():
+            raise ValueError("boom")
+
+        start_stage(fail, self.stop, errors).join()
+        self.assertTrue(self.stop.is_set())
+        self.assertIsInstance(errors[0], ValueError)
+
+
+class TestPipeline(unittest.TestCase):
+    def test_queue_metrics_add_up(self):
+        pipeline = Pipeline(io_threads=1, queue_size=4)
+        for _ in range(2):
+            queue = pipeline.make_queue("read", threading.Event())
+            queue.put("page")
+            queue.get()
+        self.assertEqual(pipeline.to_dict()["queues"]["read"]["items"], 2)
+        self.assertIn("read", pipeline.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import unittest
+
+from src.profiling import STAGES, BuildProfile, Progress, StageTimer
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_marks_accumulate(self):
+        timer = StageTimer()
+        timer.mark("read")
+        timer.mark("write")
+        timer.mark("write")
+        self.assertEqual(tuple(timer.stages), STAGES)
+        self.assertGreaterEqual(timer.stages["write"], 0)
+        self.assertEqual(timer.stages["render"], 0)
+
+
+class TestBuildProfile(unittest.TestCase):
+    def setUp(self):
+        self.profile = BuildProfile()
+        self.profile.record("a.md", {"read": 0.1, "write": 0.2})
+        self.profile.record("b.md", {"read": 0.5, "write": 0.1})
+        self.profile.record("c.md", {"read": 0.05, "write": 0.05})
+
+    def test_stage_totals(self):
+        totals = self.profile.stage_totals()
+        self.assertEqual(tuple(totals), STAGES)
+        self.assertAlmostEqual(totals["read"], 0.65)
+        self.assertAlmostEqual(totals["write"], 0.35)
+        self.assertEqual(totals["render"], 0)
+
+    def test_slowest(self):
+        slowest = self.profile.slowest(2)
+        self.assertEqual([path for path, _ in slowest], ["b.md", "a.md"])
+        self.assertAlmostEqual(slowest[0][1], 0.6)
+
+    def test_to_dict_and_summary(self):
+        data = self.profile.to_dict(slowest=1)
+        self.assertEqual(data["pages"], 3)
+        self.assertEqual([page["path"] for page in data["slowest"]], ["b.md"])
+        self.assertEqual(set(data["per_page"]), {"a.md", "b.md", "c.md"})
+
+        summary = self.profile.summary(slowest=1)
+        self.assertIn("Slowest 1 pages:", summary)
+        self.assertIn("b.md", summary)
+        self.assertNotIn("c.md", summary)
+
+    def test_plugin_totals(self):
+        self.profile.record("d.md", {"transform": 0.4}, {"anchors": 0.1, "toc": 0.2})
+        self.profile.record("e.md", {"transform": 0.1}, {"anchors": 0.05})
+        self.assertAlmostEqual(self.profile.plugins["anchors"], 0.15)
+        self.assertEqual(self.profile.to_dict()["plugins"], self.profile.plugins)
+        self.assertIn("Transform plugins:", self.profile.summary())
+
+
+class TestProgress(unittest.TestCase):
+    def test_throttled(self):
+        stream = io.StringIO()
+        progress = Progress(interval=3600, stream=stream)
+        progress.start(1000)
+        for _ in range(1000):
+            progress.update()
+        self.assertEqual(stream.getvalue(), "")
+        progress.finish()
+        self.assertEqual(stream.getvalue().count("\n"), 1)
+        self.assertIn("1000/1000 pages", stream.getvalue())
+
+    def test_reports_every_interval(self):
+        stream = io.StringIO()
+        progress = Progress(interval=0, stream=stream)
+        progress.start(3)
+        for _ in range(3):
+            progress.update()
+        self.assertEqual(stream.getvalue().count("\n"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from src.output import DiskOutput
+from src.publish import Publisher, PublishError, link_tree
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+class TestPublisher(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.public = os.path.join(self.root, "public")
+        self.generations = os.path.join(self.root, "generations")
+        self.publisher = Publisher(self.public, self.generations, keep=2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def publish(self, files: dict[str, str], reuse: bool = True) -> str:
+        stage = self.publisher.stage(reuse=reuse)
+        for rel_path, text in files.items():
+            DiskOutput(stage).write_bytes(os.path.join(stage, rel_path), text.encode())
+        return self.publisher.publish(stage)
+
+    def test_publish_swaps_symlink(self):
+        self.assertEqual(self.publish({"index.html": "one"}), "gen-000001")
+        self.assertTrue(os.path.islink(self.public))
+        self.assertEqual(read_file(os.path.join(self.public, "index.html")), "one")
+
+        self.assertEqual(self.publish({"index.html": "two"}), "gen-000002")
+        self.assertEqual(read_file(os.path.join(self.public, "index.html")), "two")
+        self.assertEqual(self.publisher.current(), "gen-000002")
+
+    def test_unchanged_files_are_hardlinked_not_written_through(self):
+        self.publish({"a.css": "a", "index.html": "one"})
+        self.publish({"index.html": "two"})
+        first, second = self.publisher.generations()
+        a_first = os.stat(os.path.join(self.generations, first, "a.css"))
+        a_second = os.stat(os.path.join(self.generations, second, "a.css"))
+        self.assertEqual(a_first.st_ino, a_second.st_ino)
+        self.assertEqual(
+            read_file(os.path.join(self.generations, first, "index.html")), "one"
+        )
+
+    def test_stage_without_reuse_starts_empty(self):
+        self.publish({"old.html": "old"})
+        stage = self.publisher.stage(reuse=False)
+        self.assertEqual(os.listdir(stage), [])
+
+    def test_stage_removes_only_stale_staging_dirs(self):
+        finished = subprocess.Popen([sys.executable, "-c", "pass"])
+        finished.wait()
+        crashed = os.path.join(self.generations, f"staging-{finished.pid}")
+        running = os.path.join(self.generations, f"staging-{os.getppid()}")
+        write_file(os.path.join(crashed, "index.html"), "crashed")
+        write_file(os.path.join(running, "index.html"), "still being built")
+        stage = self.publisher.stage()
+        self.assertFalse(os.path.exists(crashed))
+        self.assertTrue(os.path.exists(running))
+        # a second build of this process replaces its own
+        self.assertEqual(self.publisher.stage(), stage)
+
+    def test_adopts_plain_public_directory(self):
+        write_file(os.path.join(self.public, "index.html"), "plain")
+        stage = self.publisher.stage()
+        self.assertEqual(read_file(os.path.join(stage, "index.html")), "plain")
+        self.assertEqual(self.publisher.publish(stage), "gen-000002")
+        self.assertEqual(self.publisher.generations(), ["gen-000001", "gen-000002"])
+
+    def test_prune_keeps_generations(self):
+        for i in range(5):
+            self.publish({"index.html": str(i)})
+        self.assertEqual(
+            self.publisher.generations(), ["gen-000003", "gen-000004", "gen-000005"]
+        )
+
+    def test_rollback(self):
+        self.publish({"index.html": "one"})
+        self.publish({"index.html": "two"})
+        self.assertEqual(self.publisher.rollback(), "gen-000001")
+        self.assertEqual(read_file(os.path.join(self.public, "index.html")), "one")
+        with self.assertRaises(PublishError):
+            self.publisher.rollback()
+
+    def test_manifest_follows_its_generation(self):
+        stage = self.publisher.stage()
+        write_file(self.publisher.manifest_path(stage), "{}")
+        name = self.publisher.publish(stage)
+        stage = self.publisher.stage()
+        self.assertTrue(os.path.exists(self.publisher.manifest_path(stage)))
+        self.publisher.discard(stage)
+        self.assertFalse(os.path.exists(stage))
+        self.assertFalse(os.path.exists(self.publisher.manifest_path(stage)))
+        self.assertTrue(
+            os.path.exists(
+                self.publisher.manifest_path(os.path.join(self.generations, name))
+            )
+        )
+
+
+class TestLinkTree(unittest.TestCase):
+    def test_links_nested_files(self):
+        with tempfile.TemporaryDirectory() as root:
+            src = os.path.join(root, "src")
+            write_file(os.path.join(src, "a", "b.txt"), "b")
+            write_file(os.path.join(src, "c.txt"), "c")
+            dst = os.path.join(root, "dst")
+            self.assertEqual(link_tree(src, dst), 2)
+            self.assertEqual(read_file(os.path.join(dst, "a", "b.txt")), "b")
+            self.assertEqual(os.stat(os.path.join(dst, "c.txt")).st_nlink, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,312 @@
+import gzip
+import http.client
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from server import (
+    LIVE_RELOAD_PATH,
+    CachePolicy,
+    LiveReload,
+    accepts_gzip,
+    inject_live_reload,
+    make_server,
+)
+from src.compress import precompress
+from src.output import MemoryOutput
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "index.html"), "w") as f:
+            f.write("<h1>Home</h1>")
+        os.mkdir(os.path.join(self.tmp.name, "docs"))
+        self.docs = "<p>documentation</p>" * 200
+        with open(os.path.join(self.tmp.name, "docs", "index.html"), "w") as f:
+            f.write(self.docs)
+        precompress(self.tmp.name)
+        self.httpd = make_server(
+            port=0,
+            directory=self.tmp.name,
+            workers=4,
+            idle_timeout=2.0,
+            host="127.0.0.1",
+            cache_policy=CachePolicy([("*.html", "no-cache")]),
+            index_refresh=0,
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def connect(self):
+        return http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+
+    def test_keep_alive_reuses_connection(self):
+        conn = self.connect()
+        conn.request("GET", "/index.html")
+        response = conn.getresponse()
+        self.assertEqual(response.read(), b"<h1>Home</h1>")
+        self.assertEqual(response.version, 11)
+        sock = conn.sock
+
+        conn.request("GET", "/")
+        response = conn.getresponse()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.read(), b"<h1>Home</h1>")
+        self.assertIs(conn.sock, sock)
+        conn.close()
+
+    def test_cors_headers(self):
+        conn = self.connect()
+        conn.request("OPTIONS", "/index.html")
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Access-Control-Allow-Origin"), "*")
+        self.assertEqual(response.getheader("Content-Length"), "0")
+        conn.close()
+
+    def test_idle_connection_does_not_block_others(self):
+        idle = socket.create_connection(("127.0.0.1", self.port))
+        try:
+            conn = self.connect()
+            conn.request("GET", "/index.html")
+            self.assertEqual(conn.getresponse().status, 200)
+            conn.close()
+        finally:
+            idle.close()
+
+    def get(self, path, headers=None):
+        conn = self.connect()
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        return response, body
+
+    def test_gzip_variant_served(self):
+        response, body = self.get("/docs/", {"Accept-Encoding": "br, gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(response.getheader("Content-Type"), "text/html")
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(int(response.getheader("Content-Length")), len(body))
+        self.assertEqual(gzip.decompress(body).decode(), self.docs)
+
+    def test_identity_when_gzip_not_accepted(self):
+        response, body = self.get("/docs/index.html", {"Accept-Encoding": "gzip;q=0"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertEqual(response.getheader("Vary"), "Accept-Encoding")
+        self.assertEqual(body.decode(), self.docs)
+
+    def test_no_vary_without_gzip_sibling(self):
+        response, body = self.get("/index.html", {"Accept-Encoding": "gzip"})
+        self.assertIsNone(response.getheader("Content-Encoding"))
+        self.assertIsNone(response.getheader("Vary"))
+        self.assertEqual(body, b"<h1>Home</h1>")
+
+    def test_etag_revalidation(self):
+        response, _ = self.get("/index.html")
+        etag = response.getheader("ETag")
+        self.assertEqual(response.getheader("Cache-Control"), "no-cache")
+
+        response, body = self.get("/index.html", {"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        self.assertEqual(body, b"")
+        self.assertEqual(response.getheader("ETag"), etag)
+
+        response, _ = self.get("/index.html", {"If-None-Match": '"stale"'})
+        self.assertEqual(response.status, 200)
+
+    def test_gzip_variant_has_its_own_etag(self):
+        identity, _ = self.get("/docs/")
+        encoded, _ = self.get("/docs/", {"Accept-Encoding": "gzip"})
+        self.assertNotEqual(identity.getheader("ETag"), encoded.getheader("ETag"))
+
+    def test_if_modified_since(self):
+        response, _ = self.get("/index.html")
+        last_modified = response.getheader("Last-Modified")
+        response, _ = self.get("/index.html", {"If-Modified-Since": last_modified})
+        self.assertEqual(response.status, 304)
+        response, _ = self.get(
+            "/index.html", {"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"}
+        )
+        self.assertEqual(response.status, 200)
+
+    def test_refresh_picks_up_changes(self):
+        with open(os.path.join(self.tmp.name, "new.html"), "w") as f:
+            f.write("new")
+        self.httpd.file_index.refresh()
+        response, body = self.get("/new.html")
+        self.assertEqual(body, b"new")
+
+    def test_missing_file_and_directory_redirect(self):
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+        response, _ = self.get("/docs")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/docs/")
+
+
+class TestLiveReload(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, "index.html"), "w") as f:
+            f.write("<body><h1>Home</h1></body>")
+        self.live_reload = LiveReload()
+        self.httpd = make_server(
+            port=0,
+            directory=self.tmp.name,
+            host="127.0.0.1",
+            index_refresh=0,
+            live_reload=self.live_reload,
+            workers=2,
+            max_streams=3,
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    def test_script_injected(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", "/")
+        body = conn.getresponse().read()
+        conn.close()
+        self.assertEqual(body, inject_live_reload(b"<body><h1>Home</h1></body>"))
+        self.assertTrue(body.endswith(b"</script></body>"))
+
+    def test_reload_event(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", LIVE_RELOAD_PATH)
+        response = conn.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+        self.live_reload.notify()
+        self.assertEqual(response.fp.readline(), b"data: reload\n")
+        conn.close()
+
+    def test_streams_do_not_hold_workers(self):
+        streams = []
+        for _ in range(3):
+            conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+            conn.request("GET", LIVE_RELOAD_PATH)
+            self.assertEqual(conn.getresponse().status, 200)
+            streams.append(conn)
+        # more open tabs than workers, and pages are still answered
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", "/")
+        self.assertEqual(conn.getresponse().status, 200)
+        conn.close()
+
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", LIVE_RELOAD_PATH)
+        response = conn.getresponse()
+        response.read()
+        self.assertEqual(response.status, 503)
+        conn.close()
+        for stream in streams:
+            stream.close()
+
+
+class TestMemoryStore(unittest.TestCase):
+    def setUp(self):
+        self.store = MemoryOutput("/site")
+        self.store.write_bytes("/site/index.html", b"<h1>Home</h1>")
+        self.store.write_bytes("/site/docs/index.html", b"<p>docs</p>")
+        self.store.write_bytes("/site/style.css", b"body {}")
+        # the directory doesn't exist: every response must come from the store
+        self.httpd = make_server(
+            port=0, directory="/nonexistent", host="127.0.0.1", store=self.store
+        )
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def get(self, path, headers=None):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", path, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        return response, body
+
+    def test_serves_from_store(self):
+        response, body = self.get("/")
+        self.assertEqual(body, b"<h1>Home</h1>")
+        self.assertEqual(response.getheader("Content-Length"), "13")
+        response, body = self.get("/style.css")
+        self.assertEqual(response.getheader("Content-Type"), "text/css")
+        self.assertEqual(body, b"body {}")
+
+    def test_etag_revalidation(self):
+        response, _ = self.get("/docs/")
+        etag = response.getheader("ETag")
+        response, body = self.get("/docs/", {"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+
+    def test_updates_are_visible(self):
+        self.store.write_bytes("/site/style.css", b"body { margin: 0 }")
+        _, body = self.get("/style.css")
+        self.assertEqual(body, b"body { margin: 0 }")
+
+    def test_missing_file_and_directory_redirect(self):
+        response, _ = self.get("/missing.html")
+        self.assertEqual(response.status, 404)
+        response, _ = self.get("/docs?x=1")
+        self.assertEqual(response.status, 301)
+        self.assertEqual(response.getheader("Location"), "/docs/?x=1")
+
+
+class TestCachePolicy(unittest.TestCase):
+    def test_first_match_wins(self):
+        policy = CachePolicy.parse(
+            ["/images/*=max-age=31536000, immutable", "*.html=no-cache", "*=max-age=60"]
+        )
+        self.assertEqual(policy.lookup("/images/a.png"), "max-age=31536000, immutable")
+        self.assertEqual(policy.lookup("/docs/index.html"), "no-cache")
+        self.assertEqual(policy.lookup("/index.css"), "max-age=60")
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            CachePolicy.parse(["no-equals-sign"])
+
+
+class TestAcceptsGzip(unittest.TestCase):
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip("gzip, deflate"))
+        self.assertTrue(accepts_gzip("deflate, gzip;q=0.5"))
+        self.assertTrue(accepts_gzip("*"))
+        self.assertFalse(accepts_gzip("gzip;q=0"))
+        self.assertFalse(accepts_gzip("br"))
+        self.assertFalse(accepts_gzip(None))
+        # an explicit gzip wins over *, whichever comes first
+        self.assertTrue(accepts_gzip("*;q=0, gzip"))
+        self.assertFalse(accepts_gzip("*, gzip;q=0"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+
+from src.build import build_pages
+from src.manifest import BuildManifest
+from src.shard import (
+    Shard,
+    ShardError,
+    find_shards,
+    merge_shards,
+    shard_index,
+    shard_manifest_path,
+)
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read_tree(root: str) -> dict[str, str]:
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            with open(path) as f:
+                files[os.path.relpath(path, root)] = f.read()
+    return files
+
+
+class TestShard(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(Shard.parse("2/4"), Shard(2, 4))
+        self.assertEqual(Shard.parse("2/4").name, "shard-2-of-4")
+        for text in ("0/4", "5/4", "1/0", "a/b", "2"):
+            with self.assertRaises(ValueError):
+                Shard.parse(text)
+
+    def test_every_source_has_exactly_one_stable_shard(self):
+        sources = [f"blog/post-{i}.md" for i in range(200)]
+        shards = [Shard(i, 4) for i in range(1, 5)]
+        for source in sources:
+            self.assertEqual(sum(shard.owns(source) for shard in shards), 1)
+        counts = [sum(shard.owns(source) for source in sources) for shard in shards]
+        self.assertTrue(all(count > 20 for count in counts), counts)
+        # pinned: the split must not change between runs or machines
+        self.assertEqual(shard_index("index.md", 4), 4)
+        self.assertEqual(shard_index(os.path.join("blog", "post.md"), 4), 1)
+        self.assertEqual(
+            [shard_index(f"p{i}.md", 3) for i in range(6)], [2, 3, 3, 1, 2, 1]
+        )
+
+
+class TestMergeShards(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.shards = os.path.join(self.root, "shards")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        write_file(self.template, "<main>{{ Content }}</main>")
+        for i in range(12):
+            write_file(os.path.join(self.content, f"p{i}.md"), f"# Page {i}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shard(self, shard: Shard) -> str:
+        shard_dir = os.path.join(self.shards, shard.name)
+        manifest = BuildManifest.load(shard_manifest_path(shard_dir))
+        manifest.shard = str(shard)
+        build_pages(self.content, self.template, shard_dir, manifest, shard=shard)
+        manifest.save()
+        write_file(os.path.join(shard_dir, "index.css"), "body {}")
+        return shard_dir
+
+    def test_merge_matches_unsharded_build(self):
+        for i in range(1, 4):
+            self.build_shard(Shard(i, 3))
+        manifest = BuildManifest(os.path.join(self.root, "manifest.json"))
+        report = merge_shards(find_shards(self.shards), self.public, manifest)
+        self.assertEqual(len(report.shards), 3)
+        self.assertEqual(report.shared, ["index.css", "index.css"])
+        self.assertEqual(len(manifest.pages), 12)
+        self.assertIsNone(manifest.shard)
+
+        unsharded = os.path.join(self.root, "unsharded")
+        build_pages(self.content, self.template, unsharded)
+        write_file(os.path.join(unsharded, "index.css"), "body {}")
+        self.assertEqual(read_tree(self.public), read_tree(unsharded))
+
+    def test_missing_and_duplicate_shards(self):
+        first = self.build_shard(Shard(1, 3))
+        self.build_shard(Shard(3, 3))
+        with self.assertRaisesRegex(ShardError, "Missing shards: 2/3"):
+            merge_shards(find_shards(self.shards), self.public, BuildManifest(""))
+        with self.assertRaisesRegex(ShardError, "found twice"):
+            merge_shards([first, first], self.public, BuildManifest(""))
+        self.assertFalse(os.path.exists(self.public))
+
+    def test_collision_leaves_public_alone(self):
+        write_file(os.path.join(self.public, "old.html"), "old")
+        shard_dirs = [self.build_shard(Shard(i, 2)) for i in (1, 2)]
+        write_file(os.path.join(shard_dirs[1], "index.css"), "body { margin: 0 }")
+        with self.assertRaisesRegex(ShardError, "index.css differs"):
+            merge_shards(shard_dirs, self.public, BuildManifest(""))
+        self.assertEqual(read_tree(self.public), {"old.html": "old"})
+
+
+if __name__ == "__main__":
+    unittest.main()
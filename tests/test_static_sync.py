@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from src.static_sync import sync_static
+
+
+def write_file(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.public = os.path.join(self.tmp.name, "public")
+        write_file(os.path.join(self.static, "index.css"), b"body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), b"\x89PNG" * 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_first_sync_copies_everything(self):
+        report = sync_static(self.static, self.public)
+        self.assertEqual(report.copied, ["images/a.png", "index.css"])
+        self.assertEqual(report.bytes_copied, 407)
+        with open(os.path.join(self.public, "images", "a.png"), "rb") as f:
+            self.assertEqual(f.read(), b"\x89PNG" * 100)
+
+    def test_unchanged_files_are_skipped(self):
+        sync_static(self.static, self.public)
+        report = sync_static(self.static, self.public)
+        self.assertEqual(report.copied, [])
+        self.assertEqual(report.skipped, ["images/a.png", "index.css"])
+        self.assertEqual(report.bytes_skipped, 407)
+
+    def test_changed_file_is_copied(self):
+        sync_static(self.static, self.public)
+        write_file(os.path.join(self.static, "index.css"), b"body { margin: 0 }")
+        report = sync_static(self.static, self.public)
+        self.assertEqual(report.copied, ["index.css"])
+
+    def test_checksum_ignores_mtime(self):
+        sync_static(self.static, self.public)
+        os.utime(os.path.join(self.public, "index.css"), ns=(0, 0))
+        report = sync_static(self.static, self.public, checksum=True)
+        self.assertEqual(report.copied, [])
+
+    def test_stale_files_are_removed(self):
+        report = sync_static(self.static, self.public)
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        write_file(os.path.join(self.public, "page.html"), b"<p>generated</p>")
+        report = sync_static(self.static, self.public, previous=report.files)
+        self.assertEqual(report.removed, ["images/a.png"])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "page.html")))
+
+    def test_hardlink(self):
+        sync_static(self.static, self.public, link="hardlink")
+        self.assertTrue(
+            os.path.samefile(
+                os.path.join(self.static, "index.css"),
+                os.path.join(self.public, "index.css"),
+            )
+        )
+        report = sync_static(self.static, self.public, link="hardlink")
+        self.assertEqual(report.copied, [])
+
+    def test_reflink_falls_back_to_copy(self):
+        report = sync_static(self.static, self.public, link="reflink")
+        self.assertEqual(report.copied, ["images/a.png", "index.css"])
+        with open(os.path.join(self.public, "index.css"), "rb") as f:
+            self.assertEqual(f.read(), b"body {}")
+
+    def test_invalid_link_mode(self):
+        with self.assertRaises(ValueError):
+            sync_static(self.static, self.public, link="symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
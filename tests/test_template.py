@@ -0,0 +1,91 @@
+import io
+import os
+import tempfile
+import unittest
+
+from src.template import (
+    Template,
+    load_template,
+    parse_front_matter,
+    read_front_matter,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments_and_slots(self):
+        template = Template("<title>{{ Title }}</title><main>{{Content}}</main>")
+        self.assertEqual(template.slots, ["title", "content"])
+        self.assertEqual(template.segments, ["<title>", "</title><main>", "</main>"])
+
+    def test_render(self):
+        template = Template("<h1>{{ Title }}</h1><p>by {{ Author }}</p>{{ Content }}")
+        self.assertEqual(
+            template.render({"title": "Hi", "author": "Me", "content": "<b>x</b>"}),
+            "<h1>Hi</h1><p>by Me</p><b>x</b>",
+        )
+
+    def test_render_streams_chunk_iterables(self):
+        template = Template("<main>{{ Content }}</main>")
+        chunks = (f"<p>{i}</p>" for i in range(3))
+        fp = io.StringIO()
+        template.write(fp, {"content": chunks})
+        self.assertEqual(fp.getvalue(), "<main><p>0</p><p>1</p><p>2</p></main>")
+
+    def test_repeated_slot_gets_every_chunk(self):
+        template = Template("<p>{{ Content }}</p><aside>{{ Content }}</aside>")
+        self.assertEqual(template.repeated, {"content"})
+        chunks = (f"<b>{i}</b>" for i in range(2))
+        self.assertEqual(
+            template.render({"content": chunks}),
+            "<p><b>0</b><b>1</b></p><aside><b>0</b><b>1</b></aside>",
+        )
+
+    def test_render_missing_variable_is_empty(self):
+        template = Template("[{{ Missing }}]")
+        self.assertEqual(template.render({}), "[]")
+
+    def test_render_no_slots(self):
+        self.assertEqual(Template("plain").render({"title": "x"}), "plain")
+
+    def test_load_template_is_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path).render({"title": "x"}), "<h1>x</h1>")
+
+
+class TestParseFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        markdown = '---\ntitle: "My Page"\nAuthor: Bilbo\n# comment\n---\n# Heading'
+        self.assertEqual(
+            parse_front_matter(markdown),
+            ({"title": "My Page", "author": "Bilbo"}, "# Heading"),
+        )
+
+    def test_no_front_matter(self):
+        self.assertEqual(parse_front_matter("# Heading"), ({}, "# Heading"))
+
+    def test_unclosed_front_matter(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter("---\ntitle: x\n# Heading")
+
+    def test_read_front_matter_leaves_body_unread(self):
+        lines = iter(["---\n", "title: x\n", "---\n", "# Heading\n", "text\n"])
+        variables, body = read_front_matter(lines)
+        self.assertEqual(variables, {"title": "x"})
+        self.assertEqual(next(lines), "# Heading\n")
+        self.assertEqual(list(body), ["text\n"])
+
+        variables, body = read_front_matter(iter(["# Heading\n"]))
+        self.assertEqual((variables, list(body)), ({}, ["# Heading\n"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import tracemalloc
 import unittest
 
 from src.textnode import TextNode
@@ -18,6 +19,17 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", "bold", "https://www.boot.dev")
         self.assertEqual(node, node2)
 
+    def test_memory_budget(self):
+        texts = [f"text {i}" for i in range(10_000)]
+        tracemalloc.start()
+        try:
+            nodes = [TextNode(text, "bold") for text in texts]
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(len(nodes), len(texts))
+        self.assertLessEqual(current / len(texts), 72)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import unittest
+
+from src import node_utils
+from src.build import build_pages
+from src.htmlnode import LeafNode, ParentNode, freeze_node
+from src.manifest import BuildManifest
+from src.node_utils import markdown_to_html_node, render_markdown
+from src.output import MemoryOutput
+from src.profiling import BuildProfile, StageTimer
+from src.transform import (
+    PageContext,
+    Plugin,
+    Transformer,
+    load_plugins,
+    slugify,
+    toc_node,
+)
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class CountingPlugin(Plugin):
+    name = "count"
+
+    def __init__(self):
+        self.visits = 0
+
+    def visit(self, node, page):
+        self.visits += 1
+        return None
+
+
+class TestTransformer(unittest.TestCase):
+    def tree(self):
+        return freeze_node(
+            ParentNode(
+                "div",
+                [
+                    ParentNode("h2", [LeafNode(None, "Getting Started!")]),
+                    LeafNode("p", "text"),
+                    ParentNode(
+                        "blockquote",
+                        [
+                            LeafNode("link", "out", {"href": "https://example.com"}),
+                            LeafNode("link", "in", {"href": "/about"}),
+                        ],
+                    ),
+                    ParentNode(
+                        "h2", [LeafNode(None, "Getting "), LeafNode("b", "Started")]
+                    ),
+                    LeafNode("image", "a", {"src": "/a.png", "alt": "a"}),
+                ],
+            )
+        )
+
+    def test_plugins_share_one_walk(self):
+        first, second = CountingPlugin(), CountingPlugin()
+        Transformer([first, second]).apply(self.tree(), PageContext())
+        self.assertEqual((first.visits, second.visits), (11, 11))
+
+    def test_anchors_links_and_images(self):
+        names = ["anchors", "external-links", "lazy-images"]
+        transformer = Transformer.from_names(names)
+        page = PageContext()
+        html = transformer.apply(self.tree(), page).to_html()
+        self.assertIn('<h2 id="getting-started">', html)
+        self.assertIn('<h2 id="getting-started-1">', html)
+        self.assertIn(
+            '<link href="https://example.com" target="_blank" '
+            'rel="noopener noreferrer">out</link>',
+            html,
+        )
+        self.assertIn('<link href="/about">in</link>', html)
+        self.assertIn('loading="lazy" decoding="async"', html)
+        self.assertEqual(
+            page.headings,
+            [
+                (2, "getting-started", "Getting Started!"),
+                (2, "getting-started-1", "Getting Started"),
+            ],
+        )
+
+    def test_copy_on_write(self):
+        tree = self.tree()
+        before = tree.to_html()
+        result = Transformer.from_names(["external-links"]).apply(tree, PageContext())
+        self.assertEqual(tree.to_html(), before)
+        self.assertIsNot(result, tree)
+        # untouched subtrees are shared, not copied
+        self.assertIs(result.children[0], tree.children[0])
+        self.assertIsNot(result.children[2], tree.children[2])
+        self.assertIs(result.children[2].children[1], tree.children[2].children[1])
+
+        quote = tree.children[2]
+        unchanged = Transformer.from_names(["lazy-images"])
+        self.assertIs(unchanged.apply(quote, PageContext()), quote)
+
+    def test_toc(self):
+        transformer = Transformer.from_names(["toc"])
+        self.assertEqual(transformer.names, ["anchors", "toc"])
+        page = PageContext()
+        markdown = "# Title\n\n## One\n\n### One A\n\n## Two"
+        transformer.apply(markdown_to_html_node(markdown), page)
+        self.assertEqual(
+            transformer.finish(page)["toc"],
+            '<ul><li><link href="#one">One</link><ul><li><link href="#one-a">'
+            'One A</link></li></ul></li><li><link href="#two">Two</link></li></ul>',
+        )
+        # a skipped level nests one step deeper
+        self.assertEqual(
+            toc_node([(3, "a", "A"), (2, "b", "B")]).to_html(),
+            '<ul><li><link href="#a">A</link></li>'
+            '<li><link href="#b">B</link></li></ul>',
+        )
+
+    def test_timings_and_digest(self):
+        transformer = Transformer.from_names(["anchors", "lazy-images"])
+        timer = StageTimer()
+        transformer.apply(self.tree(), PageContext(), timer)
+        self.assertEqual(list(timer.plugins), ["anchors", "lazy-images"])
+        self.assertNotEqual(
+            transformer.digest, Transformer.from_names(["anchors"]).digest
+        )
+
+    def test_unknown_plugin_and_slugify(self):
+        with self.assertRaisesRegex(ValueError, "Unknown plugin 'nope'"):
+            load_plugins(["nope"])
+        self.assertEqual(slugify("  What's *new* in 2.0? "), "whats-new-in-20")
+        self.assertEqual(slugify("!!!"), "section")
+
+
+class TestTransformPages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.public = os.path.join(self.tmp.name, "public")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        write_file(self.template, "<nav>{{ Toc }}</nav><main>{{ Content }}</main>")
+        write_file(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n## Intro\n\n> See [docs](https://example.com).",
+        )
+        self.addCleanup(node_utils.configure_transforms, None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_streamed_and_whole_pages_match(self):
+        node_utils.configure_transforms(["anchors", "external-links"])
+        path = os.path.join(self.content, "index.md")
+        with open(path) as f:
+            markdown = f.read()
+        self.assertEqual(
+            "".join(node_utils.render_page(path, self.template)),
+            "".join(render_markdown(markdown, self.template)),
+        )
+        self.assertEqual(
+            "".join(node_utils.render_page(path, self.template, StageTimer())),
+            "".join(render_markdown(markdown, self.template)),
+        )
+
+    def test_build_with_plugins(self):
+        manifest = BuildManifest(os.path.join(self.tmp.name, "manifest.json"))
+        profile = BuildProfile()
+        output = MemoryOutput(self.public)
+        toc = Transformer.from_names(["toc", "external-links"])
+        result = build_pages(
+            self.content,
+            self.template,
+            self.public,
+            manifest,
+            profile=profile,
+            output=output,
+            transformer=toc,
+        )
+        self.assertEqual(result.rendered, ["index.md"])
+        page = output.read(os.path.join(self.public, "index.html")).decode()
+        self.assertIn('<nav><ul><li><link href="#intro">Intro</link>', page)
+        self.assertIn('<h2 id="intro">', page)
+        self.assertIn('target="_blank"', page)
+        self.assertEqual(set(profile.plugins), {"anchors", "toc", "external-links"})
+        self.assertIsNone(node_utils.transformer)
+
+        kwargs = {"output": output, "transformer": toc}
+        result = build_pages(
+            self.content, self.template, self.public, manifest, **kwargs
+        )
+        self.assertEqual(result.skipped, ["index.md"])
+        # other plugins, other pages
+        kwargs["transformer"] = Transformer.from_names(["anchors"])
+        result = build_pages(
+            self.content, self.template, self.public, manifest, **kwargs
+        )
+        self.assertEqual(result.rendered, ["index.md"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+
+from src.htmlnode import LeafNode, ParentNode, freeze_node
+from src.node_utils import markdown_to_html_node
+from src.tree_cache import CacheFormatError, TreeCache, decode_tree, encode_tree
+
+MARKDOWN = """# Title
+
+Paragraph with **bold**, *italic*, `code` and a [link](/to/page).
+
+> a quote with ![an image](/img.png) ünïcode ✓
+
+* one
+* two
+
+1. first
+2. second
+
+```
+code block
+```
+"""
+
+
+class TestTreeEncoding(unittest.TestCase):
+    def assertRoundTrip(self, node):
+        decoded = decode_tree(encode_tree(node))
+        self.assertEqual(decoded.to_html(), node.to_html())
+        return decoded
+
+    def test_markdown_tree(self):
+        node = markdown_to_html_node(MARKDOWN)
+        decoded = self.assertRoundTrip(node)
+        self.assertEqual(decoded, node)
+
+    def test_props_and_empty_values(self):
+        node = ParentNode(
+            "div",
+            [
+                LeafNode(None, ""),
+                LeafNode("a", "x", {"href": "/a", "class": "b"}),
+                ParentNode("span", [LeafNode("b", "y")], {}),
+            ],
+        )
+        decoded = self.assertRoundTrip(node)
+        self.assertEqual(decoded.children[1].props, {"href": "/a", "class": "b"})
+        self.assertIsNone(decoded.children[0].props)
+        self.assertEqual(decoded.children[2].props, {})
+
+    def test_frozen_tree(self):
+        node = freeze_node(markdown_to_html_node(MARKDOWN))
+        decoded = self.assertRoundTrip(node)
+        self.assertIsInstance(decoded.children, list)
+
+    def test_deep_nesting(self):
+        node = LeafNode("b", "core")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        self.assertRoundTrip(node)
+
+    def test_wide_string_table_uses_wider_ints(self):
+        node = ParentNode("ul", [LeafNode("li", str(i)) for i in range(70000)])
+        self.assertRoundTrip(node)
+
+    def test_rejects_other_data(self):
+        with self.assertRaises(CacheFormatError):
+            decode_tree(b"XXXX" + encode_tree(LeafNode("p", "x"))[4:])
+
+
+class TestTreeCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = TreeCache(self.tmp.name, version="1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_and_load(self):
+        key = self.cache.key(MARKDOWN)
+        self.assertIsNone(self.cache.load(key))
+        self.cache.store(key, markdown_to_html_node(MARKDOWN))
+        node = self.cache.load(key)
+        self.assertEqual(node.to_html(), markdown_to_html_node(MARKDOWN).to_html())
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_version(self):
+        other = TreeCache(self.tmp.name, version="2")
+        self.assertNotEqual(self.cache.key(MARKDOWN), other.key(MARKDOWN))
+
+    def test_corrupt_entry_is_a_miss(self):
+        key = self.cache.key(MARKDOWN)
+        self.cache.store(key, markdown_to_html_node(MARKDOWN))
+        with open(self.cache.path(key), "r+b") as f:
+            f.truncate(20)
+        self.assertIsNone(self.cache.load(key))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_evicts_least_recently_used(self):
+        keys = [self.cache.key(f"# Page {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.store(key, markdown_to_html_node(f"# Page {i}"))
+            os.utime(self.cache.path(key), ns=(i, i))
+        self.cache.load(keys[0])
+        size = os.path.getsize(self.cache.path(keys[0]))
+        self.cache.max_bytes = 2 * size
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(os.path.exists(self.cache.path(keys[1])))
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
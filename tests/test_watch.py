@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from src.watch import CONTENT, STATIC, TEMPLATE, Change, Poller, apply_plan, plan_rebuild
+
+
+def write_file(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "public")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        self.poller = Poller(self.content, self.static, self.template)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def touch(self, path: str, text: str) -> None:
+        write_file(path, text)
+        os.utime(path, ns=(0, 10**9))
+
+    def plan(self, changes):
+        return plan_rebuild(
+            changes, self.content, self.static, self.template, self.public
+        )
+
+    def test_poll_detects_changes(self):
+        self.assertEqual(self.poller.poll(), [])
+        post = os.path.join(self.content, "blog", "post.md")
+        self.touch(post, "# Post, edited")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.assertEqual(
+            self.poller.poll(),
+            [
+                Change(CONTENT, post),
+                Change(STATIC, os.path.join(self.static, "index.css"), removed=True),
+            ],
+        )
+        self.assertEqual(self.poller.poll(), [])
+
+    def test_content_change_maps_to_one_page(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        plan = self.plan([Change(CONTENT, post)])
+        self.assertEqual(
+            plan.pages, [(post, os.path.join(self.public, "blog", "post.html"))]
+        )
+        self.assertEqual(len(plan), 1)
+
+    def test_template_change_maps_to_all_pages(self):
+        plan = self.plan([Change(TEMPLATE, self.template)])
+        self.assertEqual(len(plan.pages), 2)
+
+    def test_apply_plan(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        css = os.path.join(self.static, "index.css")
+        report = apply_plan(
+            self.plan([Change(CONTENT, post), Change(STATIC, css)]),
+            self.template,
+            self.public,
+        )
+        self.assertEqual(report.outputs, 2)
+        with open(os.path.join(self.public, "blog", "post.html")) as f:
+            self.assertEqual(f.read(), "<title>Post</title><div><h1>Post</h1></div>")
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+        os.remove(post)
+        report = apply_plan(
+            self.plan([Change(CONTENT, post, removed=True)]), self.template, self.public
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+
+if __name__ == "__main__":
+    unittest.main()